@@ -0,0 +1,208 @@
+"""Attendance of each enrollment as a pair of day bitsets.
+
+An AttendanceBitmap covers one enrollment, and so one course in one
+term. Bit ``i`` of `recorded` is set when a class was recorded on
+``start_date + i`` days, and the same bit of `present` when the student
+attended it. Bytes are little-endian, so ``int.from_bytes(bits, 'little')``
+turns a bitset into a Python int with bit ``i`` at position ``i``. A term
+of daily records then fits in about 15 bytes per bitset, instead of one
+AttendanceRecord row per day. Rates over any date range are popcounts of
+the masked ints.
+
+Bitmaps are kept canonical: `start_date` is the first recorded day, so
+bit 0 of `recorded` is always set, and an enrollment without records has
+no bitmap. Incremental updates therefore produce exactly what `rebuild`
+does. AttendanceRecord remains the detailed log the bitmaps are built
+from; dashboard.signals applies each saved or deleted record.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from django.db import transaction
+
+from .models import AttendanceBitmap, AttendanceRecord, Enrollment
+from .student_csv import chunked
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def to_int(bits):
+    return int.from_bytes(bits, 'little')
+
+
+def to_bytes(value, length=0):
+    return value.to_bytes(max(length, (value.bit_length() + 7) // 8), 'little')
+
+
+def pack(enrollment_ids, ordinals, present):
+    """Canonical bitmaps of attendance rows given as parallel arrays.
+
+    `ordinals` are ``date.toordinal()`` values; an (enrollment, day) pair
+    may occur only once. Returns the AttendanceBitmap field values of
+    each enrollment, as dicts.
+    """
+    enrollment_ids = np.asarray(enrollment_ids, dtype=np.int64)
+    if not enrollment_ids.size:
+        return []
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    present = np.asarray(present, dtype=bool)
+    order = np.lexsort((ordinals, enrollment_ids))
+    enrollment_ids, ordinals, present = enrollment_ids[order], ordinals[order], present[order]
+
+    # Rows of enrollment k are starts[k]:starts[k + 1]; its first day is bit 0
+    starts = np.flatnonzero(np.concatenate(([True], enrollment_ids[1:] != enrollment_ids[:-1])))
+    counts = np.diff(np.append(starts, enrollment_ids.size))
+    group = np.repeat(np.arange(starts.size), counts)
+    offsets = ordinals - ordinals[starts][group]
+
+    # Each enrollment's bytes sit back to back in one flat buffer
+    widths = (offsets[np.append(starts[1:], enrollment_ids.size) - 1] >> 3) + 1
+    ends = np.cumsum(widths)
+    byte_index = (ends - widths)[group] + (offsets >> 3)
+    bit = np.left_shift(1, offsets & 7).astype(np.uint8)
+    recorded = np.zeros(ends[-1], dtype=np.uint8)
+    np.bitwise_or.at(recorded, byte_index, bit)
+    attended = np.zeros(ends[-1], dtype=np.uint8)
+    np.bitwise_or.at(attended, byte_index[present], bit[present])
+    present_counts = np.add.reduceat(present.astype(np.int64), starts)
+
+    recorded, attended = recorded.tobytes(), attended.tobytes()
+    return [
+        {
+            'enrollment_id': int(enrollment_ids[first]),
+            'start_date': date.fromordinal(int(ordinals[first])),
+            'recorded': recorded[end - width:end],
+            'present': attended[end - width:end],
+            'recorded_count': int(count),
+            'present_count': int(present_count),
+        }
+        for first, end, width, count, present_count
+        in zip(starts, ends, widths, counts, present_counts)
+    ]
+
+
+def store(bitmap, recorded, present):
+    """Save `bitmap` with new bitset ints, rebased onto its first recorded day."""
+    if not recorded:
+        bitmap.delete()
+        return
+    # Position of the lowest set bit
+    shift = (recorded & -recorded).bit_length() - 1
+    recorded >>= shift
+    present >>= shift
+    bitmap.start_date += timedelta(days=shift)
+    bitmap.recorded = to_bytes(recorded)
+    bitmap.present = to_bytes(present, len(bitmap.recorded))
+    bitmap.recorded_count = recorded.bit_count()
+    bitmap.present_count = present.bit_count()
+    bitmap.save()
+
+
+def record(enrollment_id, day, present):
+    """Set (or overwrite) the attendance of `enrollment_id` on `day`."""
+    with transaction.atomic():
+        # INSERT ... ON CONFLICT DO NOTHING, so that concurrent first
+        # records of an enrollment both end up locking the same row
+        AttendanceBitmap.objects.bulk_create(
+            [AttendanceBitmap(enrollment_id=enrollment_id, start_date=day)],
+            ignore_conflicts=True
+        )
+        bitmap = AttendanceBitmap.objects.select_for_update().get(enrollment_id=enrollment_id)
+        recorded, attended = to_int(bitmap.recorded), to_int(bitmap.present)
+        offset = (day - bitmap.start_date).days
+        if offset < 0:
+            # A day before the first one; make it the new bit 0
+            recorded <<= -offset
+            attended <<= -offset
+            bitmap.start_date = day
+            offset = 0
+        recorded |= 1 << offset
+        attended = attended | (1 << offset) if present else attended & ~(1 << offset)
+        store(bitmap, recorded, attended)
+
+
+def forget(enrollment_id, day):
+    """Clear the attendance of `enrollment_id` on `day`, if it was recorded."""
+    with transaction.atomic():
+        # Missing while its enrollment is being deleted; do not recreate it
+        bitmap = AttendanceBitmap.objects.select_for_update().filter(
+            enrollment_id=enrollment_id
+        ).first()
+        if bitmap is None:
+            return
+        offset = (day - bitmap.start_date).days
+        if offset < 0:
+            return
+        mask = ~(1 << offset)
+        store(bitmap, to_int(bitmap.recorded) & mask, to_int(bitmap.present) & mask)
+
+
+def summary(bitmap, start=None, end=None):
+    """Attendance rate and streaks of a bitmap (or None) between two dates.
+
+    Both bounds are inclusive and optional. Streaks count consecutive
+    recorded classes attended: the longest one, and the one running at
+    the last recorded class.
+    """
+    result = {
+        'recorded': 0, 'present': 0, 'attendance_rate': None,
+        'longest_streak': 0, 'current_streak': 0,
+    }
+    if bitmap is None:
+        return result
+    recorded, attended = to_int(bitmap.recorded), to_int(bitmap.present)
+    low = 0 if start is None else max((start - bitmap.start_date).days, 0)
+    high = recorded.bit_length() if end is None else (end - bitmap.start_date).days + 1
+    if high <= low:
+        return result
+    window = ((1 << (high - low)) - 1) << low
+    recorded &= window
+    attended &= window
+    result['recorded'] = recorded.bit_count()
+    result['present'] = attended.bit_count()
+    if not result['recorded']:
+        return result
+    result['attendance_rate'] = result['present'] / result['recorded']
+
+    # Attendance flags of the recorded classes, in date order
+    recorded_bits = to_bytes(recorded)
+    days = np.unpackbits(
+        np.frombuffer(recorded_bits, dtype=np.uint8), bitorder='little'
+    ).astype(bool)
+    flags = np.unpackbits(
+        np.frombuffer(to_bytes(attended, len(recorded_bits)), dtype=np.uint8),
+        bitorder='little'
+    ).astype(bool)[days]
+    absences = np.flatnonzero(~flags)
+    # Runs of attended classes lie between consecutive absences
+    gaps = np.diff(np.concatenate(([-1], absences, [flags.size]))) - 1
+    result['longest_streak'] = int(gaps.max())
+    result['current_streak'] = int(gaps[-1])
+    return result
+
+
+def rebuild(enrollment_ids=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Replace the stored bitmaps with ones packed from AttendanceRecord.
+
+    Returns the number of bitmaps written.
+    """
+    enrollments = Enrollment.objects.order_by('pk')
+    if enrollment_ids is not None:
+        enrollments = enrollments.filter(pk__in=enrollment_ids)
+    written = 0
+    for chunk in chunked(list(enrollments.values_list('pk', flat=True)), batch_size):
+        rows = list(
+            AttendanceRecord.objects.filter(enrollment_id__in=chunk)
+            .values_list('enrollment_id', 'date', 'present')
+        )
+        bitmaps = [
+            AttendanceBitmap(**fields) for fields in pack(
+                [row[0] for row in rows], [row[1].toordinal() for row in rows],
+                [row[2] for row in rows]
+            )
+        ]
+        with transaction.atomic():
+            AttendanceBitmap.objects.filter(enrollment_id__in=chunk).delete()
+            AttendanceBitmap.objects.bulk_create(bitmaps, batch_size=batch_size)
+        written += len(bitmaps)
+    return written
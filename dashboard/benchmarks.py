@@ -0,0 +1,285 @@
+"""API and data pipeline benchmarks, compared against a stored baseline.
+
+Each API case requests one URL `repeat` times with an empty cache and
+records the p50 and p95 latency and the most queries any request ran.
+Pipeline cases time ``data/process_data.py``'s encoding, the
+``import_data`` command over a synthetic raw file and the percentile
+rank engines, as rows per second.
+A large student list page is also timed on both list paths of
+``dashboard.fast_list``, and the ``.values()`` path must beat the
+serializer by FAST_LIST_SPEEDUP. Results are keyed by dataset size and
+then by case, so that runs at several sizes expose work that grows with
+the data: a list or detail endpoint whose query count changes with the
+size has an N+1 pattern, and one whose p50 grows more than LATENCY_GROWTH
+times as fast as the data does work superlinear in it.
+"""
+import os
+import time
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlencode
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.pagination import PageNumberPagination
+
+from . import synthetic
+from .fast_list import FastListMixin
+from .models import Student
+from .percentiles import percentile_ranks, student_percentile_ranks
+from .urls import router
+
+IMPORT_ENGINES = ['orm', 'copy']
+# Rows requested at once from list actions such as performance_summaries
+ACTION_BATCH = 100
+# Parameters of list actions that take something other than ids
+ACTION_PARAMS = {
+    'student-cohorts': {'dimensions': 'gender,race_ethnicity,lunch_type'},
+    'student-score-percentile': {'subject': 'math', 'score': 70},
+}
+
+# Student list page timed on both list paths, and the speedup the
+# .values() path must reach on it
+LIST_PAGE_SIZE = 2000
+FAST_LIST_SPEEDUP = 2
+
+# Between two sizes, the p50 of a case may grow this many times faster
+# than the data before it is reported
+LATENCY_GROWTH = 2
+
+# Metrics that regress by growing, and those that regress by shrinking
+LOWER_IS_BETTER = ('p50_ms', 'p95_ms')
+HIGHER_IS_BETTER = ('rows_per_second',)
+
+
+def latency_summary(seconds, queries):
+    samples = np.array(seconds) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(samples, 50)), 3),
+        'p95_ms': round(float(np.percentile(samples, 95)), 3),
+        'queries': max(queries),
+    }
+
+
+def filter_value(model, field):
+    """A value of `field` present in the table, as a query parameter."""
+    value = model.objects.order_by('pk').values_list(field, flat=True).first()
+    return str(value).lower() if isinstance(value, bool) else str(value)
+
+
+def endpoint_cases():
+    """(name, url) of the list, filter, ordering, detail and custom action requests.
+
+    Every registered viewset is covered. Filters and details use the
+    first row of the table, and list actions ACTION_PARAMS or else the
+    first ACTION_BATCH ids;
+    actions taking URL arguments, such as the exports, are left out.
+    """
+    cases = []
+    for prefix, viewset, basename in router.registry:
+        model = viewset.queryset.model
+        pk = model.objects.order_by('pk').values_list('pk', flat=True).first()
+        list_url = reverse(f'{basename}-list')
+        cases.append((f'{prefix} list', list_url))
+        for field in list(getattr(viewset, 'filterset_fields', []))[:1]:
+            if pk is not None:
+                params = urlencode({field: filter_value(model, field)})
+                cases.append((f'{prefix} filter {field}', f'{list_url}?{params}'))
+        for field in getattr(viewset, 'ordering_fields', [])[:1]:
+            cases.append((f'{prefix} ordering -{field}', f'{list_url}?ordering=-{field}'))
+        if pk is not None:
+            cases.append((f'{prefix} detail', reverse(f'{basename}-detail', args=[pk])))
+
+        for extra in viewset.get_extra_actions():
+            if '(?P<' in extra.url_path:
+                continue
+            name = f'{basename}-{extra.url_name}'
+            if extra.detail:
+                if pk is not None:
+                    cases.append((f'{prefix} {extra.url_name}', reverse(name, args=[pk])))
+            elif name in ACTION_PARAMS:
+                params = urlencode(ACTION_PARAMS[name])
+                cases.append((f'{prefix} {extra.url_name}', f'{reverse(name)}?{params}'))
+            else:
+                ids = model.objects.order_by('pk').values_list('pk', flat=True)[:ACTION_BATCH]
+                params = urlencode({'ids': ','.join(map(str, ids))})
+                cases.append((f'{prefix} {extra.url_name}', f'{reverse(name)}?{params}'))
+    return cases
+
+
+def time_requests(client, url, repeat):
+    """Latency summary of requesting `url` `repeat` times with an empty cache."""
+    seconds, queries = [], []
+    for _ in range(repeat):
+        # Cached responses would hide the queries being measured
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            seconds.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} returned {response.status_code}')
+        queries.append(len(captured))
+    return latency_summary(seconds, queries)
+
+
+def benchmark_endpoints(repeat):
+    """Latency and query counts of every case in `endpoint_cases`."""
+    client = Client()
+    return {name: time_requests(client, url, repeat) for name, url in endpoint_cases()}
+
+
+def list_path_case(path):
+    return f'students list page of {LIST_PAGE_SIZE} {path} path'
+
+
+def benchmark_list_paths(repeat):
+    """Latency of a large student list page served from .values() rows and by the serializer."""
+    client = Client()
+    results = {}
+    with mock.patch.object(PageNumberPagination, 'page_size', LIST_PAGE_SIZE):
+        for path, fast in (('fast', True), ('regular', False)):
+            with mock.patch.object(FastListMixin, 'fast_list', fast):
+                results[list_path_case(path)] = time_requests(
+                    client, reverse('student-list'), repeat
+                )
+    return results
+
+
+def raw_frame(size, seed=0):
+    """`size` synthetic students in the layout of data/raw/StudentsPerformance.csv."""
+    students = synthetic.generate_students(size, np.random.default_rng(seed))
+    return pd.DataFrame({
+        'gender': np.where(students['gender'] == 'M', 'male', 'female'),
+        'race/ethnicity': np.char.add('group ', students['race_ethnicity']),
+        'parental level of education': students['parental_education'],
+        'lunch': students['lunch_type'],
+        'test preparation course': students['test_preparation'],
+        'math score': students['math_score'],
+        'reading score': students['reading_score'],
+        'writing score': students['writing_score'],
+    })
+
+
+def throughput(rows, seconds):
+    return {'seconds': round(seconds, 3), 'rows_per_second': round(rows / seconds, 1)}
+
+
+def benchmark_pipeline(size, directory):
+    """Time processing a raw file of `size` rows and importing the result.
+
+    The students of each import are deleted again afterwards.
+    """
+    # data/ is a plain directory of scripts, importable as a namespace package
+    from data import process_data
+
+    raw_path = os.path.join(directory, f'raw_{size}.csv')
+    csv_path = os.path.join(directory, f'processed_{size}.csv')
+    columnar_path = os.path.join(directory, f'processed_{size}.cols')
+    raw_frame(size).to_csv(raw_path, index=False)
+
+    results = {}
+    start = time.perf_counter()
+    chunks = process_data.clean_chunks([process_data.load_data(raw_path)])
+    process_data.write_chunks(process_data.categorize_chunks(chunks), csv_path, columnar_path)
+    results['process_data'] = throughput(size, time.perf_counter() - start)
+
+    existing = Student.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for engine in IMPORT_ENGINES:
+        for label, path in (('csv', csv_path), ('columnar', columnar_path)):
+            start = time.perf_counter()
+            call_command('import_data', file=path, engine=engine, stdout=StringIO())
+            results[f'import_data {label} {engine}'] = throughput(
+                size, time.perf_counter() - start
+            )
+            Student.objects.filter(pk__gt=existing).delete()
+    return results
+
+
+def benchmark_percentiles(size, seed=0):
+    """Time ranking `size` students, and `size` arbitrary floats."""
+    rng = np.random.default_rng(seed)
+    scores = [rng.integers(0, 101, size=size) for _ in range(3)]
+    values = rng.normal(70, 15, size=size)
+
+    results = {}
+    start = time.perf_counter()
+    student_percentile_ranks(*scores)
+    results['percentile ranks students'] = throughput(size, time.perf_counter() - start)
+    start = time.perf_counter()
+    percentile_ranks(values)
+    results['percentile ranks floats'] = throughput(size, time.perf_counter() - start)
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """Metrics of `results` worse than `baseline` by more than `tolerance`.
+
+    Timings may be off by the `tolerance` fraction either way; query
+    counts must not grow at all. Cases missing from the baseline are not
+    compared. Returns one message per regression.
+    """
+    found = []
+    for size, cases in results.items():
+        for case, metrics in cases.items():
+            expected = baseline.get(size, {}).get(case)
+            if expected is None:
+                continue
+            for metric, value in metrics.items():
+                if metric not in expected:
+                    continue
+                limit = expected[metric]
+                if metric in LOWER_IS_BETTER:
+                    worse = value > limit * (1 + tolerance)
+                elif metric in HIGHER_IS_BETTER:
+                    worse = value < limit / (1 + tolerance)
+                else:
+                    worse = metric == 'queries' and value > limit
+                if worse:
+                    found.append(f'{case} at {size} rows: {metric} {value} (baseline {limit})')
+    return found
+
+
+def list_path_problems(results):
+    """Sizes at which the fast list path is not FAST_LIST_SPEEDUP times faster."""
+    found = []
+    for size, cases in results.items():
+        fast, regular = cases.get(list_path_case('fast')), cases.get(list_path_case('regular'))
+        if fast and regular and fast['p50_ms'] * FAST_LIST_SPEEDUP > regular['p50_ms']:
+            found.append(
+                f'{list_path_case("fast")} at {size} rows: p50_ms {fast["p50_ms"]} is not '
+                f'{FAST_LIST_SPEEDUP}x faster than the regular path ({regular["p50_ms"]})'
+            )
+    return found
+
+
+def scaling_problems(results):
+    """Cases whose query count changes, or whose p50 outgrows the data, across sizes."""
+    sizes = sorted(results, key=int)
+    found = []
+    for case, metrics in results[sizes[0]].items():
+        if 'queries' in metrics:
+            counts = [results[size].get(case, {}).get('queries') for size in sizes]
+            if len(set(counts)) > 1:
+                pairs = ', '.join(f'{count} at {size}' for size, count in zip(sizes, counts))
+                found.append(f'{case}: queries grow with the data ({pairs})')
+        if 'p50_ms' in metrics:
+            for smaller, larger in zip(sizes, sizes[1:]):
+                before = results[smaller].get(case, {}).get('p50_ms')
+                after = results[larger].get(case, {}).get('p50_ms')
+                if not before or after is None:
+                    continue
+                if after / before > LATENCY_GROWTH * int(larger) / int(smaller):
+                    found.append(
+                        f'{case}: p50_ms grows faster than the data '
+                        f'({before} at {smaller}, {after} at {larger})'
+                    )
+    return found
@@ -0,0 +1,135 @@
+"""Response cache for the per-object analytics actions.
+
+Entries are keyed per action and object, e.g. ``course_stats`` for course
+42. Each key also has a version token that the signal handlers in
+``dashboard.signals`` replace whenever a row the result was computed from
+changes; entries stored under an older token are never served again. A
+recomputation that races with such a change stores its result under the
+token it started with, so it cannot resurrect outdated data either.
+
+Entries carry a soft expiry as well. A request that finds an expired
+entry takes a short lock and recomputes it while concurrent requests keep
+getting the stale value. The lock holds a token of its owner, which only
+releases the lock if it has not expired and been taken by another
+request. On a miss, requests that lose the race for the lock wait
+briefly for the winner instead of all hitting the database.
+
+Results computed from a whole table rather than one object, such as the
+student cohorts, key their entries on a data-version counter of that
+table instead. Any change to the table bumps the counter, which moves
+every such result to a new key at once.
+"""
+import time
+import uuid
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'dashboard:analytics'
+# Seconds an entry is served without recomputation
+FRESH_SECONDS = 60
+# Seconds an expired entry may still be served while it is being refreshed
+STALE_SECONDS = 600
+# Upper bound on one recomputation; the lock is released after this anyway
+LOCK_SECONDS = 30
+# How long a request waits for another one to fill a cold entry
+WAIT_SECONDS = 2.0
+WAIT_INTERVAL = 0.05
+
+
+def cache_key(action, pk):
+    return f'{KEY_PREFIX}:{action}:{pk}'
+
+
+def version_key(action, pk):
+    return f'{cache_key(action, pk)}:version'
+
+
+def lock_key(action, pk):
+    return f'{cache_key(action, pk)}:lock'
+
+
+def data_version_key(name):
+    return f'{KEY_PREFIX}:{name}:data_version'
+
+
+def data_version(name):
+    """Current value of the `name` data-version counter."""
+    # Counters start from the clock, so one that was evicted and starts
+    # over does not repeat the values of older entries
+    return cache.get_or_set(data_version_key(name), time.time_ns, timeout=None)
+
+
+def bump_data_version(name):
+    """Move every result keyed on the `name` data version to a new key."""
+    key = data_version_key(name)
+    cache.add(key, time.time_ns(), timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted since the add
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_or_compute(action, pk, compute):
+    """Return the cached result of `compute()` for this action and object."""
+    key = cache_key(action, pk)
+    version, entry = _lookup(action, pk)
+    if entry is not None and entry['fresh_until'] > time.time():
+        return entry['data']
+
+    lock = lock_key(action, pk)
+    token = uuid.uuid4().hex
+    if cache.add(lock, token, LOCK_SECONDS):
+        try:
+            return _store(key, compute(), version)
+        finally:
+            _release(lock, token)
+
+    if entry is not None:
+        # Someone else is refreshing it; the stale copy will do until then
+        return entry['data']
+
+    deadline = time.monotonic() + WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        _, entry = _lookup(action, pk)
+        if entry is not None:
+            return entry['data']
+    return compute()
+
+
+def invalidate(action, *pks):
+    """Stop serving the cached results of `action` for the given objects."""
+    token = uuid.uuid4().hex
+    cache.set_many(
+        {version_key(action, pk): token for pk in set(pks) if pk is not None},
+        timeout=None
+    )
+
+
+def _lookup(action, pk):
+    """Current version token and the entry stored under it, if any."""
+    key = cache_key(action, pk)
+    found = cache.get_many([key, version_key(action, pk)])
+    version = found.get(version_key(action, pk))
+    entry = found.get(key)
+    if entry is not None and entry['version'] != version:
+        entry = None
+    return version, entry
+
+
+def _release(lock, token):
+    """Delete `lock` unless it expired and another request has taken it since."""
+    # The cache API has no compare-and-delete; the window between the two
+    # calls is far shorter than the LOCK_SECONDS a slow recomputation spans
+    if cache.get(lock) == token:
+        cache.delete(lock)
+
+
+def _store(key, data, version):
+    cache.set(
+        key,
+        {'data': data, 'version': version, 'fresh_until': time.time() + FRESH_SECONDS},
+        FRESH_SECONDS + STALE_SECONDS
+    )
+    return data
@@ -0,0 +1,102 @@
+"""Score statistics of student cohorts at several rollup levels in one query.
+
+A cohort is the set of students sharing the values of some demographic
+dimensions, e.g. ``gender`` and ``lunch_type``. The requested grouping
+sets, or the CUBE of the requested dimensions, are computed by a single
+``GROUP BY GROUPING SETS`` / ``CUBE`` query, so PostgreSQL reads the
+students once for every rollup level. ``GROUPING()`` tells the levels
+apart, since a rolled-up dimension comes back as NULL.
+"""
+from django.db import connection
+
+DIMENSIONS = [
+    'gender', 'race_ethnicity', 'parental_education', 'lunch_type', 'test_preparation'
+]
+SCORES = {
+    'math': 'math_score',
+    'reading': 'reading_score',
+    'writing': 'writing_score',
+    'average': None,
+}
+QUANTILES = {'p25': 0.25, 'median': 0.5, 'p75': 0.75}
+
+
+def score_expression(name):
+    quote = connection.ops.quote_name
+    if SCORES[name] is not None:
+        return f'{quote(SCORES[name])}::float8'
+    return '({} + {} + {})::float8 / 3'.format(
+        quote('math_score'), quote('reading_score'), quote('writing_score')
+    )
+
+
+def grouping_clause(grouping_sets, cube):
+    quote = connection.ops.quote_name
+    if cube is not None:
+        return f'CUBE ({", ".join(quote(dimension) for dimension in cube)})'
+    return 'GROUPING SETS ({})'.format(', '.join(
+        f'({", ".join(quote(dimension) for dimension in grouping_set)})'
+        for grouping_set in grouping_sets
+    ))
+
+
+def cohort_statistics(students, grouping_sets=None, cube=None):
+    """Count, mean, stddev and quartiles of each score per cohort.
+
+    `students` is a Student queryset to compute over. Pass either
+    `grouping_sets`, a list of dimension lists (``[]`` is the grand
+    total), or `cube`, a dimension list whose every subset is a grouping
+    set. Returns one dict per cohort, ordered by rollup level with the
+    grand total first; its `group` holds the values of the dimensions it
+    is grouped by.
+    """
+    dimensions = cube if cube is not None else sorted(
+        {dimension for grouping_set in grouping_sets for dimension in grouping_set},
+        key=DIMENSIONS.index
+    )
+    quote = connection.ops.quote_name
+    subquery, params = students.order_by().values(
+        *dimensions, 'math_score', 'reading_score', 'writing_score'
+    ).query.sql_with_params()
+
+    columns = [quote(dimension) for dimension in dimensions]
+    # Bit i, counted from the right, is set when dimensions[-1 - i] is rolled up
+    grouping = f'GROUPING({", ".join(columns)})' if columns else '0'
+    aggregates = []
+    for name in SCORES:
+        score = score_expression(name)
+        aggregates += [
+            f'AVG({score})',
+            f'STDDEV_SAMP({score})',
+            'PERCENTILE_CONT(ARRAY[{}]) WITHIN GROUP (ORDER BY {})'.format(
+                ', '.join(str(fraction) for fraction in QUANTILES.values()), score
+            ),
+        ]
+    sql = (
+        f'SELECT {grouping}, {"".join(f"{column}, " for column in columns)}COUNT(*), '
+        f'{", ".join(aggregates)} FROM ({subquery}) AS students '
+        f'GROUP BY {grouping_clause(grouping_sets, cube)} '
+        f'ORDER BY 1 DESC{"".join(f", {column}" for column in columns)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    cohorts = []
+    for row in rows:
+        rolled_up, values, count = row[0], row[1:len(columns) + 1], row[len(columns) + 1]
+        cohort = {
+            'group': {
+                dimension: value
+                for position, (dimension, value) in enumerate(zip(dimensions, values))
+                if not rolled_up >> (len(dimensions) - 1 - position) & 1
+            },
+            'count': count,
+        }
+        statistics = row[len(columns) + 2:]
+        for index, name in enumerate(SCORES):
+            mean, stddev, quantiles = statistics[3 * index:3 * index + 3]
+            cohort[name] = {'mean': mean, 'stddev': stddev}
+            cohort[name].update(zip(QUANTILES, quantiles or [None] * len(QUANTILES)))
+        cohorts.append(cohort)
+    return cohorts
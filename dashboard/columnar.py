@@ -0,0 +1,153 @@
+"""Typed columnar container for the processed student data.
+
+A file holds a short magic string, a JSON schema header and then each
+column as one contiguous, 64-byte aligned block of fixed-width values::
+
+    b'NSCOLS\\n' | uint32 header length | JSON header | column blocks
+
+The header records the format version, the row count and, per column,
+its name, NumPy dtype, byte offset from the start of the (aligned) data
+section and, for categorical columns, the vocabulary its integer codes
+index into. Columns are read back with ``np.memmap``, so opening a file
+costs nothing and only the pages that are actually touched are read.
+Only NumPy is needed on either side.
+"""
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b'NSCOLS\n'
+VERSION = 1
+ALIGNMENT = 64
+
+
+class Column:
+    """One column of a columnar file: memory-mapped values plus vocabulary."""
+
+    def __init__(self, name, values, categories=None):
+        self.name = name
+        self.values = values
+        self.categories = categories
+
+    def decode(self, start=0, stop=None):
+        """Values in ``[start, stop)``, with category codes mapped back to labels."""
+        values = self.values[start:stop]
+        if self.categories is None:
+            return values
+        return np.asarray(self.categories, dtype=object)[values]
+
+
+class ColumnWriter:
+    """Write a columnar file from chunks of columns, in bounded memory.
+
+    `schema` lists ``(name, dtype, categories)`` triples, with `categories`
+    None for plain columns. Each appended chunk is spilled to a temporary
+    file per column; `close` writes the header and concatenates them.
+    """
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = [(name, np.dtype(dtype), categories) for name, dtype, categories in schema]
+        self.rows = 0
+        self.spills = {
+            name: tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path)))
+            for name, _, _ in self.schema
+        }
+
+    def append(self, columns):
+        """Append equal-length arrays, keyed by column name."""
+        lengths = {len(columns[name]) for name, _, _ in self.schema}
+        if len(lengths) != 1:
+            raise ValueError('All columns in a chunk must have the same length')
+        for name, dtype, _ in self.schema:
+            values = np.asarray(columns[name])
+            if values.size and dtype.kind in 'iu':
+                limits = np.iinfo(dtype)
+                if values.min() < limits.min or values.max() > limits.max:
+                    raise ValueError(f'Column {name} does not fit in {dtype}')
+            self.spills[name].write(values.astype(dtype, copy=False).tobytes())
+        self.rows += lengths.pop()
+
+    def close(self):
+        header = {'version': VERSION, 'rows': self.rows, 'columns': []}
+        offset = 0
+        for name, dtype, categories in self.schema:
+            header['columns'].append({
+                'name': name,
+                'dtype': dtype.str,
+                'offset': offset,
+                'categories': categories,
+            })
+            offset = _align(offset + dtype.itemsize * self.rows)
+        encoded = _encode(header)
+        data_start = _align(len(MAGIC) + 4 + len(encoded))
+
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(encoded)))
+            f.write(encoded)
+            for column in header['columns']:
+                f.write(b'\0' * (data_start + column['offset'] - f.tell()))
+                spill = self.spills[column['name']]
+                spill.seek(0)
+                while block := spill.read(1 << 20):
+                    f.write(block)
+                spill.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for spill in self.spills.values():
+                spill.close()
+
+
+def is_columnar(path):
+    """Whether `path` starts with the columnar file magic."""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_header(path):
+    """Return the JSON header of a columnar file and where its data starts."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a columnar data file')
+        (length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(length))
+    if header['version'] != VERSION:
+        raise ValueError(
+            f'{path} uses columnar format version {header["version"]}, expected {VERSION}'
+        )
+    return header, _align(len(MAGIC) + 4 + length)
+
+
+def read_columns(path):
+    """Memory-map every column of a columnar file, keyed by name."""
+    header, data_start = read_header(path)
+    columns = {}
+    for column in header['columns']:
+        dtype = np.dtype(column['dtype'])
+        if header['rows']:
+            values = np.memmap(
+                path, dtype=dtype, mode='r',
+                offset=data_start + column['offset'], shape=(header['rows'],)
+            )
+        else:
+            values = np.empty(0, dtype=dtype)
+        columns[column['name']] = Column(column['name'], values, column['categories'])
+    return columns
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _encode(header):
+    return json.dumps(header, separators=(',', ':')).encode()
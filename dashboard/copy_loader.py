@@ -0,0 +1,65 @@
+"""Bulk loading through PostgreSQL ``COPY FROM STDIN``.
+
+``COPY`` skips the per-row INSERT planning the ORM path pays for, but it
+cannot hand generated primary keys back. Callers that need them reserve a
+block of ids from the table's sequence first and copy them in explicitly.
+"""
+import csv
+import io
+
+
+def copy_supported(connection):
+    """Whether `connection` can stream rows with psycopg2's ``copy_expert``."""
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return not is_psycopg3
+
+
+def reserve_ids(cursor, model, count):
+    """Draw `count` primary keys for `model` from its id sequence."""
+    cursor.execute(
+        'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+        [model._meta.db_table, model._meta.pk.column, count]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+class CopyBuffer:
+    """In-memory CSV buffer that is filled one row at a time."""
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator='\n')
+        self.rows = 0
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.rows += 1
+
+    def rewind(self):
+        self.buffer.seek(0)
+        return self.buffer
+
+
+def copy_rows(cursor, model, fields, rows):
+    """Stream `rows` (tuples ordered like `fields`) into `model`'s table.
+
+    Returns the number of rows copied.
+    """
+    opts = model._meta
+    columns = ', '.join(
+        cursor.db.ops.quote_name(opts.get_field(name).column) for name in fields
+    )
+    buffer = CopyBuffer()
+    for row in rows:
+        buffer.write(row)
+    if not buffer.rows:
+        return 0
+
+    cursor.copy_expert(
+        f'COPY {cursor.db.ops.quote_name(opts.db_table)} ({columns}) '
+        'FROM STDIN WITH (FORMAT csv)',
+        buffer.rewind()
+    )
+    return buffer.rows
@@ -0,0 +1,170 @@
+"""Maintenance of the CourseStatistics rollup.
+
+Every enrollment and assessment contributes a fixed amount to its course's
+running counts and sums. Saves and deletes apply the difference between
+the old and new contribution with a single ``UPDATE ... SET x = x + d``,
+so concurrent writers never lose each other's changes. `rebuild` and
+`inconsistencies` recompute the same totals from the live tables.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Now
+
+from .models import Assessment, CourseStatistics, Enrollment
+
+PASSING_GRADE = 60
+TOTAL_FIELDS = [
+    'enrollment_count', 'graded_count', 'passing_count', 'grade_sum',
+    'assessment_count', 'assessment_score_sum'
+]
+
+
+def as_decimal(value):
+    # Unsaved instances may still hold the float they were created with
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def enrollment_totals(final_grade):
+    """What one enrollment with this final grade adds to its course."""
+    if final_grade is None:
+        return {'enrollment_count': 1}
+    final_grade = as_decimal(final_grade)
+    return {
+        'enrollment_count': 1,
+        'graded_count': 1,
+        'passing_count': int(final_grade >= PASSING_GRADE),
+        'grade_sum': final_grade,
+    }
+
+
+def assessment_totals(score):
+    """What one assessment with this score adds to its course."""
+    return {'assessment_count': 1, 'assessment_score_sum': as_decimal(score)}
+
+
+def apply_change(course_id, old=None, new=None, create=True):
+    """Move a course's totals from contribution `old` to contribution `new`.
+
+    Either side may be None for a row that is being created or deleted.
+    Missing statistics rows are created only if `create` is set: while a
+    course is being deleted its row must not come back.
+    """
+    if course_id is None:
+        return
+    old, new = old or {}, new or {}
+    deltas = {
+        field: new.get(field, 0) - old.get(field, 0)
+        for field in set(old) | set(new)
+    }
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    updated = CourseStatistics.objects.filter(course_id=course_id).update(
+        updated_at=Now(), **updates
+    )
+    if not updated and create:
+        CourseStatistics.objects.get_or_create(course_id=course_id)
+        CourseStatistics.objects.filter(course_id=course_id).update(
+            updated_at=Now(), **updates
+        )
+
+
+def live_totals(course_ids=None):
+    """Totals per course computed from Enrollment and Assessment directly."""
+    enrollments = Enrollment.objects.all()
+    assessments = Assessment.objects.all()
+    if course_ids is not None:
+        enrollments = enrollments.filter(course_id__in=course_ids)
+        assessments = assessments.filter(enrollment__course_id__in=course_ids)
+
+    totals = {}
+    for row in enrollments.values('course_id').annotate(
+        enrollment_count=Count('id'),
+        graded_count=Count('final_grade'),
+        passing_count=Count('id', filter=Q(final_grade__gte=PASSING_GRADE)),
+        grade_sum=Sum('final_grade'),
+    ).order_by():
+        course_id = row.pop('course_id')
+        row['grade_sum'] = row['grade_sum'] or Decimal(0)
+        totals[course_id] = {**dict.fromkeys(TOTAL_FIELDS, 0), **row}
+
+    for row in assessments.values('enrollment__course_id').annotate(
+        assessment_count=Count('id'),
+        assessment_score_sum=Sum('score'),
+    ).order_by():
+        course_id = row.pop('enrollment__course_id')
+        totals.setdefault(course_id, dict.fromkeys(TOTAL_FIELDS, 0)).update(row)
+
+    for course_totals in totals.values():
+        course_totals['grade_sum'] = Decimal(course_totals['grade_sum'])
+        course_totals['assessment_score_sum'] = Decimal(course_totals['assessment_score_sum'])
+    return totals
+
+
+def stored_totals(course_ids=None):
+    """Totals per course as currently stored in CourseStatistics."""
+    rows = CourseStatistics.objects.all()
+    if course_ids is not None:
+        rows = rows.filter(course_id__in=course_ids)
+    return {
+        row.pop('course_id'): row
+        for row in rows.values('course_id', *TOTAL_FIELDS)
+    }
+
+
+def rebuild(course_ids=None):
+    """Replace the stored statistics with freshly aggregated ones.
+
+    Returns the number of statistics rows written.
+    """
+    totals = live_totals(course_ids)
+    with transaction.atomic():
+        stale = CourseStatistics.objects.all()
+        if course_ids is not None:
+            stale = stale.filter(course_id__in=course_ids)
+        stale.delete()
+        CourseStatistics.objects.bulk_create([
+            CourseStatistics(course_id=course_id, **course_totals)
+            for course_id, course_totals in totals.items()
+        ], batch_size=1000)
+    return len(totals)
+
+
+def inconsistencies(course_ids=None):
+    """Courses whose stored totals differ from the live aggregates.
+
+    Returns ``{course_id: (stored, live)}``; a course with no enrollments
+    or assessments may either have no row or an all-zero one.
+    """
+    empty = dict.fromkeys(TOTAL_FIELDS, 0)
+    live = live_totals(course_ids)
+    stored = stored_totals(course_ids)
+    mismatched = {}
+    for course_id in set(live) | set(stored):
+        expected = live.get(course_id, empty)
+        actual = stored.get(course_id, empty)
+        if any(expected[field] != actual[field] for field in TOTAL_FIELDS):
+            mismatched[course_id] = (actual, expected)
+    return mismatched
+
+
+def course_summary(statistics):
+    """The `course_stats` response for a CourseStatistics row (None if the course has none)."""
+    if statistics is None:
+        statistics = CourseStatistics()
+    graded = statistics.graded_count
+    assessments = statistics.assessment_count
+    return {
+        'total_students': statistics.enrollment_count,
+        'grade_distribution': {
+            'avg_grade': statistics.grade_sum / graded if graded else None,
+            'passing_rate': statistics.passing_count / graded if graded else None,
+        },
+        'assessment_stats': {
+            'avg_score': statistics.assessment_score_sum / assessments if assessments else None,
+        },
+    }
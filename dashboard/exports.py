@@ -0,0 +1,84 @@
+"""Streaming bulk export for the API viewsets.
+
+``GET /api/<resource>/export/csv/`` and ``.../export/ndjson/`` stream the
+viewset's filtered queryset. Rows are fetched as tuples through a
+server-side cursor, ``EXPORT_CHUNK_SIZE`` at a time, and written out as
+they arrive, so the web worker's memory stays flat however many rows are
+exported. Only stored columns are exported; foreign keys appear as ids
+under the same names the serializers use.
+"""
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+
+EXPORT_CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def csv_lines(header, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_lines(header, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    encoder = DjangoJSONEncoder()
+    lines = []
+    for row in rows:
+        lines.append(encoder.encode(dict(zip(header, row))))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+WRITERS = {
+    'csv': csv_lines,
+    'ndjson': ndjson_lines,
+}
+
+
+class ExportMixin:
+    """Adds the ``export`` action to a model viewset."""
+    export_chunk_size = EXPORT_CHUNK_SIZE
+
+    @action(detail=False, url_path=r'export/(?P<export_format>csv|ndjson)')
+    def export(self, request, export_format=None):
+        fields = self.get_export_fields()
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .order_by('pk')
+            .values_list(*[field.attname for field in fields])
+            .iterator(chunk_size=self.export_chunk_size)
+        )
+        header = [field.name for field in fields]
+        response = StreamingHttpResponse(
+            WRITERS[export_format](header, rows, self.export_chunk_size),
+            content_type=CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.basename}.{export_format}"'
+        )
+        return response
+
+    def get_export_fields(self):
+        """Stored model fields that the serializer also exposes."""
+        exposed = self.get_serializer().fields
+        return [
+            field for field in self.get_queryset().model._meta.concrete_fields
+            if field.name in exposed
+        ]
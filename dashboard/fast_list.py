@@ -0,0 +1,103 @@
+"""Read-only fast path for the list endpoints.
+
+A ModelSerializer list builds a model instance per row and then looks up
+every field on it one by one. For plain column fields that work can be
+done once per serializer instead: `RowMapper` works out which
+``.values()`` key feeds each output field and which conversion, if any,
+it needs, and computed fields such as ``Student.average_score`` are
+annotated in SQL (see ``values_annotations`` on the serializers). The
+resulting dicts render to exactly the same JSON as the regular path.
+
+Serializers with fields the mapper cannot reproduce, such as nested
+``?expand=`` serializers, fall back to the regular path.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Fields whose to_representation returns database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField, serializers.CharField,
+    serializers.ChoiceField, serializers.IntegerField,
+)
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+class RowMapper:
+    """Serializes ``.values()`` rows the way `serializer` serializes instances."""
+
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        annotations = getattr(serializer, 'values_annotations', {})
+        self.annotations = {}
+        self.columns = []
+        for field in serializer._readable_fields:
+            if isinstance(field, serializers.BaseSerializer):
+                raise UnsupportedField(field.field_name)
+
+            if field.source in annotations:
+                key = field.source
+                self.annotations[key] = annotations[key]
+            else:
+                try:
+                    model_field = model._meta.get_field(field.source)
+                except FieldDoesNotExist:
+                    raise UnsupportedField(field.field_name)
+                if not model_field.concrete:
+                    raise UnsupportedField(field.field_name)
+                key = model_field.attname
+
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                convert = None if field.pk_field is None else field.pk_field.to_representation
+            elif isinstance(field, PASSTHROUGH_FIELDS):
+                convert = None
+            else:
+                convert = field.to_representation
+            self.columns.append((field.field_name, key, convert))
+
+    def values(self, queryset):
+        keys = [key for _, key, _ in self.columns if key not in self.annotations]
+        return queryset.values(*keys, **self.annotations)
+
+    def serialize(self, rows):
+        columns = self.columns
+        data = []
+        for row in rows:
+            item = {}
+            for name, key, convert in columns:
+                value = row[key]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
+
+
+class FastListMixin:
+    """Serves the list action through `RowMapper` whenever it can."""
+    fast_list = True
+    _row_mappers = {}
+
+    def list(self, request, *args, **kwargs):
+        mapper = self.get_row_mapper() if self.fast_list else None
+        if mapper is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = mapper.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(mapper.serialize(page))
+        return Response(mapper.serialize(rows))
+
+    def get_row_mapper(self):
+        if self.get_serializer_context().get('expand'):
+            return None
+        serializer_class = self.get_serializer_class()
+        if serializer_class not in self._row_mappers:
+            try:
+                mapper = RowMapper(serializer_class())
+            except UnsupportedField:
+                mapper = None
+            self._row_mappers[serializer_class] = mapper
+        return self._row_mappers[serializer_class]
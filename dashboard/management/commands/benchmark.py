@@ -0,0 +1,128 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment
+)
+from dashboard import benchmarks
+
+DEFAULT_SIZES = '1000,5000'
+DEFAULT_OUTPUT = 'benchmark_results.json'
+# A process-local cache, so runs neither need a Redis server nor touch its entries
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every API endpoint and the data pipeline on generated data '
+            'in a throwaway test database, and fail on regressions')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default=DEFAULT_SIZES,
+            help=f'Comma separated student counts to benchmark at (default: {DEFAULT_SIZES})'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Requests timed per endpoint and size (default: 20)'
+        )
+        parser.add_argument(
+            '--output',
+            default=DEFAULT_OUTPUT,
+            help=f'JSON file to write the results to (default: {DEFAULT_OUTPUT})'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON results of an earlier run to compare against'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Write the results to --baseline instead of comparing with it'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.5,
+            help='Share by which timings may be worse than the baseline (default: 0.5)'
+        )
+        parser.add_argument(
+            '--skip-pipeline',
+            action='store_true',
+            help='Only benchmark the API, not process_data.py, import_data and percentile ranks'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options['sizes'].split(',')})
+        except ValueError:
+            raise CommandError('--sizes must be comma separated integers')
+        if not sizes or sizes[0] < 1:
+            raise CommandError('--sizes must be positive')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be a positive integer')
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline needs --baseline')
+        self.verbosity = options['verbosity']
+
+        results = self.run(sizes, options['repeat'], not options['skip_pipeline'])
+        report = {'sizes': sizes, 'repeat': options['repeat'], 'results': results}
+        Path(options['output']).write_text(json.dumps(report, indent=2) + '\n')
+        self.stdout.write(f'Wrote results to {options["output"]}')
+
+        problems = benchmarks.list_path_problems(results)
+        if len(sizes) > 1:
+            problems += benchmarks.scaling_problems(results)
+        if options['save_baseline']:
+            Path(options['baseline']).write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(f'Saved baseline to {options["baseline"]}')
+        elif options['baseline']:
+            baseline = json.loads(Path(options['baseline']).read_text())['results']
+            problems += benchmarks.regressions(results, baseline, options['tolerance'])
+
+        for problem in problems:
+            self.stdout.write(self.style.ERROR(problem))
+        if problems:
+            raise CommandError(f'{len(problems)} benchmark regressions')
+        self.stdout.write(self.style.SUCCESS('No benchmark regressions'))
+
+    def run(self, sizes, repeat, pipeline):
+        """Results per size, measured in a test database that is dropped afterwards."""
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False)
+        results = {}
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES), \
+                    tempfile.TemporaryDirectory() as directory:
+                for size in sizes:
+                    call_command(
+                        'generate_data', replace=True, students=size,
+                        courses=max(size // 100, 10), stdout=StringIO()
+                    )
+                    results[str(size)] = benchmarks.benchmark_endpoints(repeat)
+                    results[str(size)].update(benchmarks.benchmark_list_paths(repeat))
+                    if pipeline:
+                        results[str(size)].update(
+                            benchmarks.benchmark_pipeline(size, directory)
+                        )
+                        results[str(size)].update(benchmarks.benchmark_percentiles(size))
+                    if self.verbosity >= 1:
+                        self.stdout.write(
+                            f'Benchmarked {len(results[str(size)])} cases at {size} students'
+                        )
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+        return results
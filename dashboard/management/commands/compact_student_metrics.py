@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from dashboard import snapshot_retention
+
+
+class Command(BaseCommand):
+    help = ('Thin out old StudentPerformanceMetrics snapshots, keeping the newest ones '
+            'of each student and one per period before that')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=snapshot_retention.DEFAULT_KEEP,
+            help='Snapshots of each student that are always kept '
+                 f'(default: {snapshot_retention.DEFAULT_KEEP})'
+        )
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=30,
+            metavar='DAYS',
+            help='Never delete snapshots taken in the last DAYS days (default: 30)'
+        )
+        parser.add_argument(
+            '--period',
+            choices=snapshot_retention.PERIODS + ['none'],
+            default='month',
+            help='Of the older snapshots, keep the newest per student in each period; '
+                 'none keeps only the --keep newest (default: month)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=snapshot_retention.DEFAULT_BATCH_SIZE,
+            help=f'Snapshots deleted per transaction '
+                 f'(default: {snapshot_retention.DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many snapshots would be deleted'
+        )
+
+    def handle(self, *args, **options):
+        if options['keep'] < 1:
+            raise CommandError('--keep must be at least 1, so every student keeps a snapshot')
+        if options['older_than'] < 0:
+            raise CommandError('--older-than cannot be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer')
+
+        before = timezone.now() - timedelta(days=options['older_than'])
+        period = None if options['period'] == 'none' else options['period']
+        if options['dry_run']:
+            count = snapshot_retention.expendable(options['keep'], before, period).count()
+            self.stdout.write(f'Would delete {count} snapshots')
+            return
+
+        deleted = snapshot_retention.compact(
+            options['keep'], before, period, options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} snapshots'))
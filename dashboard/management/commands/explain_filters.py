@@ -0,0 +1,203 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+from rest_framework.request import Request
+from dashboard.urls import router
+
+# Filter combinations the dashboard sends together, beyond single filters
+COMBINATIONS = {
+    'student': [
+        ['race_ethnicity', 'parental_education'],
+        ['race_ethnicity', 'parental_education', 'lunch_type', 'gender'],
+    ],
+    'enrollment': [['semester', 'year'], ['course', 'year']],
+    'assessment': [['enrollment', 'assessment_type']],
+    'attendancerecord': [['enrollment', 'date']],
+    'performancemetrics': [['semester', 'year']],
+}
+
+
+INDEX_SCANS = ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan')
+
+
+def plan_nodes(plan):
+    """Every node of an EXPLAIN (FORMAT JSON) plan tree."""
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def constrains(condition, column):
+    """Whether an EXPLAIN condition such as ``((gender)::text = 'F'::text)`` tests `column`."""
+    return re.search(rf'(?<!\w){re.escape(column)}\b', condition or '') is not None
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN the list query of each API endpoint under its typical filters '
+            'and orderings, and flag full scans of large tables and their indexes')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=10000,
+            help='Ignore full scans of tables with fewer rows (default: 10000)'
+        )
+        parser.add_argument(
+            '--max-selectivity',
+            type=float,
+            default=0.1,
+            help='Ignore full scans expected to return more than this share '
+                 'of the table, where an index would not help (default: 0.1)'
+        )
+        parser.add_argument(
+            '--no-seqscan',
+            action='store_true',
+            help='Plan with enable_seqscan off, so that on small development '
+                 'databases only access paths without a usable index show up'
+        )
+        parser.add_argument(
+            '--fail-on-seq-scan',
+            action='store_true',
+            help='Exit with an error if any full scan is flagged'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('explain_filters needs PostgreSQL')
+        self.min_rows = options['min_rows']
+        self.max_selectivity = options['max_selectivity']
+        self.verbosity = options['verbosity']
+        self.factory = RequestFactory()
+
+        with connection.cursor() as cursor:
+            if options['no_seqscan']:
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                flagged, explained = self.explain_routes()
+            finally:
+                if options['no_seqscan']:
+                    cursor.execute('RESET enable_seqscan')
+
+        summary = f'{flagged} of {explained} queries rely on full table or index scans'
+        if flagged and options['fail_on_seq_scan']:
+            raise CommandError(summary)
+        style = self.style.WARNING if flagged else self.style.SUCCESS
+        self.stdout.write(style(summary))
+
+    def explain_routes(self):
+        flagged = explained = 0
+        for prefix, viewset, basename in router.registry:
+            for params in self.representative_params(viewset, basename):
+                if params is None:
+                    continue
+                scans = self.full_scans(viewset, params)
+                label = f'{prefix}?{"&".join(f"{k}={v}" for k, v in params.items())}'
+                explained += 1
+                if scans:
+                    flagged += 1
+                    for scan, rows, total in scans:
+                        self.stdout.write(self.style.WARNING(
+                            f'{label}: {scan} (~{rows:,} of {total:,} rows)'
+                        ))
+                elif self.verbosity > 1:
+                    self.stdout.write(f'{label}: ok')
+        return flagged, explained
+
+    def representative_params(self, viewset, basename):
+        """Query parameters for each single filter, combination and ordering."""
+        fields = list(getattr(viewset, 'filterset_fields', []))
+        for combination in [[field] for field in fields] + COMBINATIONS.get(basename, []):
+            yield self.rarest_values(viewset.queryset.model, combination)
+        for field in getattr(viewset, 'ordering_fields', []):
+            yield {'ordering': field}
+            yield {'ordering': f'-{field}'}
+
+    def rarest_values(self, model, fields):
+        """The least common value combination of `fields`, as filter parameters.
+
+        That is the case an index is for; common values are better served
+        by a sequential scan anyway.
+        """
+        row = (
+            model.objects.values(*fields)
+            .annotate(matches=Count('pk'))
+            .order_by('matches')
+            .first()
+        )
+        if row is None:
+            return None
+        params = {}
+        for field in fields:
+            value = row[field]
+            params[field] = str(value).lower() if isinstance(value, bool) else str(value)
+        return params
+
+    def list_queryset(self, viewset, params):
+        """The page query the endpoint runs for these parameters."""
+        request = Request(self.factory.get('/', params))
+        view = viewset(request=request, args=(), kwargs={}, format_kwarg=None, action='list')
+        queryset = view.filter_queryset(view.get_queryset())
+        paginator = view.paginator
+        ordering = getattr(paginator, 'ordering', None)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset[:getattr(paginator, 'page_size', None) or 50]
+
+    def full_scans(self, viewset, params):
+        """Scans of the plan that read a whole table or index to apply the filters.
+
+        Those are sequential scans, and index scans that filter rows without
+        a condition on the index's leading column: planned for an ordering,
+        or because enable_seqscan is off and no index fits the filter.
+        Index scans that neither filter nor have a condition only serve an
+        ordering and are fine.
+        """
+        queryset = self.list_queryset(viewset, params)
+        plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+        scans = []
+        for node in plan_nodes(plan):
+            if node['Node Type'] == 'Seq Scan':
+                table = node['Relation Name']
+                scan = f'sequential scan of {table}'
+            elif node['Node Type'] in INDEX_SCANS:
+                condition = node.get('Index Cond')
+                if condition is None and 'Filter' not in node:
+                    continue
+                table, leading = self.index_columns(node['Index Name'])
+                if leading is None or constrains(condition, leading):
+                    continue
+                scan = f'full scan of index {node["Index Name"]} on {table}'
+            else:
+                continue
+            total = self.table_rows(table)
+            if total < self.min_rows:
+                continue
+            if total and node['Plan Rows'] / total > self.max_selectivity:
+                continue
+            scans.append((scan, int(node['Plan Rows']), total))
+        return scans
+
+    def index_columns(self, index):
+        """The table of `index` and its leading column, None for an expression."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT t.relname, a.attname FROM pg_index i '
+                'JOIN pg_class c ON c.oid = i.indexrelid '
+                'JOIN pg_class t ON t.oid = i.indrelid '
+                'LEFT JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0] '
+                'WHERE c.relname = %s',
+                [index]
+            )
+            return cursor.fetchone()
+
+    def table_rows(self, table):
+        """Planner's estimate of the table's size; never-analyzed tables count as empty."""
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [table])
+            row = cursor.fetchone()
+        return max(int(row[0]), 0) if row else 0
@@ -0,0 +1,254 @@
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from dashboard import (
+    attendance_bitmaps, course_statistics, rollups, score_histograms, synthetic
+)
+from dashboard.caching import bump_data_version, invalidate
+from dashboard.copy_loader import copy_rows, copy_supported, reserve_ids
+from dashboard.models import (
+    Assessment, AttendanceBitmap, AttendanceRecord, Course, CourseStatistics, Enrollment,
+    PerformanceMetrics, PerformanceMetricsChange, ScoreHistogram, Student,
+    StudentPerformanceMetrics
+)
+from dashboard.student_csv import chunked
+
+DEFAULT_BATCH_SIZE = 10000
+ENGINES = ['orm', 'copy']
+
+STUDENT_FIELDS = [
+    'gender', 'math_score', 'reading_score', 'writing_score', 'race_ethnicity',
+    'parental_education', 'lunch_type', 'test_preparation'
+]
+# Children of these are deleted before their parents by --replace
+GENERATED_MODELS = [
+    StudentPerformanceMetrics, PerformanceMetrics, PerformanceMetricsChange,
+    ScoreHistogram, AttendanceBitmap, AttendanceRecord, Assessment, CourseStatistics,
+    Enrollment, Course, Student
+]
+
+
+class Command(BaseCommand):
+    help = ('Generate seeded, realistic synthetic students, courses, enrollments, '
+            'assessments and attendance at any scale')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000,
+                            help='Students to generate (default: 1000)')
+        parser.add_argument('--courses', type=int, default=100,
+                            help='Courses to generate (default: 100)')
+        parser.add_argument('--enrollments', type=float, default=4,
+                            help='Average enrollments per student (default: 4)')
+        parser.add_argument('--assessments', type=int, default=5,
+                            help='Assessments per enrollment (default: 5)')
+        parser.add_argument('--attendance', type=int, default=20,
+                            help='Attendance records per enrollment (default: 20)')
+        parser.add_argument('--first-year', type=int, default=2022,
+                            help='First school year of the enrollments (default: 2022)')
+        parser.add_argument('--last-year', type=int, default=2024,
+                            help='Last school year of the enrollments; its Fall term '
+                                 'is still running and ungraded (default: 2024)')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed; the same seed and scale give the same data '
+                                 '(default: 42)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f'Rows inserted per batch (default: {DEFAULT_BATCH_SIZE})')
+        parser.add_argument(
+            '--engine',
+            choices=ENGINES,
+            default='copy',
+            help='Write with PostgreSQL COPY (copy, the default) or batched ORM INSERTs (orm)'
+        )
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete all existing dashboard data first')
+        parser.add_argument(
+            '--skip-derived',
+            action='store_true',
+            help='Do not compute percentiles, score histograms, course statistics '
+                 'and performance metrics'
+        )
+
+    def handle(self, *args, **options):
+        for name in ('students', 'courses', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be a positive integer')
+        if options['enrollments'] < 1:
+            raise CommandError('--enrollments must be at least 1')
+        if options['assessments'] < 0:
+            raise CommandError('--assessments cannot be negative')
+        if not 0 <= options['attendance'] <= synthetic.MAX_MEETINGS:
+            raise CommandError(
+                f'--attendance must be between 0 and {synthetic.MAX_MEETINGS}'
+            )
+        if options['first_year'] > options['last_year']:
+            raise CommandError('--first-year cannot be after --last-year')
+
+        self.batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        self.engine = options['engine']
+        if self.engine == 'copy' and not copy_supported(connection):
+            if self.verbosity >= 1:
+                self.stdout.write(self.style.WARNING(
+                    'COPY needs PostgreSQL with psycopg2, falling back to the orm engine'
+                ))
+            self.engine = 'orm'
+
+        if options['replace']:
+            self.delete_existing()
+
+        # One child seed for the courses, then one per block of students,
+        # so a block's rows do not depend on how many blocks follow it
+        seed = np.random.SeedSequence(options['seed'])
+        course_seed, = seed.spawn(1)
+        terms = synthetic.terms(options['first_year'], options['last_year'])
+        term_starts = np.array([start for _, _, start in terms])
+
+        with transaction.atomic():
+            course_ids, popularity = self.generate_courses(
+                options['courses'], np.random.default_rng(course_seed)
+            )
+
+        student_ids = []
+        scores = []
+        for start in range(0, options['students'], synthetic.BLOCK_SIZE):
+            size = min(synthetic.BLOCK_SIZE, options['students'] - start)
+            rng = np.random.default_rng(seed.spawn(1)[0])
+            students, enrollments, assessments, attendance = synthetic.generate_block(
+                size, popularity, term_starts, options, rng
+            )
+            with transaction.atomic():
+                ids = self.write_block(
+                    students, enrollments, assessments, attendance, course_ids, terms
+                )
+            student_ids.append(ids)
+            scores.append(np.column_stack([
+                students['math_score'], students['reading_score'], students['writing_score']
+            ]))
+            self.report('Generated', start + size, 'students')
+
+        student_ids = np.concatenate(student_ids)
+        if not options['skip_derived']:
+            self.compute_derived(student_ids, np.concatenate(scores))
+        # Bulk writes skip the signals that would do this
+        bump_data_version('students')
+        if options['replace']:
+            # The restarted sequences hand out the ids of the deleted rows
+            # again, whose cached results must not be served for the new ones
+            self.invalidate_cached(course_ids, student_ids)
+        self.stdout.write(self.style.SUCCESS('Data generation completed successfully'))
+
+    def delete_existing(self):
+        if connection.vendor == 'postgresql':
+            tables = ', '.join(
+                connection.ops.quote_name(model._meta.db_table) for model in GENERATED_MODELS
+            )
+            with connection.cursor() as cursor:
+                # Inside an outer transaction, deferred foreign key checks
+                # on these tables must run before they can be truncated
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+                cursor.execute(f'TRUNCATE {tables} RESTART IDENTITY')
+        else:
+            with transaction.atomic():
+                for model in GENERATED_MODELS:
+                    model.objects.all().delete()
+        self.report('Deleted', 'all', 'existing dashboard data')
+
+    def generate_courses(self, count, rng):
+        courses, popularity = synthetic.generate_courses(count, rng)
+        if Course.objects.filter(course_code__in=courses['course_code']).exists():
+            raise CommandError('Generated course codes already exist; use --replace')
+        ids = self.write(Course, courses, ['course_code', 'course_name', 'department', 'credits'])
+        self.report('Generated', count, 'courses')
+        return np.array(ids), popularity
+
+    def write_block(self, students, enrollments, assessments, attendance, course_ids, terms):
+        """Insert one block of generated rows; returns the new students' ids."""
+        student_ids = np.array(self.write(Student, students, STUDENT_FIELDS))
+
+        term = enrollments['term']
+        grades = enrollments['final_grade'].tolist()
+        enrollment_ids = np.array(self.write(Enrollment, {
+            'student_id': student_ids[enrollments['student']],
+            'course_id': course_ids[enrollments['course']],
+            'semester': np.array([semester for semester, _, _ in terms])[term],
+            'year': np.array([year for _, year, _ in terms])[term],
+            # NaN marks a course still running
+            'final_grade': [None if grade != grade else grade for grade in grades],
+        }, ['student_id', 'course_id', 'semester', 'year', 'final_grade']))
+
+        self.write(Assessment, {
+            **assessments, 'enrollment_id': enrollment_ids[assessments['enrollment']]
+        }, ['enrollment_id', 'assessment_type', 'date', 'score', 'weight'], returning=False)
+        self.write(AttendanceRecord, {
+            **attendance, 'enrollment_id': enrollment_ids[attendance['enrollment']]
+        }, ['enrollment_id', 'date', 'present'], returning=False)
+        return student_ids
+
+    def write(self, model, columns, fields, returning=True):
+        """Insert the rows held column-wise in `columns`, `batch_size` at a time.
+
+        Returns the new primary keys in row order when `returning`.
+        """
+        values = [
+            column.tolist() if isinstance(column, np.ndarray) else column
+            for column in (columns[field] for field in fields)
+        ]
+        ids = []
+        for rows in chunked(zip(*values), self.batch_size):
+            if self.engine == 'copy':
+                with connection.cursor() as cursor:
+                    if returning:
+                        batch_ids = reserve_ids(cursor, model, len(rows))
+                        ids.extend(batch_ids)
+                        rows = [(pk, *row) for pk, row in zip(batch_ids, rows)]
+                    copy_rows(cursor, model, (['id'] if returning else []) + fields, rows)
+            else:
+                objects = model.objects.bulk_create(
+                    [model(**dict(zip(fields, row))) for row in rows]
+                )
+                ids.extend(obj.pk for obj in objects)
+        return ids
+
+    def compute_derived(self, student_ids, scores):
+        """Fill in what signals would have maintained had the rows been saved one by one.
+
+        Percentile ranks are read off the rebuilt score histograms, so they
+        rank the generated students against all students.
+        """
+        written = score_histograms.rebuild()
+        self.report('Counted scores of', written, 'demographic cells')
+        ranks = score_histograms.student_percentile_ranks(
+            scores[:, 0], scores[:, 1], scores[:, 2]
+        )
+        created_at = timezone.now()
+        with transaction.atomic():
+            self.write(StudentPerformanceMetrics, {
+                'student_id': student_ids,
+                'math_percentile': np.round(ranks['math'], 2),
+                'reading_percentile': np.round(ranks['reading'], 2),
+                'writing_percentile': np.round(ranks['writing'], 2),
+                'overall_percentile': np.round(ranks['overall'], 2),
+                'created_at': [created_at] * len(student_ids),
+            }, [
+                'student_id', 'math_percentile', 'reading_percentile',
+                'writing_percentile', 'overall_percentile', 'created_at'
+            ], returning=False)
+        self.report('Computed percentiles for', len(student_ids), 'students')
+
+        written = course_statistics.rebuild()
+        self.report('Rebuilt statistics for', written, 'courses')
+        written = attendance_bitmaps.rebuild(batch_size=self.batch_size)
+        self.report('Packed', written, 'attendance bitmaps')
+        written, _ = rollups.rollup_all(self.batch_size)
+        self.report('Computed', written, 'performance metrics')
+
+    def invalidate_cached(self, course_ids, student_ids):
+        for chunk in chunked(course_ids.tolist(), self.batch_size):
+            invalidate('course_stats', *chunk)
+        for chunk in chunked(student_ids.tolist(), self.batch_size):
+            invalidate('performance_summary', *chunk)
+
+    def report(self, verb, count, noun):
+        if self.verbosity >= 1:
+            self.stdout.write(f'{verb} {count} {noun}')
@@ -1,84 +1,448 @@
 import csv
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+
 import numpy as np
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from dashboard import score_histograms
+from dashboard.caching import bump_data_version
+from dashboard.columnar import is_columnar, read_columns
+from dashboard.copy_loader import copy_rows, copy_supported, reserve_ids
 from dashboard.models import Student, StudentPerformanceMetrics
+from dashboard.student_csv import (
+    STUDENT_FIELDS, chunked, columnar_row_count, decode_columnar,
+    decode_columnar_shard, decode_shard, fingerprint, parse_row, shard_offsets
+)
+
+DEFAULT_FILE = 'data/processed/processed_student_data.csv'
+DEFAULT_BATCH_SIZE = 1000
+ENGINES = ['orm', 'copy']
+
+METRIC_FIELDS = [
+    'student', 'math_percentile', 'reading_percentile',
+    'writing_percentile', 'overall_percentile'
+]
+
+
+def score_distribution(math_scores, reading_scores, writing_scores):
+    """Count vectors of each score and of the score total."""
+    math_scores = np.asarray(math_scores, dtype=np.intp)
+    reading_scores = np.asarray(reading_scores, dtype=np.intp)
+    writing_scores = np.asarray(writing_scores, dtype=np.intp)
+    return np.concatenate([
+        np.bincount(math_scores, minlength=101),
+        np.bincount(reading_scores, minlength=101),
+        np.bincount(writing_scores, minlength=101),
+        np.bincount(math_scores + reading_scores + writing_scores, minlength=301),
+    ])
+
 
 class Command(BaseCommand):
     help = 'Import processed student data into the database'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default=DEFAULT_FILE,
+            help='Processed CSV or typed columnar file to import '
+                 f'(default: {DEFAULT_FILE})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Rows read and inserted per batch (default: {DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--engine',
+            choices=ENGINES,
+            default='orm',
+            help='Write with batched ORM INSERTs (orm) or PostgreSQL COPY (copy)'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only insert rows not seen by earlier incremental imports, '
+                 'and refresh percentiles only if the score distribution changed'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Decode the file in this many processes and write it over as '
+                 'many database connections (default: 1)'
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='With --incremental, delete tracked students whose row is no '
+                 'longer in the file, along with their enrollments, assessments, '
+                 'attendance and metrics. An edited row is a new row, so without '
+                 '--prune the student it replaces is kept as well'
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        if self.batch_size < 1:
+            raise CommandError('--batch-size must be a positive integer')
+        self.verbosity = options['verbosity']
+        self.engine = options['engine']
+        if self.engine == 'copy' and not copy_supported(connection):
+            self.stdout.write(self.style.WARNING(
+                'COPY needs PostgreSQL with psycopg2, falling back to the orm engine'
+            ))
+            self.engine = 'orm'
+
+        if options['prune'] and not options['incremental']:
+            raise CommandError('--prune can only be used with --incremental')
+        self.workers = options['workers']
+        if self.workers < 1:
+            raise CommandError('--workers must be a positive integer')
+        if self.workers > 1 and options['incremental']:
+            raise CommandError('--workers cannot be combined with --incremental')
+
         self.stdout.write('Starting data import...')
-        
+
         try:
-            with transaction.atomic():
-                with open('data/processed/processed_student_data.csv', 'r') as file:
-                    reader = csv.DictReader(file)
-                    
-                    # Store all scores to calculate percentiles later
-                    math_scores = []
-                    reading_scores = []
-                    writing_scores = []
-                    students = []
-                    
-                    for row in reader:
-                        # Get race/ethnicity
-                        race_ethnicity = 'A'
-                        for group in ['A', 'B', 'C', 'D', 'E']:
-                            if row[f'race/ethnicity_group {group}'].lower() == 'true':
-                                race_ethnicity = group
-                                break
-                        
-                        # Get parental education
-                        education_levels = [
-                            "associate's degree", "bachelor's degree", "high school",
-                            "master's degree", "some college", "some high school"
-                        ]
-                        parental_education = next(
-                            level for level in education_levels
-                            if row[f'parental level of education_{level}'].lower() == 'true'
-                        )
-                        
-                        # Get lunch type
-                        lunch_type = 'free/reduced' if row['lunch_free/reduced'].lower() == 'true' else 'standard'
-                        
-                        # Get test preparation
-                        test_prep = 'completed' if row['test preparation course_completed'].lower() == 'true' else 'none'
-                        
-                        # Create Student
-                        student = Student.objects.create(
-                            gender='F' if row['gender'] == '0' else 'M',
-                            math_score=int(row['math score']),
-                            reading_score=int(row['reading score']),
-                            writing_score=int(row['writing score']),
-                            race_ethnicity=race_ethnicity,
-                            parental_education=parental_education,
-                            lunch_type=lunch_type,
-                            test_preparation=test_prep
-                        )
-                        
-                        math_scores.append(int(row['math score']))
-                        reading_scores.append(int(row['reading score']))
-                        writing_scores.append(int(row['writing score']))
-                        students.append(student)
-                    
-                    # Calculate percentiles
-                    math_scores = np.array(math_scores)
-                    reading_scores = np.array(reading_scores)
-                    writing_scores = np.array(writing_scores)
-                    average_scores = (math_scores + reading_scores + writing_scores) / 3
-                    
-                    for i, student in enumerate(students):
-                        StudentPerformanceMetrics.objects.create(
-                            student=student,
-                            math_percentile=np.percentile(math_scores, math_scores[i]),
-                            reading_percentile=np.percentile(reading_scores, reading_scores[i]),
-                            writing_percentile=np.percentile(writing_scores, writing_scores[i]),
-                            overall_percentile=np.percentile(average_scores, average_scores[i])
-                        )
-                
+            if self.workers > 1:
+                # Each shard commits on its own connection; the histograms and
+                # the global percentile pass are published together once all
+                # of them have landed, or the shards' students are deleted.
+                student_ids, scores, histograms = self.import_students_parallel(
+                    options['file']
+                )
+                try:
+                    with transaction.atomic():
+                        score_histograms.add_counts(histograms)
+                        self.import_metrics(student_ids, scores)
+                except Exception:
+                    self.discard_students(student_ids)
+                    raise
+            else:
+                with transaction.atomic():
+                    if options['incremental']:
+                        self.import_incremental(options['file'], options['prune'])
+                    else:
+                        student_ids, scores = self.import_students(options['file'])
+                        self.import_metrics(student_ids, scores)
+
+            # Bulk writes skip the signals that would do this
+            bump_data_version('students')
             self.stdout.write(self.style.SUCCESS('Data import completed successfully'))
-            
+
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error during import: {str(e)}'))
-            raise 
\ No newline at end of file
+            raise
+
+    def read_batches(self, path):
+        """Yield lists of Student field values, `batch_size` rows at a time.
+
+        Typed columnar files are decoded column-wise from a memory map;
+        anything else is read as the one-hot CSV.
+        """
+        if is_columnar(path):
+            columns = read_columns(path)
+            for start in range(0, columnar_row_count(path), self.batch_size):
+                yield [
+                    dict(zip(STUDENT_FIELDS, row))
+                    for row in decode_columnar(columns, start, start + self.batch_size)
+                ]
+            return
+
+        with open(path, 'r', newline='') as file:
+            reader = csv.DictReader(file)
+            for chunk in chunked(reader, self.batch_size):
+                yield [parse_row(row) for row in chunk]
+
+    def import_students(self, path):
+        """Stream the source file into Student rows, one bulk write per batch.
+
+        Only the primary keys and the three scores are kept per student, in
+        compact typed arrays, since those are all the percentile pass needs.
+        The score histograms are updated once all of them are written.
+        """
+        student_ids = array('q')
+        scores = {
+            'math': array('h'),
+            'reading': array('h'),
+            'writing': array('h'),
+        }
+        histograms = {}
+
+        for rows in self.read_batches(path):
+            student_ids.extend(self.write_students(rows))
+            for row in rows:
+                scores['math'].append(row['math_score'])
+                scores['reading'].append(row['reading_score'])
+                scores['writing'].append(row['writing_score'])
+            score_histograms.merge(histograms, score_histograms.count_students(rows))
+            self.report('Imported', len(student_ids), 'students')
+
+        score_histograms.add_counts(histograms)
+        return student_ids, scores
+
+    def import_students_parallel(self, path):
+        """Decode shards of the source file in a process pool and write them concurrently.
+
+        CSV files are split into byte ranges and columnar files into row
+        ranges. Workers send back compact row tuples. Every shard is written in its
+        own transaction on its own thread, and so on its own database
+        connection, as soon as it is decoded. If any shard fails to decode or
+        write, the students of the shards that were committed are deleted
+        again and the error is raised.
+
+        Ids and scores are returned in file order, like `import_students`,
+        along with the score histograms of all shards. Those are left to the
+        caller to add, so the shards never wait on each other's histogram
+        rows.
+        """
+        if is_columnar(path):
+            rows = columnar_row_count(path)
+            offsets = [rows * i // self.workers for i in range(self.workers + 1)]
+            decode = decode_columnar_shard
+        else:
+            offsets = shard_offsets(path, self.workers)
+            decode = decode_shard
+        written, error = [], None
+        with ProcessPoolExecutor(self.workers) as decoders, \
+                ThreadPoolExecutor(self.workers) as writers:
+            shards = decoders.map(decode, repeat(path), offsets[:-1], offsets[1:])
+            try:
+                for rows in shards:
+                    written.append(writers.submit(self.write_shard, rows))
+            except Exception as e:
+                error = e
+
+        student_ids = array('q')
+        scores = {'math': array('h'), 'reading': array('h'), 'writing': array('h')}
+        histograms = {}
+        for future in written:
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+            shard_ids, shard_scores, shard_histograms = future.result()
+            student_ids.extend(shard_ids)
+            for subject in scores:
+                scores[subject].extend(shard_scores[subject])
+            score_histograms.merge(histograms, shard_histograms)
+        if error is not None:
+            self.discard_students(student_ids)
+            raise error
+        self.report('Imported', len(student_ids), 'students')
+        return student_ids, scores, histograms
+
+    def write_shard(self, rows):
+        """Write one decoded shard in a single transaction on this thread's connection.
+
+        Returns the shard's ids, scores and score histograms.
+        """
+        student_ids = array('q')
+        scores = {'math': array('h'), 'reading': array('h'), 'writing': array('h')}
+        histograms = {}
+        try:
+            with transaction.atomic():
+                for chunk in chunked(rows, self.batch_size):
+                    fields = [dict(zip(STUDENT_FIELDS, row)) for row in chunk]
+                    student_ids.extend(self.write_students(fields))
+                    for row in fields:
+                        scores['math'].append(row['math_score'])
+                        scores['reading'].append(row['reading_score'])
+                        scores['writing'].append(row['writing_score'])
+                    score_histograms.merge(histograms, score_histograms.count_students(fields))
+        finally:
+            connection.close()
+        return student_ids, scores, histograms
+
+    def discard_students(self, student_ids):
+        """Delete the students committed by the shards of a failed parallel import.
+
+        Nothing refers to them yet and they are not in the score histograms,
+        so this is a plain DELETE rather than one through the ORM, whose
+        signals would take them out of the histograms.
+        """
+        table = connection.ops.quote_name(Student._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for chunk in chunked(student_ids, self.batch_size):
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE id IN ({", ".join(["%s"] * len(chunk))})',
+                    chunk
+                )
+        # Cached cohort statistics may have counted them in the meantime
+        bump_data_version('students')
+        self.report('Deleted', len(student_ids), 'imported students')
+
+    def import_incremental(self, path, prune):
+        """Apply only the difference between the file and earlier incremental imports.
+
+        Students are matched on their row fingerprint, a hash of every field,
+        so an edited row is inserted as a new student. New rows are inserted
+        in batches; with `prune`, tracked students missing from the file,
+        including the old versions of edited rows, are deleted together with
+        everything that refers to them. Percentiles are then refreshed for
+        every tracked student if the delta changed the score distribution,
+        and written for the new students only if it did not.
+        """
+        tracked = Student.objects.filter(fingerprint__isnull=False)
+        # Fingerprints not yet matched by a row in the file
+        unmatched = set(
+            tracked.values_list('fingerprint', flat=True).iterator(chunk_size=self.batch_size)
+        )
+        occurrences = Counter()
+        new_ids = set()
+        added = {'math': array('h'), 'reading': array('h'), 'writing': array('h')}
+
+        for batch in self.read_batches(path):
+            rows = []
+            for fields in batch:
+                key = fingerprint(fields)
+                fields['fingerprint'] = fingerprint(fields, occurrences[key])
+                occurrences[key] += 1
+                if fields['fingerprint'] in unmatched:
+                    unmatched.discard(fields['fingerprint'])
+                else:
+                    rows.append(fields)
+            if rows:
+                new_ids.update(self.write_students(rows))
+                score_histograms.add_counts(score_histograms.count_students(rows))
+                for row in rows:
+                    added['math'].append(row['math_score'])
+                    added['reading'].append(row['reading_score'])
+                    added['writing'].append(row['writing_score'])
+                self.report('Inserted', len(new_ids), 'new students')
+
+        removed = {'math': array('h'), 'reading': array('h'), 'writing': array('h')}
+        if prune:
+            stale = sorted(unmatched)
+            cascaded = Counter()
+            for batch in chunked(stale, self.batch_size):
+                doomed = tracked.filter(fingerprint__in=batch)
+                for math, reading, writing in doomed.values_list(
+                    'math_score', 'reading_score', 'writing_score'
+                ):
+                    removed['math'].append(math)
+                    removed['reading'].append(reading)
+                    removed['writing'].append(writing)
+                _, deleted = doomed.delete()
+                cascaded.update(deleted)
+            self.report('Pruned', len(stale), 'students')
+            for label, count in sorted(cascaded.items()):
+                if count and label != Student._meta.label:
+                    self.report('Deleted', count, f'{label} rows of pruned students')
+
+        if not new_ids and not removed['math']:
+            self.stdout.write('No changes since the last import')
+            return
+
+        distribution_changed = not np.array_equal(
+            score_distribution(added['math'], added['reading'], added['writing']),
+            score_distribution(removed['math'], removed['reading'], removed['writing'])
+        )
+
+        student_ids = array('q')
+        scores = {'math': array('h'), 'reading': array('h'), 'writing': array('h')}
+        for pk, math, reading, writing in tracked.order_by('id').values_list(
+            'id', 'math_score', 'reading_score', 'writing_score'
+        ).iterator(chunk_size=self.batch_size):
+            student_ids.append(pk)
+            scores['math'].append(math)
+            scores['reading'].append(reading)
+            scores['writing'].append(writing)
+
+        if distribution_changed:
+            self.import_metrics(student_ids, scores)
+        else:
+            self.stdout.write('Score distribution unchanged, ranking new students only')
+            targets = np.flatnonzero(np.isin(
+                np.frombuffer(student_ids, dtype=np.int64),
+                np.fromiter(new_ids, dtype=np.int64, count=len(new_ids))
+            ))
+            self.import_metrics(student_ids, scores, targets)
+
+    def import_metrics(self, student_ids, scores, targets=None):
+        """Rank the students of `student_ids` and bulk insert their metrics.
+
+        Ranks are read off the stored score histograms, i.e. taken among
+        every student in the database. `targets`, if given, holds the
+        positions of the students whose metrics should be written; by
+        default every student gets a row.
+        """
+        if not student_ids:
+            return
+
+        ranks = {
+            subject: np.round(values, 2)
+            for subject, values in score_histograms.student_percentile_ranks(
+                np.frombuffer(scores['math'], dtype=np.int16),
+                np.frombuffer(scores['reading'], dtype=np.int16),
+                np.frombuffer(scores['writing'], dtype=np.int16)
+            ).items()
+        }
+
+        if targets is None:
+            targets = range(len(student_ids))
+
+        for start in range(0, len(targets), self.batch_size):
+            end = min(start + self.batch_size, len(targets))
+            self.write_metrics([
+                (
+                    student_ids[i],
+                    float(ranks['math'][i]),
+                    float(ranks['reading'][i]),
+                    float(ranks['writing'][i]),
+                    float(ranks['overall'][i])
+                )
+                for i in targets[start:end]
+            ])
+            self.report('Computed metrics for', end, 'students')
+
+    def write_students(self, rows):
+        """Insert one batch of parsed rows and return their primary keys in order."""
+        if self.engine == 'copy':
+            with connection.cursor() as cursor:
+                ids = reserve_ids(cursor, Student, len(rows))
+                fields = list(rows[0])
+                copy_rows(
+                    cursor, Student, ['id'] + fields,
+                    ((pk, *(row[field] for field in fields))
+                     for pk, row in zip(ids, rows))
+                )
+            return ids
+
+        students = Student.objects.bulk_create(
+            [Student(**row) for row in rows],
+            batch_size=self.batch_size
+        )
+        return [student.pk for student in students]
+
+    def write_metrics(self, rows):
+        """Insert one batch of (student_id, math, reading, writing, overall) rows."""
+        if self.engine == 'copy':
+            created_at = timezone.now()
+            with connection.cursor() as cursor:
+                copy_rows(
+                    cursor, StudentPerformanceMetrics, METRIC_FIELDS + ['created_at'],
+                    (row + (created_at,) for row in rows)
+                )
+            return
+
+        StudentPerformanceMetrics.objects.bulk_create(
+            [
+                StudentPerformanceMetrics(
+                    student_id=student_id,
+                    math_percentile=math,
+                    reading_percentile=reading,
+                    writing_percentile=writing,
+                    overall_percentile=overall
+                )
+                for student_id, math, reading, writing, overall in rows
+            ],
+            batch_size=self.batch_size
+        )
+
+    def report(self, verb, count, noun):
+        if self.verbosity >= 1:
+            self.stdout.write(f'{verb} {count} {noun}')
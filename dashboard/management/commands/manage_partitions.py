@@ -0,0 +1,85 @@
+import os
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from dashboard import partitioning
+
+
+class Command(BaseCommand):
+    help = ('Create the yearly partitions of the dated tables ahead of time, '
+            'and detach or archive the partitions of old years')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=1,
+            help='Make sure partitions exist through this many years after '
+                 'the current one (default: 1)'
+        )
+        parser.add_argument(
+            '--detach-before',
+            type=int,
+            metavar='YEAR',
+            help='Detach the partitions of years before YEAR from their tables, and '
+                 'recompute the course statistics, attendance bitmaps and (at the next '
+                 'rollup) performance metrics of those years without them'
+        )
+        parser.add_argument(
+            '--archive-dir',
+            help='Write each detached partition to a CSV file in this directory '
+                 'and drop it'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Print the partitions of each table and their row counts'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('manage_partitions needs PostgreSQL')
+        if options['ahead'] < 0:
+            raise CommandError('--ahead must not be negative')
+        if options['archive_dir'] and options['detach_before'] is None:
+            raise CommandError('--archive-dir needs --detach-before')
+        with connection.cursor() as cursor:
+            for model in partitioning.PARTITIONED_MODELS:
+                if not partitioning.is_partitioned(cursor, model._meta.db_table):
+                    raise CommandError(
+                        f'{model._meta.db_table} is not partitioned; run migrate first'
+                    )
+
+        created = partitioning.ensure_partitions(date.today().year + options['ahead'])
+        for name in created:
+            self.stdout.write(f'Created partition {name}')
+
+        detached = []
+        if options['detach_before'] is not None:
+            detached = partitioning.detach_partitions(options['detach_before'])
+            for name in detached:
+                self.stdout.write(f'Detached partition {name}')
+        if options['archive_dir']:
+            os.makedirs(options['archive_dir'], exist_ok=True)
+            for name in detached:
+                path = os.path.join(options['archive_dir'], f'{name}.csv')
+                partitioning.archive_table(name, path)
+                self.stdout.write(f'Archived partition {name} to {path}')
+
+        if options['list']:
+            self.list_partitions()
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(created)} and detached {len(detached)} partitions'
+        ))
+
+    def list_partitions(self):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in partitioning.PARTITIONED_MODELS:
+                table = model._meta.db_table
+                existing = partitioning.partitions(cursor, table)
+                # The default partition last
+                for year in sorted(existing, key=lambda year: (year is None, year)):
+                    cursor.execute(f'SELECT COUNT(*) FROM {quote(existing[year])}')
+                    self.stdout.write(f'{existing[year]}: {cursor.fetchone()[0]:,} rows')
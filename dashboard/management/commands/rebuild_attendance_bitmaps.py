@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from dashboard import attendance_bitmaps
+
+
+class Command(BaseCommand):
+    help = 'Repack the attendance bitmaps of enrollments from their attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--enrollment',
+            type=int,
+            action='append',
+            dest='enrollments',
+            help='Only handle this enrollment id (may be repeated)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=attendance_bitmaps.DEFAULT_BATCH_SIZE,
+            help='Enrollments packed per batch '
+                 f'(default: {attendance_bitmaps.DEFAULT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer')
+
+        written = attendance_bitmaps.rebuild(options['enrollments'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} attendance bitmaps'))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from dashboard import course_statistics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the CourseStatistics rollup from enrollments and assessments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            type=int,
+            action='append',
+            dest='courses',
+            help='Only handle this course id (may be repeated)'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report courses whose stored totals are out of date instead of '
+                 'rebuilding; exits with an error if there are any'
+        )
+
+    def handle(self, *args, **options):
+        courses = options['courses']
+        if options['check']:
+            self.check_statistics(courses)
+            return
+
+        written = course_statistics.rebuild(courses)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {written} courses'))
+
+    def check_statistics(self, courses):
+        mismatched = course_statistics.inconsistencies(courses)
+        for course_id, (stored, live) in sorted(mismatched.items()):
+            differences = ', '.join(
+                f'{field} {stored[field]} != {live[field]}'
+                for field in course_statistics.TOTAL_FIELDS
+                if stored[field] != live[field]
+            )
+            self.stderr.write(f'Course {course_id}: {differences}')
+        if mismatched:
+            raise CommandError(
+                f'{len(mismatched)} courses have stale statistics; '
+                'run rebuild_course_statistics to fix them'
+            )
+        self.stdout.write(self.style.SUCCESS('Course statistics are consistent'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+from dashboard import score_histograms
+
+
+class Command(BaseCommand):
+    help = 'Recount the score histograms of every demographic cell from the students'
+
+    def handle(self, *args, **options):
+        if not score_histograms.supported():
+            raise CommandError('Score histograms are only stored on PostgreSQL')
+        written = score_histograms.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt score histograms for {written} cells'))
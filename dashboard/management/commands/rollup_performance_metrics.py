@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from dashboard import rollups
+
+
+class Command(BaseCommand):
+    help = 'Compute PerformanceMetrics (GPA and attendance rate) for every student semester'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only recompute student semesters changed since the last rollup'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=rollups.DEFAULT_BATCH_SIZE,
+            help=f'Rows fetched and upserted per batch (default: {rollups.DEFAULT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer')
+
+        if options['incremental']:
+            written, deleted = rollups.rollup_incremental(options['batch_size'])
+        else:
+            written, deleted = rollups.rollup_all(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} performance metrics, deleted {deleted} outdated ones'
+        ))
@@ -0,0 +1,159 @@
+"""Request histograms and their Prometheus text exposition.
+
+Every instrumented request adds one observation per metric in METRICS to
+a histogram labelled with its route, action and method. Each process
+keeps its histograms in a (capacity, width) float64 array: bucket counts,
+then the sum and the count. With ``METRICS_MULTIPROCESS_DIR`` set, the
+array is a memory-mapped file named after the process id, and a small
+JSON file next to it lists the series in slot order. Recording is then
+still a handful of in-memory additions, while ``/metrics`` can merge the
+files of every gunicorn worker. Files of exited workers are kept so that
+counts never go backwards; clear the directory when the server restarts.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS = {
+    'http_request_duration_seconds': ('Wall time spent producing the response', SECONDS_BUCKETS),
+    'http_request_sql_seconds': ('Time spent in SQL queries', SECONDS_BUCKETS),
+    'http_request_sql_queries': ('SQL queries run', (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)),
+    'http_response_size_bytes': (
+        'Response body size',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+    ),
+}
+LABELS = ('route', 'action', 'method')
+# Bucket counts including +Inf, then sum and count
+WIDTH = max(len(buckets) for _, buckets in METRICS.values()) + 3
+# Series one process can hold; routes x actions x methods x metrics stays far below
+CAPACITY = 4096
+
+
+class HistogramStore:
+    """The histograms of one process, in memory or in a memory-mapped file."""
+
+    def __init__(self, directory=None, capacity=CAPACITY):
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.series = {}
+        self.index_path = None
+        if directory:
+            base = Path(directory) / f'histograms_{self.pid}'
+            self.index_path = base.with_suffix('.json')
+            self.values = np.memmap(
+                base.with_suffix('.bin'), dtype=np.float64, mode='w+', shape=(capacity, WIDTH)
+            )
+            self.write_index()
+        else:
+            self.values = np.zeros((capacity, WIDTH))
+
+    def observe(self, name, labels, value, weight=1.0):
+        buckets = METRICS[name][1]
+        with self.lock:
+            slot = self.slot(name, labels)
+            if slot is None:
+                return
+            row = self.values[slot]
+            row[int(np.searchsorted(buckets, value))] += weight
+            row[-2] += value * weight
+            row[-1] += weight
+
+    def slot(self, name, labels):
+        key = (name, *labels)
+        slot = self.series.get(key)
+        if slot is None:
+            if len(self.series) >= len(self.values):
+                return None
+            slot = self.series[key] = len(self.series)
+            if self.index_path:
+                self.write_index()
+        return slot
+
+    def write_index(self):
+        # Readers must never see a half-written index
+        partial = self.index_path.with_suffix('.tmp')
+        partial.write_text(json.dumps(list(self.series)))
+        os.replace(partial, self.index_path)
+
+    def snapshot(self):
+        with self.lock:
+            return {key: self.values[slot].copy() for key, slot in self.series.items()}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """This process's store, created afresh in each forked worker."""
+    global _store
+    if _store is None or _store.pid != os.getpid():
+        with _store_lock:
+            if _store is None or _store.pid != os.getpid():
+                _store = HistogramStore(getattr(settings, 'METRICS_MULTIPROCESS_DIR', None))
+    return _store
+
+
+def collect():
+    """Histograms of every process sharing the metrics directory, merged."""
+    directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+    if not directory:
+        return get_store().snapshot()
+
+    get_store()
+    merged = {}
+    for index_path in Path(directory).glob('histograms_*.json'):
+        try:
+            keys = [tuple(key) for key in json.loads(index_path.read_text())]
+            values = np.fromfile(index_path.with_suffix('.bin'), dtype=np.float64)
+        except (OSError, ValueError):
+            continue
+        values = values.reshape(-1, WIDTH)
+        for slot, key in enumerate(keys[:len(values)]):
+            if key in merged:
+                merged[key] = merged[key] + values[slot]
+            else:
+                merged[key] = values[slot].copy()
+    return merged
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def label_text(labels, **extra):
+    pairs = [*zip(LABELS, labels), *extra.items()]
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def exposition(histograms):
+    """The Prometheus text format (version 0.0.4) of `histograms`."""
+    lines = []
+    for name, (help_text, buckets) in METRICS.items():
+        series = sorted(
+            (key[1:], values) for key, values in histograms.items() if key[0] == name
+        )
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, values in series:
+            cumulative = np.cumsum(values[:len(buckets) + 1])
+            for bound, count in zip([*buckets, '+Inf'], cumulative):
+                bound = bound if bound == '+Inf' else format_value(bound)
+                lines.append(
+                    f'{name}_bucket{label_text(labels, le=bound)} {format_value(count)}'
+                )
+            lines.append(f'{name}_sum{label_text(labels)} {format_value(values[-2])}')
+            lines.append(f'{name}_count{label_text(labels)} {format_value(values[-1])}')
+    return '\n'.join(lines) + '\n'
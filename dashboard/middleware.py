@@ -0,0 +1,101 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import get_store
+
+
+class QueryTimer:
+    """``execute_wrapper`` that counts queries and the time spent in them."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def route_labels(request):
+    """(route, action, method) of a request; the route is the URL name."""
+    match = request.resolver_match
+    if match is None:
+        return ('unresolved', '', request.method)
+    method = request.method.lower()
+    # DRF viewsets map each method to an action such as list or retrieve
+    actions = getattr(match.func, 'actions', None) or {}
+    return (match.view_name or match.route, actions.get(method, method), request.method)
+
+
+class RequestMetricsMiddleware:
+    """Records latency, SQL and response size histograms per route.
+
+    ``METRICS_SAMPLE_RATE`` (0 to 1) sets the share of requests measured;
+    the others are passed straight through. Sampled observations are
+    weighted by the inverse rate, so counts and sums still estimate the
+    totals.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or (
+            self.sample_rate < 1 and random.random() >= self.sample_rate
+        ):
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with self.timing(timer):
+            response = self.get_response(request)
+
+        labels = route_labels(request)
+        if labels[0] == 'metrics':
+            return response
+        weight = 1 / min(self.sample_rate, 1)
+        if response.streaming:
+            # Streamed bodies, such as the exports, run their queries while
+            # they are iterated, after this middleware has returned
+            response.streaming_content = self.measure_stream(
+                response.streaming_content, labels, weight, timer, start
+            )
+        else:
+            self.record(
+                labels, weight, time.perf_counter() - start, timer, len(response.content)
+            )
+        return response
+
+    def timing(self, timer):
+        """Context that has `timer` wrap the queries of every database connection."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        return stack
+
+    def measure_stream(self, content, labels, weight, timer, start):
+        """Pass a streamed body through, recording the request once it is sent or closed."""
+        size = 0
+        try:
+            with self.timing(timer):
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self.record(labels, weight, time.perf_counter() - start, timer, size)
+
+    def record(self, labels, weight, elapsed, timer, size):
+        store = get_store()
+        store.observe('http_request_duration_seconds', labels, elapsed, weight)
+        store.observe('http_request_sql_seconds', labels, timer.seconds, weight)
+        store.observe('http_request_sql_queries', labels, timer.queries, weight)
+        store.observe('http_response_size_bytes', labels, size, weight)
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_statistics(apps, schema_editor):
+    Course = apps.get_model('dashboard', 'Course')
+    CourseStatistics = apps.get_model('dashboard', 'CourseStatistics')
+    rows = []
+    for course in Course.objects.all().iterator():
+        enrollments = course.enrollment_set.aggregate(
+            enrollment_count=Count('id'),
+            graded_count=Count('final_grade'),
+            passing_count=Count('id', filter=Q(final_grade__gte=60)),
+            grade_sum=Sum('final_grade'),
+        )
+        assessments = course.enrollment_set.aggregate(
+            assessment_count=Count('assessment'),
+            assessment_score_sum=Sum('assessment__score'),
+        )
+        rows.append(CourseStatistics(
+            course_id=course.pk,
+            enrollment_count=enrollments['enrollment_count'],
+            graded_count=enrollments['graded_count'],
+            passing_count=enrollments['passing_count'],
+            grade_sum=enrollments['grade_sum'] or 0,
+            assessment_count=assessments['assessment_count'],
+            assessment_score_sum=assessments['assessment_score_sum'] or 0,
+        ))
+    CourseStatistics.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_student_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStatistics',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='dashboard.course')),
+                ('enrollment_count', models.IntegerField(default=0)),
+                ('graded_count', models.IntegerField(default=0)),
+                ('passing_count', models.IntegerField(default=0)),
+                ('grade_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('assessment_count', models.IntegerField(default=0)),
+                ('assessment_score_sum', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['assessment_type', 'date', 'id'], name='assessment_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(condition=models.Q(('present', False)), fields=['date', 'id'], name='attendance_absent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['department'], name='course_department_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['semester', 'year', 'id'], name='enrollment_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'year', 'id'], name='enrollment_course_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performancemetrics',
+            index=models.Index(fields=['semester', 'year'], include=('student', 'gpa', 'attendance_rate'), name='performance_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['race_ethnicity', 'parental_education', 'lunch_type', 'gender'], include=('math_score', 'reading_score', 'writing_score'), name='student_demographics_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['math_score', 'id'], name='student_math_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['reading_score', 'id'], name='student_reading_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['writing_score', 'id'], name='student_writing_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 10000
+
+
+def bitmap(enrollment_id, days):
+    """AttendanceBitmap of one enrollment's {date: present}, as in dashboard.attendance_bitmaps."""
+    start = min(days)
+    recorded = present = 0
+    for day, attended in days.items():
+        offset = (day - start).days
+        recorded |= 1 << offset
+        if attended:
+            present |= 1 << offset
+    length = (recorded.bit_length() + 7) // 8
+    return {
+        'enrollment_id': enrollment_id,
+        'start_date': start,
+        'recorded': recorded.to_bytes(length, 'little'),
+        'present': present.to_bytes(length, 'little'),
+        'recorded_count': recorded.bit_count(),
+        'present_count': present.bit_count(),
+    }
+
+
+def populate_bitmaps(apps, schema_editor):
+    AttendanceRecord = apps.get_model('dashboard', 'AttendanceRecord')
+    AttendanceBitmap = apps.get_model('dashboard', 'AttendanceBitmap')
+    Enrollment = apps.get_model('dashboard', 'Enrollment')
+    enrollment_ids = list(Enrollment.objects.order_by('pk').values_list('pk', flat=True))
+    for first in range(0, len(enrollment_ids), BATCH_SIZE):
+        days = {}
+        for enrollment_id, day, present in AttendanceRecord.objects.filter(
+            enrollment_id__in=enrollment_ids[first:first + BATCH_SIZE]
+        ).values_list('enrollment_id', 'date', 'present'):
+            days.setdefault(enrollment_id, {})[day] = present
+        AttendanceBitmap.objects.bulk_create([
+            AttendanceBitmap(**bitmap(enrollment_id, records))
+            for enrollment_id, records in days.items()
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceBitmap',
+            fields=[
+                ('enrollment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attendance_bitmap', serialize=False, to='dashboard.enrollment')),
+                ('start_date', models.DateField()),
+                ('recorded', models.BinaryField(default=b'')),
+                ('present', models.BinaryField(default=b'')),
+                ('recorded_count', models.IntegerField(default=0)),
+                ('present_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_bitmaps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,141 @@
+import re
+from datetime import date
+
+from django.db import migrations
+
+TABLES = ['dashboard_assessment', 'dashboard_attendancerecord']
+PARTITION_KEY = 'date'
+
+
+def column_names(cursor, table, numbers):
+    cursor.execute(
+        'SELECT attnum, attname FROM pg_attribute WHERE attrelid = %s::regclass',
+        [table]
+    )
+    names = dict(cursor.fetchall())
+    return [names[number] for number in numbers]
+
+
+def create_partition(cursor, quote, table, year):
+    """Add the yearly partition of `year` (None: the default) to an empty `table`."""
+    if year is None:
+        cursor.execute(
+            f'CREATE TABLE {quote(table + "_default")} PARTITION OF {quote(table)} DEFAULT'
+        )
+        return
+    cursor.execute(
+        f'CREATE TABLE {quote(f"{table}_{year}")} PARTITION OF {quote(table)} '
+        'FOR VALUES FROM (%s) TO (%s)',
+        [date(year, 1, 1), date(year + 1, 1, 1)]
+    )
+
+
+def convert(cursor, quote, table, partition_key=None, years=()):
+    """Rebuild `table` as partitioned by `partition_key`, or as a plain table.
+
+    Rows, the identity sequence position, indexes and constraints carry
+    over under their original names; the partition key is added to or
+    removed from the primary key. Partitioned tables get a partition for
+    each of `years` and for each year found in the data, plus the default.
+    """
+    old = f'{table}_unconverted'
+    cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}')
+
+    cursor.execute(
+        'SELECT c.relname, pg_get_indexdef(c.oid) FROM pg_index x '
+        'JOIN pg_class c ON c.oid = x.indexrelid WHERE x.indrelid = %s::regclass '
+        'AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = c.oid '
+        'AND k.conrelid = x.indrelid)',
+        [old]
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        "SELECT conname, contype, conkey, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f', 'c')",
+        [old]
+    )
+    constraints = cursor.fetchall()
+    # Free the names for the new table
+    for name, _ in indexes:
+        cursor.execute(f'ALTER INDEX {quote(name)} RENAME TO {quote(name + "_unconverted")}')
+    for name, *_ in constraints:
+        cursor.execute(
+            f'ALTER TABLE {quote(old)} RENAME CONSTRAINT {quote(name)} '
+            f'TO {quote(name + "_unconverted")}'
+        )
+
+    partitioning = f' PARTITION BY RANGE ({quote(partition_key)})' if partition_key else ''
+    cursor.execute(
+        f'CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS '
+        f'INCLUDING IDENTITY INCLUDING STORAGE){partitioning}'
+    )
+    if partition_key:
+        cursor.execute(
+            f'SELECT DISTINCT EXTRACT(YEAR FROM {quote(partition_key)})::int FROM {quote(old)}'
+        )
+        for year in sorted({row[0] for row in cursor.fetchall()} | set(years)):
+            create_partition(cursor, quote, table, year)
+        create_partition(cursor, quote, table, None)
+    cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(old)}')
+    cursor.execute(
+        'SELECT setval(pg_get_serial_sequence(%s, %s), '
+        'nextval(pg_get_serial_sequence(%s, %s)), false)',
+        [table, 'id', old, 'id']
+    )
+
+    for name, contype, columns, definition in constraints:
+        if contype == 'p':
+            columns = column_names(cursor, old, columns)
+            if partition_key and partition_key not in columns:
+                columns.append(partition_key)
+            elif not partition_key and len(columns) > 1 and 'id' in columns:
+                columns = ['id']
+            definition = f'PRIMARY KEY ({", ".join(quote(column) for column in columns)})'
+        cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}')
+    # Definitions read before the renames still carry the original names
+    for _, definition in indexes:
+        definition = re.sub(
+            r' ON (ONLY )?\S+ USING ', f' ON {quote(table)} USING ', definition, count=1
+        )
+        cursor.execute(definition)
+    cursor.execute(
+        'SELECT pg_get_serial_sequence(%s, %s), pg_get_serial_sequence(%s, %s)',
+        [old, 'id', table, 'id']
+    )
+    old_sequence, sequence = cursor.fetchone()
+    cursor.execute(f'DROP TABLE {quote(old)} CASCADE')
+    # The new identity sequence was given a suffixed name while the old one existed
+    cursor.execute(
+        f'ALTER SEQUENCE {sequence} RENAME TO {quote(old_sequence.split(".")[-1])}'
+    )
+
+
+def partition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    this_year = date.today().year
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            convert(
+                cursor, schema_editor.quote_name, table, PARTITION_KEY,
+                years=[this_year, this_year + 1]
+            )
+
+
+def unpartition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            convert(cursor, schema_editor.quote_name, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_attendancebitmap'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
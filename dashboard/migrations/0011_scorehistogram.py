@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:33
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+DIMENSIONS = ['gender', 'race_ethnicity', 'parental_education', 'lunch_type', 'test_preparation']
+# Buckets of each histogram, as in dashboard.score_histograms
+SUBJECTS = {'math': 101, 'reading': 101, 'writing': 101, 'total': 301}
+
+
+def populate_histograms(apps, schema_editor):
+    # Off PostgreSQL the histograms are not stored, see dashboard.score_histograms
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Student = apps.get_model('dashboard', 'Student')
+    ScoreHistogram = apps.get_model('dashboard', 'ScoreHistogram')
+    counts = {}
+    for row in Student.objects.values_list(
+        *DIMENSIONS, 'math_score', 'reading_score', 'writing_score'
+    ).iterator():
+        cell, scores = row[:len(DIMENSIONS)], row[len(DIMENSIONS):]
+        vectors = counts.get(cell)
+        if vectors is None:
+            vectors = counts[cell] = {subject: [0] * size for subject, size in SUBJECTS.items()}
+        for subject, score in zip(SUBJECTS, (*scores, sum(scores))):
+            vectors[subject][score] += 1
+    ScoreHistogram.objects.bulk_create([
+        ScoreHistogram(
+            **dict(zip(DIMENSIONS, cell)),
+            **{f'{subject}_counts': vectors[subject] for subject in SUBJECTS}
+        )
+        for cell, vectors in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_partition_dated_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gender', models.CharField(max_length=1)),
+                ('race_ethnicity', models.CharField(max_length=1)),
+                ('parental_education', models.CharField(max_length=50)),
+                ('lunch_type', models.CharField(max_length=20)),
+                ('test_preparation', models.CharField(max_length=20)),
+                ('math_counts', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=101)),
+                ('reading_counts', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=101)),
+                ('writing_counts', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=101)),
+                ('total_counts', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=301)),
+            ],
+            options={
+                'unique_together': {('gender', 'race_ethnicity', 'parental_education', 'lunch_type', 'test_preparation')},
+            },
+        ),
+        migrations.RunPython(populate_histograms, migrations.RunPython.noop),
+    ]
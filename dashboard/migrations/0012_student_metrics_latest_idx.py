@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_scorehistogram'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentperformancemetrics',
+            index=models.Index(fields=['student', '-created_at', '-id'], name='metrics_student_latest_idx'),
+        ),
+    ]
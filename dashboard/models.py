@@ -25,6 +25,29 @@ class Student(models.Model):
     parental_education = models.CharField(max_length=50, default='high school')
     lunch_type = models.CharField(max_length=20, default='standard')
     test_preparation = models.CharField(max_length=20, default='none')
+    # Hash of the normalized source row, set by incremental imports
+    fingerprint = models.CharField(
+        max_length=32,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False
+    )
+
+    class Meta:
+        indexes = [
+            # Demographic filters, most selective combinations first; the
+            # scores ride along so filtered counts can be index-only scans
+            models.Index(
+                fields=['race_ethnicity', 'parental_education', 'lunch_type', 'gender'],
+                include=['math_score', 'reading_score', 'writing_score'],
+                name='student_demographics_idx'
+            ),
+            # ?ordering= on each score
+            models.Index(fields=['math_score', 'id'], name='student_math_idx'),
+            models.Index(fields=['reading_score', 'id'], name='student_reading_idx'),
+            models.Index(fields=['writing_score', 'id'], name='student_writing_idx'),
+        ]
     
     @property
     def average_score(self):
@@ -33,6 +56,30 @@ class Student(models.Model):
     def __str__(self):
         return f"Student (ID: {self.id})"
 
+class ScoreHistogram(models.Model):
+    """Score counts of the students in one demographic cell, kept current by dashboard.signals.
+
+    Element ``v`` of each array counts the students with score (or 0-300
+    score total) ``v``. See dashboard.score_histograms.
+    """
+    gender = models.CharField(max_length=1)
+    race_ethnicity = models.CharField(max_length=1)
+    parental_education = models.CharField(max_length=50)
+    lunch_type = models.CharField(max_length=20)
+    test_preparation = models.CharField(max_length=20)
+    math_counts = ArrayField(models.IntegerField(), size=101)
+    reading_counts = ArrayField(models.IntegerField(), size=101)
+    writing_counts = ArrayField(models.IntegerField(), size=101)
+    total_counts = ArrayField(models.IntegerField(), size=301)
+
+    class Meta:
+        unique_together = [
+            'gender', 'race_ethnicity', 'parental_education', 'lunch_type', 'test_preparation'
+        ]
+
+    def __str__(self):
+        return f"Score histogram {self.pk}"
+
 class Course(models.Model):
     course_code = models.CharField(max_length=20, unique=True)
     course_name = models.CharField(max_length=200)
@@ -42,10 +89,34 @@ class Course(models.Model):
         decimal_places=1,
         validators=[MinValueValidator(0)]
     )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['department'], name='course_department_idx'),
+        ]
     
     def __str__(self):
         return f"{self.course_code}: {self.course_name}"
 
+class CourseStatistics(models.Model):
+    """Running totals behind `course_stats`, kept current by dashboard.signals."""
+    course = models.OneToOneField(
+        Course,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='statistics'
+    )
+    enrollment_count = models.IntegerField(default=0)
+    graded_count = models.IntegerField(default=0)
+    passing_count = models.IntegerField(default=0)
+    grade_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    assessment_count = models.IntegerField(default=0)
+    assessment_score_sum = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Statistics for course {self.course_id}"
+
 class Enrollment(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
@@ -61,6 +132,13 @@ class Enrollment(models.Model):
     
     class Meta:
         unique_together = ['student', 'course', 'semester', 'year']
+        indexes = [
+            # Keyset pagination order of the enrollment list, unfiltered and
+            # filtered by period or course
+            models.Index(fields=['year', 'id'], name='enrollment_year_id_idx'),
+            models.Index(fields=['semester', 'year', 'id'], name='enrollment_period_idx'),
+            models.Index(fields=['course', 'year', 'id'], name='enrollment_course_year_idx'),
+        ]
 
 class Assessment(models.Model):
     ASSESSMENT_TYPES = [
@@ -84,31 +162,112 @@ class Assessment(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
 
+    class Meta:
+        # Partitioned by year of `date` on PostgreSQL, where the primary key
+        # is (id, date); see dashboard.partitioning
+        indexes = [
+            # Keyset pagination order, overall and per enrollment
+            models.Index(fields=['date', 'id'], name='assessment_date_id_idx'),
+            models.Index(
+                fields=['enrollment', 'date', 'id'], name='assessment_enrollment_date_idx'
+            ),
+            models.Index(fields=['assessment_type', 'date', 'id'], name='assessment_type_date_idx'),
+        ]
+
 class AttendanceRecord(models.Model):
     enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE)
     date = models.DateField()
     present = models.BooleanField()
     
     class Meta:
+        # Partitioned like Assessment, which this constraint allows as it
+        # includes `date`. It also serves keyset pagination of one
+        # enrollment's records, since the date is unique within it
         unique_together = ['enrollment', 'date']
+        indexes = [
+            models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+            # Absences are the minority worth looking up; ?present=false
+            models.Index(
+                fields=['date', 'id'],
+                condition=models.Q(present=False),
+                name='attendance_absent_idx'
+            ),
+        ]
+
+class AttendanceBitmap(models.Model):
+    """An enrollment's attendance as day bitsets, kept current by dashboard.signals.
+
+    See dashboard.attendance_bitmaps for the layout.
+    """
+    enrollment = models.OneToOneField(
+        Enrollment,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='attendance_bitmap'
+    )
+    start_date = models.DateField()
+    recorded = models.BinaryField(default=b'')
+    present = models.BinaryField(default=b'')
+    recorded_count = models.IntegerField(default=0)
+    present_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Attendance bitmap for enrollment {self.enrollment_id}"
 
 class PerformanceMetrics(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     semester = models.CharField(max_length=20)
     year = models.IntegerField()
+    # Null while the semester has no graded enrollment or attendance record
     gpa = models.DecimalField(
         max_digits=3,
         decimal_places=2,
-        validators=[MinValueValidator(0), MaxValueValidator(4)]
+        validators=[MinValueValidator(0), MaxValueValidator(4)],
+        null=True
     )
     attendance_rate = models.DecimalField(
         max_digits=5,
         decimal_places=2,
-        validators=[MinValueValidator(0), MaxValueValidator(100)]
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        null=True
     )
     
     class Meta:
         unique_together = ['student', 'semester', 'year']
+        indexes = [
+            # Per-period reports read only the metrics themselves
+            models.Index(
+                fields=['semester', 'year'],
+                include=['student', 'gpa', 'attendance_rate'],
+                name='performance_period_idx'
+            ),
+        ]
+
+class PerformanceMetricsChange(models.Model):
+    """A student semester whose PerformanceMetrics are out of date.
+
+    Appended by dashboard.signals and consumed by the incremental rollup.
+    The student is not a foreign key so that entries written while a
+    student is being deleted do not block the deletion.
+    """
+    student_id = models.BigIntegerField()
+    semester = models.CharField(max_length=20)
+    year = models.IntegerField()
+
+class RollupWatermark(models.Model):
+    """Lock row of a rollup, and the highest change log entry it consumed."""
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class StudentPerformanceMetricsQuerySet(models.QuerySet):
+    def latest_per_student(self):
+        """The newest snapshot of each student.
+
+        One ``DISTINCT ON (student_id)`` pass over metrics_student_latest_idx,
+        which yields every student's newest snapshot first.
+        """
+        return self.order_by('student_id', '-created_at', '-id').distinct('student_id')
 
 class StudentPerformanceMetrics(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -138,5 +297,13 @@ class StudentPerformanceMetrics(models.Model):
         default=0
     )
     
+    objects = StudentPerformanceMetricsQuerySet.as_manager()
+
     class Meta:
         get_latest_by = 'created_at'
+        indexes = [
+            # Snapshots are append-only; this finds each student's newest one
+            models.Index(
+                fields=['student', '-created_at', '-id'], name='metrics_student_latest_idx'
+            ),
+        ]
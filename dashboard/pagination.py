@@ -0,0 +1,139 @@
+"""Keyset pagination for the high-volume list endpoints.
+
+A page is read as ``WHERE (date, id) > (last date, last id) ORDER BY
+date, id LIMIT n`` rather than with an OFFSET, so with a matching index
+every page costs the same short range scan however deep it is. There is
+no total count either. The position is handed to clients as an opaque
+cursor in the ``next`` and ``previous`` links.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a unique, ascending multi-column ordering.
+
+    The last field of `ordering` must be unique (normally ``id``) so that
+    every row has a distinct position.
+    """
+    ordering = ('id',)
+    # Sorted after `ordering` the same way in both directions; decides
+    # which row a DISTINCT ON over `ordering` keeps
+    then_by = ()
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        position, reverse = self.decode_cursor(request)
+
+        ordering = [f'-{field}' if reverse else field for field in self.ordering]
+        queryset = queryset.order_by(*ordering, *self.then_by)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.beyond(position, reverse))
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # An empty page still links back to where it was reached from
+        self.first_position = self.position(rows[0]) if rows else position
+        self.last_position = self.position(rows[-1]) if rows else position
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.first_position, reverse=True)
+
+    def position(self, row):
+        if isinstance(row, dict):
+            return [row[field] for field in self.ordering]
+        return [getattr(row, field) for field in self.ordering]
+
+    def beyond(self, position, reverse):
+        """Rows strictly after `position` in the (possibly reversed) ordering."""
+        if len(position) != len(self.ordering):
+            raise ValueError('Cursor does not match the ordering')
+        lookup = 'lt' if reverse else 'gt'
+        condition = None
+        for field, value in reversed(list(zip(self.ordering, position))):
+            strictly = Q(**{f'{field}__{lookup}': value})
+            condition = strictly if condition is None else (
+                strictly | Q(**{field: value}) & condition
+            )
+        # Redundant, but gives the planner a plain range on the leading column
+        leading = Q(**{f'{self.ordering[0]}__{lookup}e': position[0]})
+        return leading & condition
+
+    def encode_cursor(self, position, reverse):
+        if position is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        payload = json.dumps({'p': position, 'r': int(reverse)}, cls=DjangoJSONEncoder)
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """The (position, reverse) in the request's cursor; (None, False) without one."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return list(payload['p']), bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class DateKeysetPagination(KeysetPagination):
+    ordering = ('date', 'id')
+
+
+class YearKeysetPagination(KeysetPagination):
+    ordering = ('year', 'id')
+
+
+class StudentKeysetPagination(KeysetPagination):
+    """Pages of the newest metrics snapshot of each student, by student."""
+    ordering = ('student_id',)
+    then_by = ('-created_at', '-id')
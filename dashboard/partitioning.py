@@ -0,0 +1,201 @@
+"""PostgreSQL range partitioning of the dated tables by year.
+
+Assessment and AttendanceRecord are partitioned by RANGE on `date`, with
+one partition per calendar year, named ``<table>_<year>``, and a
+``<table>_default`` partition that takes any date without one. Rows go by
+their own date, not their enrollment's `year`, so a term that runs into
+January spreads over two partitions. Queries with constant bounds on `date`,
+such as the API's date filters and keyset pages, only scan the
+partitions those bounds overlap, and old years can be detached and
+archived as whole tables.
+
+PostgreSQL requires every unique constraint of a partitioned table to
+include the partition key. The primary key in the database is therefore
+(id, date), while Django keeps treating `id` as the primary key. Ids
+still come from a single identity sequence, so they stay unique.
+"""
+import re
+from datetime import date
+from functools import partial
+
+from django.db import connection, transaction
+
+from . import attendance_bitmaps, course_statistics
+from .caching import invalidate
+from .models import Assessment, AttendanceRecord, Enrollment, PerformanceMetricsChange
+
+PARTITIONED_MODELS = [Assessment, AttendanceRecord]
+PARTITION_KEY = 'date'
+
+
+def partition_name(table, year):
+    return f'{table}_{year}' if year is not None else f'{table}_default'
+
+
+def year_bounds(year):
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def free_name(cursor, name):
+    """`name`, or `name` with the lowest numeric suffix no relation has yet.
+
+    A detached partition that has not been archived keeps its name, so the
+    partition of a stray row of its year has to take another one.
+    """
+    candidate, number = name, 1
+    while True:
+        cursor.execute('SELECT to_regclass(%s)', [connection.ops.quote_name(candidate)])
+        if cursor.fetchone()[0] is None:
+            return candidate
+        number += 1
+        candidate = f'{name}_{number}'
+
+
+def is_partitioned(cursor, table):
+    cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass', [table])
+    return cursor.fetchone() is not None
+
+
+def partitions(cursor, table):
+    """{year: partition name} of `table`; the default partition is under None."""
+    cursor.execute(
+        'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass',
+        [table]
+    )
+    result = {}
+    for name, bound in cursor.fetchall():
+        if bound == 'DEFAULT':
+            result[None] = name
+        else:
+            result[int(re.search(r"FROM \('(\d{4})-", bound).group(1))] = name
+    return result
+
+
+def create_partition(cursor, table, year):
+    """Add the partition for `year` (None: the default) unless it exists.
+
+    Rows of that year already in the default partition are moved into it.
+    Returns the name of the new partition, or None if it existed.
+    """
+    quote = connection.ops.quote_name
+    existing = partitions(cursor, table)
+    if year in existing:
+        return None
+    name = free_name(cursor, partition_name(table, year))
+    if year is None:
+        cursor.execute(f'CREATE TABLE {quote(name)} PARTITION OF {quote(table)} DEFAULT')
+        return name
+
+    start, end = year_bounds(year)
+    cursor.execute(f'CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS)')
+    if None in existing:
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {quote(existing[None])} '
+            f'WHERE {quote(PARTITION_KEY)} >= %s AND {quote(PARTITION_KEY)} < %s '
+            f'RETURNING *) INSERT INTO {quote(name)} SELECT * FROM moved',
+            [start, end]
+        )
+    cursor.execute(
+        f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} '
+        'FOR VALUES FROM (%s) TO (%s)',
+        [start, end]
+    )
+    return name
+
+
+def ensure_partitions(through_year):
+    """Create partitions up to `through_year`, and for years stuck in the default.
+
+    Every partitioned table gets one for each year from its newest
+    partition (or this year) on. Returns the names of the new partitions.
+    """
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            existing = partitions(cursor, table)
+            years = [year for year in existing if year is not None]
+            first = max(years) + 1 if years else date.today().year
+            wanted = set(range(first, through_year + 1))
+            if None in existing:
+                cursor.execute(
+                    f'SELECT DISTINCT EXTRACT(YEAR FROM {connection.ops.quote_name(PARTITION_KEY)})'
+                    f'::int FROM {connection.ops.quote_name(existing[None])}'
+                )
+                wanted |= {row[0] for row in cursor.fetchall()}
+            for year in sorted(wanted):
+                name = create_partition(cursor, table, year)
+                if name is not None:
+                    created.append(name)
+    return created
+
+
+def detach_partitions(before_year):
+    """Detach the yearly partitions of years before `before_year`.
+
+    The detached tables keep their rows but lose their foreign keys, so
+    that enrollments can still be deleted. The data derived from their
+    rows is then rebuilt without them, see `refresh_derived`. Returns
+    their names.
+    """
+    quote = connection.ops.quote_name
+    detached, enrollment_ids = [], set()
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Dropping a foreign key alters the referenced table too, which
+        # PostgreSQL refuses while deferred checks are still queued
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            for year, name in sorted(
+                (year, name) for year, name in partitions(cursor, table).items()
+                if year is not None and year < before_year
+            ):
+                cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+                cursor.execute(
+                    "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass "
+                    "AND contype = 'f'",
+                    [name]
+                )
+                for (constraint,) in cursor.fetchall():
+                    cursor.execute(
+                        f'ALTER TABLE {quote(name)} DROP CONSTRAINT {quote(constraint)}'
+                    )
+                cursor.execute(f'SELECT DISTINCT enrollment_id FROM {quote(name)}')
+                enrollment_ids.update(row[0] for row in cursor.fetchall())
+                detached.append(name)
+        if enrollment_ids:
+            refresh_derived(sorted(enrollment_ids))
+    return detached
+
+
+def refresh_derived(enrollment_ids):
+    """Recompute what is derived from the assessments and attendance of enrollments.
+
+    Called with the enrollments that had rows in detached partitions. Only
+    their courses' statistics, their attendance bitmaps and their student
+    semesters' performance metrics change; the metrics are queued for the
+    next rollup.
+    """
+    enrollments = Enrollment.objects.filter(pk__in=enrollment_ids)
+    course_ids = sorted(set(enrollments.values_list('course_id', flat=True)))
+    keys = set(enrollments.values_list('student_id', 'semester', 'year'))
+    course_statistics.rebuild(course_ids)
+    attendance_bitmaps.rebuild(enrollment_ids)
+    PerformanceMetricsChange.objects.bulk_create([
+        PerformanceMetricsChange(student_id=student_id, semester=semester, year=year)
+        for student_id, semester, year in keys
+    ])
+    transaction.on_commit(partial(invalidate, 'course_stats', *course_ids))
+    transaction.on_commit(partial(
+        invalidate, 'performance_summary', *{student_id for student_id, _, _ in keys}
+    ))
+
+
+def archive_table(name, path):
+    """Write a detached partition to `path` as CSV with a header, then drop it."""
+    quote = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor, \
+            open(path, 'w', newline='') as file:
+        cursor.copy_expert(f'COPY {quote(name)} TO STDOUT WITH (FORMAT csv, HEADER)', file)
+        cursor.execute(f'DROP TABLE {quote(name)}')
@@ -0,0 +1,186 @@
+"""Set-based rollup of PerformanceMetrics.
+
+A student's GPA for a semester is the credit-weighted mean grade point of
+their graded enrollments that semester; the attendance rate is the share
+of that semester's attendance records marked present, as a percentage,
+read from the per-enrollment counts of the attendance bitmaps.
+Each comes out of one grouped query, both streamed in the same
+(student, year, semester) order, merged and upserted in batches.
+
+The incremental rollup only recomputes the student semesters named in the
+PerformanceMetricsChange log, and then deletes exactly the entries it
+read. Entries are not consumed up to a high-water mark: ids come from a
+sequence, so a change can commit after a rollup read the log with a
+lower id than the ones it saw. Such an entry simply stays in the log
+for the next rollup.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case, DecimalField, Exists, F, OuterRef, Q, Sum, Value, When
+)
+
+from .models import (
+    AttendanceBitmap, Enrollment, PerformanceMetrics,
+    PerformanceMetricsChange, RollupWatermark
+)
+from .student_csv import chunked
+
+WATERMARK = 'performance_metrics'
+DEFAULT_BATCH_SIZE = 1000
+# Lowest final grade earning each grade point
+GRADE_POINTS = [(90, 4), (80, 3), (70, 2), (60, 1)]
+KEY_FIELDS = ['student_id', 'year', 'semester']
+CENTS = Decimal('0.01')
+
+
+def grade_points():
+    return Case(
+        *[When(final_grade__gte=grade, then=Value(points)) for grade, points in GRADE_POINTS],
+        default=Value(0),
+        output_field=DecimalField(max_digits=2, decimal_places=0)
+    )
+
+
+def gpa_totals(student_ids=None):
+    """Grade points times credits, and credits, per student semester."""
+    enrollments = Enrollment.objects.all()
+    if student_ids is not None:
+        enrollments = enrollments.filter(student_id__in=student_ids)
+    graded = Q(final_grade__isnull=False)
+    return enrollments.values(*KEY_FIELDS).annotate(
+        points=Sum(grade_points() * F('course__credits'), filter=graded),
+        credits=Sum('course__credits', filter=graded),
+    ).order_by(*KEY_FIELDS)
+
+
+def attendance_totals(student_ids=None):
+    """Present and recorded attendance counts per student semester."""
+    bitmaps = AttendanceBitmap.objects.all()
+    if student_ids is not None:
+        bitmaps = bitmaps.filter(enrollment__student_id__in=student_ids)
+    return bitmaps.values(
+        student_id=F('enrollment__student_id'),
+        year=F('enrollment__year'),
+        semester=F('enrollment__semester'),
+    ).annotate(
+        present_count=Sum('present_count'),
+        recorded=Sum('recorded_count'),
+    ).order_by(*KEY_FIELDS)
+
+
+def row_key(row):
+    return tuple(row[field] for field in KEY_FIELDS)
+
+
+def compute_metrics(student_ids=None, keys=None, chunk_size=DEFAULT_BATCH_SIZE):
+    """Yield unsaved PerformanceMetrics for every student semester.
+
+    `student_ids` limits the aggregates to those students and `keys`, a set
+    of (student_id, year, semester), further limits which rows are yielded.
+    """
+    # Every attendance record belongs to an enrollment, so each attendance
+    # group lines up with a GPA group in the same order
+    attendance = attendance_totals(student_ids).iterator(chunk_size=chunk_size)
+    pending = next(attendance, None)
+    for row in gpa_totals(student_ids).iterator(chunk_size=chunk_size):
+        key = row_key(row)
+        attendance_rate = None
+        if pending is not None and row_key(pending) == key:
+            attendance_rate = (
+                Decimal(100 * pending['present_count']) / pending['recorded']
+            ).quantize(CENTS, ROUND_HALF_UP)
+            pending = next(attendance, None)
+        if keys is not None and key not in keys:
+            continue
+
+        gpa = None
+        if row['credits']:
+            gpa = (row['points'] / row['credits']).quantize(CENTS, ROUND_HALF_UP)
+        yield PerformanceMetrics(
+            student_id=row['student_id'],
+            year=row['year'],
+            semester=row['semester'],
+            gpa=gpa,
+            attendance_rate=attendance_rate
+        )
+
+
+def upsert(metrics, batch_size=DEFAULT_BATCH_SIZE):
+    """Insert or overwrite the given metrics; returns how many were written."""
+    written = 0
+    for batch in chunked(metrics, batch_size):
+        PerformanceMetrics.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['student', 'semester', 'year'],
+            update_fields=['gpa', 'attendance_rate']
+        )
+        written += len(batch)
+    return written
+
+
+def delete_orphans(student_ids=None):
+    """Delete metrics for semesters the student no longer has enrollments in."""
+    metrics = PerformanceMetrics.objects.all()
+    if student_ids is not None:
+        metrics = metrics.filter(student_id__in=student_ids)
+    enrolled = Enrollment.objects.filter(
+        student=OuterRef('student'), semester=OuterRef('semester'), year=OuterRef('year')
+    )
+    deleted, _ = metrics.filter(~Exists(enrolled)).delete()
+    return deleted
+
+
+def lock_watermark():
+    """Lock this rollup's watermark row, so that rollups run one at a time."""
+    watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+    return watermark
+
+
+def consume_changes(watermark, change_ids, batch_size=DEFAULT_BATCH_SIZE):
+    """Drop exactly the change log entries a rollup has read.
+
+    The watermark records the highest of them, for information only.
+    """
+    if not change_ids:
+        return
+    for chunk in chunked(change_ids, batch_size):
+        PerformanceMetricsChange.objects.filter(id__in=chunk).delete()
+    watermark.position = max(watermark.position, max(change_ids))
+    watermark.save()
+
+
+def rollup_all(batch_size=DEFAULT_BATCH_SIZE):
+    """Recompute every PerformanceMetrics row; returns (written, deleted)."""
+    with transaction.atomic():
+        watermark = lock_watermark()
+        # Read before the recomputation, which covers everything they name
+        change_ids = list(PerformanceMetricsChange.objects.values_list('id', flat=True))
+        written = upsert(compute_metrics(chunk_size=batch_size), batch_size)
+        deleted = delete_orphans()
+        consume_changes(watermark, change_ids, batch_size)
+    return written, deleted
+
+
+def rollup_incremental(batch_size=DEFAULT_BATCH_SIZE):
+    """Recompute the student semesters named in the change log.
+
+    Returns (written, deleted).
+    """
+    with transaction.atomic():
+        watermark = lock_watermark()
+        changes = list(PerformanceMetricsChange.objects.values_list('id', *KEY_FIELDS))
+        if not changes:
+            return 0, 0
+
+        keys = {tuple(change[1:]) for change in changes}
+        written = deleted = 0
+        for student_ids in chunked(sorted({key[0] for key in keys}), batch_size):
+            written += upsert(
+                compute_metrics(student_ids, keys, chunk_size=batch_size), batch_size
+            )
+            deleted += delete_orphans(student_ids)
+        consume_changes(watermark, [change[0] for change in changes], batch_size)
+    return written, deleted
@@ -0,0 +1,264 @@
+"""Score count histograms of every demographic cell of students.
+
+The three test scores are integers from 0 to 100, so the scores of any
+set of students form a 101-bucket count vector, and their 0-300 totals,
+which order students like their average, a 301-bucket one. A
+ScoreHistogram row holds these vectors for one cell, i.e. one combination
+of the five cohort dimensions, of which there are a few hundred at most.
+The distribution of any cohort is the sum of its cells' vectors, and
+percentile ranks are read off its cumulative sum without touching the
+Student table.
+
+Saves and deletes adjust single buckets with ``UPDATE ... SET counts[i] =
+counts[i] + d``, so concurrent writers never lose each other's changes.
+Bulk imports count their rows with `count_students` and add the vectors
+with `add_counts`; `rebuild` recounts everything from the students.
+
+The vectors are PostgreSQL arrays. On other databases, see `supported`,
+nothing is stored: saves, imports and `rebuild` leave the histograms
+alone, and `cohort_counts` counts the matching students instead.
+"""
+import math
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Count, F
+
+from .cohorts import DIMENSIONS
+from .models import ScoreHistogram, Student
+from .percentiles import MAX_SCORE, histogram_ranks
+
+# Buckets of each histogram
+SUBJECTS = {
+    'math': MAX_SCORE + 1,
+    'reading': MAX_SCORE + 1,
+    'writing': MAX_SCORE + 1,
+    'total': 3 * MAX_SCORE + 1,
+}
+
+
+def supported():
+    """Whether the database can store the histograms."""
+    return connection.vendor == 'postgresql'
+
+
+def counts_field(subject):
+    return f'{subject}_counts'
+
+
+def empty_counts():
+    return {subject: np.zeros(size, dtype=np.int64) for subject, size in SUBJECTS.items()}
+
+
+def cell_of(values):
+    """The cell of a student, from its field values."""
+    return tuple(values[dimension] for dimension in DIMENSIONS)
+
+
+def student_scores(values):
+    """The bucket a student falls in for each subject, from its field values."""
+    scores = {
+        subject: int(values[f'{subject}_score']) for subject in ('math', 'reading', 'writing')
+    }
+    scores['total'] = sum(scores.values())
+    for subject, score in scores.items():
+        if not 0 <= score < SUBJECTS[subject]:
+            raise ValueError(f'Scores must lie between 0 and {MAX_SCORE}')
+    return scores
+
+
+def update_cell(cell, assignments, params):
+    """Run an UPDATE of one cell's row; returns whether the row exists."""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {quote(ScoreHistogram._meta.db_table)} SET {", ".join(assignments)} '
+            f'WHERE {" AND ".join(f"{quote(dimension)} = %s" for dimension in DIMENSIONS)}',
+            list(params) + list(cell)
+        )
+        return cursor.rowcount > 0
+
+
+def create_cell(cell):
+    ScoreHistogram.objects.get_or_create(
+        **dict(zip(DIMENSIONS, cell)),
+        defaults={counts_field(subject): [0] * size for subject, size in SUBJECTS.items()}
+    )
+
+
+def apply_change(old=None, new=None):
+    """Move a student from field values `old` to `new` in the histograms.
+
+    Either side may be None for a student that is being created or
+    deleted. A missing cell is created only for a student entering it.
+    """
+    if not supported():
+        return
+    quote = connection.ops.quote_name
+    changes = {}
+    for values, sign in ((old, -1), (new, 1)):
+        if not values:
+            continue
+        deltas = changes.setdefault(cell_of(values), {})
+        for subject, score in student_scores(values).items():
+            deltas[subject, score] = deltas.get((subject, score), 0) + sign
+
+    for cell, deltas in changes.items():
+        assignments, params = [], []
+        for (subject, score), delta in deltas.items():
+            if delta:
+                column = quote(counts_field(subject))
+                # PostgreSQL arrays are 1-based
+                assignments.append(f'{column}[%s] = {column}[%s] + %s')
+                params += [score + 1, score + 1, delta]
+        if not assignments:
+            continue
+        if not update_cell(cell, assignments, params) and max(deltas.values()) > 0:
+            create_cell(cell)
+            update_cell(cell, assignments, params)
+
+
+def count_students(rows):
+    """Histograms ``{cell: {subject: counts}}`` of student field value dicts."""
+    counts = {}
+    for row in rows:
+        cell = cell_of(row)
+        vectors = counts.get(cell)
+        if vectors is None:
+            vectors = counts[cell] = empty_counts()
+        for subject, score in student_scores(row).items():
+            vectors[subject][score] += 1
+    return counts
+
+
+def merge(counts, more):
+    """Add the histograms `more` into `counts` and return it."""
+    for cell, vectors in more.items():
+        if cell in counts:
+            for subject in SUBJECTS:
+                counts[cell][subject] += vectors[subject]
+        else:
+            counts[cell] = vectors
+    return counts
+
+
+def add_counts(counts):
+    """Add histograms from `count_students` to the stored ones.
+
+    One ``INSERT ... ON CONFLICT DO UPDATE`` creates the missing cells and
+    adds the vectors to the existing ones bucket by bucket.
+    """
+    if not counts or not supported():
+        return
+    quote = connection.ops.quote_name
+    columns = DIMENSIONS + [counts_field(subject) for subject in SUBJECTS]
+    row = f'({", ".join(["%s"] * len(DIMENSIONS) + ["%s::integer[]"] * len(SUBJECTS))})'
+    params = []
+    for cell, vectors in sorted(counts.items()):
+        params += list(cell) + [vectors[subject].tolist() for subject in SUBJECTS]
+    sums = ', '.join(
+        f'{column} = ARRAY(SELECT a + b FROM unnest(histogram.{column}, EXCLUDED.{column}) '
+        'WITH ORDINALITY AS bucket(a, b, i) ORDER BY i)'
+        for column in (quote(counts_field(subject)) for subject in SUBJECTS)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(ScoreHistogram._meta.db_table)} AS histogram '
+            f'({", ".join(quote(column) for column in columns)}) '
+            f'VALUES {", ".join([row] * len(counts))} '
+            f'ON CONFLICT ({", ".join(quote(dimension) for dimension in DIMENSIONS)}) '
+            f'DO UPDATE SET {sums}',
+            params
+        )
+
+
+def live_counts(**filters):
+    """Histograms ``{cell: {subject: counts}}`` counted from the Student table."""
+    students = Student.objects.filter(**filters)
+    counts = {}
+    for subject in SUBJECTS:
+        if subject == 'total':
+            score = F('math_score') + F('reading_score') + F('writing_score')
+        else:
+            score = F(f'{subject}_score')
+        for row in students.values(*DIMENSIONS, score=score).annotate(
+            students=Count('pk')
+        ).order_by():
+            cell = cell_of(row)
+            if cell not in counts:
+                counts[cell] = empty_counts()
+            counts[cell][subject][row['score']] = row['students']
+    return counts
+
+
+def rebuild():
+    """Replace the stored histograms with ones counted from the students.
+
+    Returns the number of cells written, none off PostgreSQL.
+    """
+    if not supported():
+        return 0
+    counts = live_counts()
+    with transaction.atomic():
+        ScoreHistogram.objects.all().delete()
+        ScoreHistogram.objects.bulk_create([
+            ScoreHistogram(
+                **dict(zip(DIMENSIONS, cell)),
+                **{counts_field(subject): vectors[subject].tolist() for subject in SUBJECTS}
+            )
+            for cell, vectors in counts.items()
+        ])
+    return len(counts)
+
+
+def cohort_counts(**filters):
+    """Summed histograms ``{subject: counts}`` of the cells matching `filters`."""
+    totals = empty_counts()
+    if not supported():
+        for vectors in live_counts(**filters).values():
+            for subject in SUBJECTS:
+                totals[subject] += vectors[subject]
+        return totals
+    for row in ScoreHistogram.objects.filter(**filters).values_list(
+        *(counts_field(subject) for subject in SUBJECTS)
+    ):
+        for subject, counts in zip(SUBJECTS, row):
+            totals[subject] += counts
+    return totals
+
+
+def percentile_rank(counts, score):
+    """Percentile rank of `score` in a count histogram, as in dashboard.percentiles."""
+    return float(histogram_ranks(counts)[score])
+
+
+def score_at(counts, percentile):
+    """The lowest score that at least `percentile` percent of the counts lie at or below."""
+    cumulative = np.cumsum(counts)
+    if not cumulative[-1]:
+        raise ValueError('Cannot look up a percentile of an empty histogram')
+    needed = max(math.ceil(percentile / 100 * cumulative[-1]), 1)
+    return int(np.searchsorted(cumulative, needed))
+
+
+def student_percentile_ranks(math_scores, reading_scores, writing_scores, counts=None):
+    """Percentile ranks of the given scores against all stored students.
+
+    The result has the layout of dashboard.percentiles.student_percentile_ranks;
+    `counts` defaults to the histograms of every cell.
+    """
+    counts = counts or cohort_counts()
+    scores = {
+        'math': np.asarray(math_scores, dtype=np.intp),
+        'reading': np.asarray(reading_scores, dtype=np.intp),
+        'writing': np.asarray(writing_scores, dtype=np.intp),
+    }
+    scores['total'] = scores['math'] + scores['reading'] + scores['writing']
+    ranks = {}
+    for subject, values in scores.items():
+        name = 'overall' if subject == 'total' else subject
+        if values.size:
+            ranks[name] = histogram_ranks(counts[subject])[values]
+        else:
+            ranks[name] = np.empty(0, dtype=np.float64)
+    return ranks
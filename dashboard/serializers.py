@@ -1,42 +1,112 @@
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast
 from rest_framework import serializers
 from .models import (
     Student, Course, Enrollment, Assessment,
     AttendanceRecord, PerformanceMetrics, StudentPerformanceMetrics
 )
 
+
+def split_expansions(paths):
+    """Group dotted expansion paths by their first name.
+
+    ``['enrollment.course', 'student']`` becomes
+    ``{'enrollment': ['course'], 'student': []}``.
+    """
+    grouped = {}
+    for path in paths:
+        name, _, rest = path.partition('.')
+        grouped.setdefault(name, [])
+        if rest:
+            grouped[name].append(rest)
+    return grouped
+
+
+class ExpandableFieldsMixin:
+    """Nests related objects in place of their ids when asked to.
+
+    `expandable_fields` maps a foreign key field to the serializer for its
+    target. The expansions come from the ``expand`` argument or, on the
+    outermost serializer, from ``context['expand']``; dotted paths such as
+    ``enrollment.course`` expand inside the nested serializer too.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+        if expand is None:
+            expand = self.context.get('expand', ())
+        for name, nested in split_expansions(expand).items():
+            if name not in self.expandable_fields:
+                continue
+            serializer_class = self.expandable_fields[name]
+            if issubclass(serializer_class, ExpandableFieldsMixin):
+                self.fields[name] = serializer_class(read_only=True, expand=nested)
+            else:
+                self.fields[name] = serializer_class(read_only=True)
+
+    @classmethod
+    def expandable_paths(cls):
+        """Every expansion path this serializer understands."""
+        paths = []
+        for name, serializer_class in cls.expandable_fields.items():
+            paths.append(name)
+            if issubclass(serializer_class, ExpandableFieldsMixin):
+                paths.extend(
+                    f'{name}.{path}' for path in serializer_class.expandable_paths()
+                )
+        return paths
+
 class StudentSerializer(serializers.ModelSerializer):
     average_score = serializers.FloatField(read_only=True)
+    # Computed in SQL when lists are served from .values() rows
+    values_annotations = {
+        'average_score': Cast(
+            F('math_score') + F('reading_score') + F('writing_score'), FloatField()
+        ) / Cast(Value(3), FloatField()),
+    }
     
     class Meta:
         model = Student
-        fields = '__all__'
+        exclude = ['fingerprint']
 
 class CourseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = '__all__'
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'student': StudentSerializer, 'course': CourseSerializer}
+
     class Meta:
         model = Enrollment
         fields = '__all__'
 
-class AssessmentSerializer(serializers.ModelSerializer):
+class AssessmentSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'enrollment': EnrollmentSerializer}
+
     class Meta:
         model = Assessment
         fields = '__all__'
 
-class AttendanceRecordSerializer(serializers.ModelSerializer):
+class AttendanceRecordSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'enrollment': EnrollmentSerializer}
+
     class Meta:
         model = AttendanceRecord
         fields = '__all__'
 
-class PerformanceMetricsSerializer(serializers.ModelSerializer):
+class PerformanceMetricsSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'student': StudentSerializer}
+
     class Meta:
         model = PerformanceMetrics
         fields = '__all__'
 
-class StudentPerformanceMetricsSerializer(serializers.ModelSerializer):
+class StudentPerformanceMetricsSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'student': StudentSerializer}
+
     class Meta:
         model = StudentPerformanceMetrics
         fields = '__all__' 
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""Keep derived analytics in step with the rows they are computed from.
+
+CourseStatistics totals, ScoreHistogram buckets and AttendanceBitmap bits
+are adjusted, and the affected student semesters queued for the
+PerformanceMetrics rollup, inside the writing transaction. Cache
+invalidation runs once that transaction commits, so a request racing
+with the write cannot cache data from before it. Queryset ``update()``,
+``bulk_create()`` and raw SQL bypass model signals; after those, run
+``rebuild_course_statistics``, ``rebuild_score_histograms``,
+``rebuild_attendance_bitmaps`` and a full ``rollup_performance_metrics``.
+The import commands maintain the histograms and bump the students data
+version themselves.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import attendance_bitmaps, course_statistics, score_histograms
+from .caching import bump_data_version, invalidate
+from .models import (
+    Assessment, AttendanceRecord, Course, Enrollment, PerformanceMetricsChange, Student
+)
+
+STUDENT_HISTOGRAM_FIELDS = score_histograms.DIMENSIONS + [
+    'math_score', 'reading_score', 'writing_score'
+]
+
+
+def invalidate_on_commit(action, *pks):
+    transaction.on_commit(partial(invalidate, action, *pks))
+
+
+def remember_previous(sender, instance, fields):
+    """Stash the stored values of `fields` so a reassignment invalidates both sides."""
+    previous = None
+    if instance.pk is not None:
+        previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._previous_values = previous or {}
+
+
+def enrollment_owners(enrollment_ids):
+    """Map each of the given enrollments to its student, course and semester."""
+    return {
+        row['pk']: row
+        for row in Enrollment.objects.filter(
+            pk__in=[pk for pk in enrollment_ids if pk is not None]
+        ).values('pk', 'student_id', 'course_id', 'semester', 'year')
+    }
+
+
+def semester_key(values):
+    if not values:
+        return None
+    return (values['student_id'], values['semester'], values['year'])
+
+
+def record_changes(*keys):
+    """Queue the given (student_id, semester, year) for the metrics rollup."""
+    PerformanceMetricsChange.objects.bulk_create([
+        PerformanceMetricsChange(student_id=student_id, semester=semester, year=year)
+        for student_id, semester, year in set(keys) - {None}
+    ])
+
+
+def move_totals(old_course_id, old, new_course_id, new, create=True):
+    """Shift a row's contribution between (or within) course statistics."""
+    if old_course_id == new_course_id:
+        course_statistics.apply_change(new_course_id, old, new, create=create)
+    else:
+        course_statistics.apply_change(old_course_id, old=old, create=create)
+        course_statistics.apply_change(new_course_id, new=new, create=create)
+
+
+@receiver(pre_save, sender=Student)
+def student_saving(sender, instance, **kwargs):
+    remember_previous(sender, instance, STUDENT_HISTOGRAM_FIELDS)
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_values', {})
+    score_histograms.apply_change(previous, vars(instance))
+    student_changed(instance)
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    score_histograms.apply_change(old=vars(instance))
+    student_changed(instance)
+
+
+def student_changed(instance):
+    invalidate_on_commit('performance_summary', instance.pk)
+    transaction.on_commit(partial(bump_data_version, 'students'))
+
+
+@receiver(pre_save, sender=Enrollment)
+def enrollment_saving(sender, instance, **kwargs):
+    remember_previous(
+        sender, instance, ['student_id', 'course_id', 'semester', 'year', 'final_grade']
+    )
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_values', {})
+    move_totals(
+        previous.get('course_id'),
+        course_statistics.enrollment_totals(previous.get('final_grade')) if previous else None,
+        instance.course_id,
+        course_statistics.enrollment_totals(instance.final_grade)
+    )
+    record_changes(semester_key(previous), semester_key(vars(instance)))
+    enrollment_changed(instance, previous)
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    course_statistics.apply_change(
+        instance.course_id,
+        old=course_statistics.enrollment_totals(instance.final_grade),
+        create=False
+    )
+    record_changes(semester_key(vars(instance)))
+    enrollment_changed(instance, {})
+
+
+def enrollment_changed(instance, previous):
+    invalidate_on_commit(
+        'performance_summary', instance.student_id, previous.get('student_id')
+    )
+    invalidate_on_commit('course_stats', instance.course_id, previous.get('course_id'))
+
+
+@receiver(pre_save, sender=Assessment)
+def assessment_saving(sender, instance, **kwargs):
+    remember_previous(sender, instance, ['enrollment_id', 'score'])
+
+
+@receiver(post_save, sender=Assessment)
+def assessment_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_values', {})
+    owners = enrollment_owners([instance.enrollment_id, previous.get('enrollment_id')])
+    old_course_id = owners.get(previous.get('enrollment_id'), {}).get('course_id')
+    new_course_id = owners[instance.enrollment_id]['course_id']
+    move_totals(
+        old_course_id,
+        course_statistics.assessment_totals(previous['score']) if previous else None,
+        new_course_id,
+        course_statistics.assessment_totals(instance.score)
+    )
+    invalidate_on_commit('course_stats', old_course_id, new_course_id)
+
+
+@receiver(post_delete, sender=Assessment)
+def assessment_deleted(sender, instance, **kwargs):
+    owners = enrollment_owners([instance.enrollment_id])
+    if instance.enrollment_id in owners:
+        course_id = owners[instance.enrollment_id]['course_id']
+        course_statistics.apply_change(
+            course_id, old=course_statistics.assessment_totals(instance.score), create=False
+        )
+        invalidate_on_commit('course_stats', course_id)
+
+
+@receiver(pre_save, sender=AttendanceRecord)
+def attendance_saving(sender, instance, **kwargs):
+    remember_previous(sender, instance, ['enrollment_id', 'date'])
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def attendance_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_values', {})
+    if previous:
+        attendance_bitmaps.forget(previous['enrollment_id'], previous['date'])
+    attendance_bitmaps.record(instance.enrollment_id, instance.date, instance.present)
+    attendance_changed(instance, previous)
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def attendance_deleted(sender, instance, **kwargs):
+    attendance_bitmaps.forget(instance.enrollment_id, instance.date)
+    attendance_changed(instance, {})
+
+
+def attendance_changed(instance, previous):
+    owners = enrollment_owners([instance.enrollment_id, previous.get('enrollment_id')])
+    record_changes(*(semester_key(owner) for owner in owners.values()))
+    invalidate_on_commit(
+        'performance_summary', *(owner['student_id'] for owner in owners.values())
+    )
+
+
+@receiver(pre_save, sender=Course)
+def course_saving(sender, instance, **kwargs):
+    remember_previous(sender, instance, ['credits'])
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_values', {})
+    if previous and previous['credits'] != instance.credits:
+        # Credits weight every GPA the course contributes to
+        record_changes(*Enrollment.objects.filter(course=instance).values_list(
+            'student_id', 'semester', 'year'
+        ).distinct())
@@ -0,0 +1,66 @@
+"""Thinning of the append-only StudentPerformanceMetrics history.
+
+Every import appends a snapshot per student, so the table grows with the
+number of imports. Compaction keeps, of each student's snapshots:
+
+* the `keep` newest ones, however old;
+* every one taken since `before`;
+* of the older ones, the newest in each calendar `period` (day, week,
+  month or year), or none of them without a period.
+
+The rest are deleted in batches. A student's newest snapshot always
+survives, so `latest_per_student` answers exactly as before.
+"""
+from django.db import transaction
+from django.db.models import F, Subquery, Window
+from django.db.models.functions import RowNumber, Trunc
+
+from .models import StudentPerformanceMetrics
+
+PERIODS = ['day', 'week', 'month', 'year']
+DEFAULT_KEEP = 3
+DEFAULT_BATCH_SIZE = 10000
+
+
+def expendable(keep, before, period=None):
+    """Snapshots the retention policy does not keep, as a queryset."""
+    newest_first = [F('created_at').desc(), F('id').desc()]
+    ranked = StudentPerformanceMetrics.objects.annotate(
+        position=Window(RowNumber(), partition_by=[F('student_id')], order_by=newest_first)
+    )
+    conditions = {'position__gt': keep}
+    if period is not None:
+        ranked = ranked.annotate(position_in_period=Window(
+            RowNumber(),
+            partition_by=[F('student_id'), Trunc('created_at', period)],
+            order_by=newest_first
+        ))
+        conditions['position_in_period__gt'] = 1
+    # Only the window filters go into the subquery: a plain filter there
+    # would drop rows before they are numbered
+    return StudentPerformanceMetrics.objects.filter(
+        pk__in=Subquery(ranked.filter(**conditions).values('pk')),
+        created_at__lt=before
+    )
+
+
+def compact(keep, before, period=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Delete the snapshots `expendable` selects; returns how many there were.
+
+    They are read and deleted `batch_size` at a time, in pk order. Deleting
+    expendable snapshots never makes a kept one expendable or the other
+    way round, so each batch can be selected afresh after the last pk.
+    """
+    deleted, last = 0, 0
+    while True:
+        chunk = list(
+            expendable(keep, before, period).filter(pk__gt=last).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if chunk:
+            with transaction.atomic():
+                StudentPerformanceMetrics.objects.filter(pk__in=chunk).delete()
+        deleted += len(chunk)
+        if len(chunk) < batch_size:
+            return deleted
+        last = chunk[-1]
@@ -0,0 +1,169 @@
+"""Decoding of the processed student data written by ``data/process_data.py``.
+
+Both the one-hot CSV and the typed columnar file are supported. Nothing
+here touches Django, so these functions can run in worker processes that
+never set up the app registry.
+"""
+import csv
+import hashlib
+import os
+from itertools import islice
+
+import numpy as np
+
+from dashboard.columnar import read_columns, read_header
+
+STUDENT_FIELDS = [
+    'gender', 'math_score', 'reading_score', 'writing_score', 'race_ethnicity',
+    'parental_education', 'lunch_type', 'test_preparation'
+]
+
+RACE_GROUPS = ['A', 'B', 'C', 'D', 'E']
+EDUCATION_LEVELS = [
+    "associate's degree", "bachelor's degree", "high school",
+    "master's degree", "some college", "some high school"
+]
+
+
+def parse_row(row):
+    """Turn one row of the processed CSV into Student field values."""
+    # Get race/ethnicity
+    race_ethnicity = 'A'
+    for group in RACE_GROUPS:
+        if row[f'race/ethnicity_group {group}'].lower() == 'true':
+            race_ethnicity = group
+            break
+
+    # Get parental education
+    parental_education = next(
+        (level for level in EDUCATION_LEVELS
+         if row[f'parental level of education_{level}'].lower() == 'true'),
+        None
+    )
+    if parental_education is None:
+        raise ValueError('Row has no parental level of education')
+
+    fields = {
+        'gender': 'F' if row['gender'] == '0' else 'M',
+        'math_score': int(row['math score']),
+        'reading_score': int(row['reading score']),
+        'writing_score': int(row['writing score']),
+        'race_ethnicity': race_ethnicity,
+        'parental_education': parental_education,
+        'lunch_type': 'free/reduced' if row['lunch_free/reduced'].lower() == 'true' else 'standard',
+        'test_preparation': 'completed' if row['test preparation course_completed'].lower() == 'true' else 'none',
+    }
+    for name in ('math_score', 'reading_score', 'writing_score'):
+        if not 0 <= fields[name] <= 100:
+            raise ValueError(f'{name} {fields[name]} is outside 0-100')
+    return fields
+
+
+def fingerprint(fields, occurrence=0):
+    """Stable hash of normalized Student field values.
+
+    Identical source rows are told apart by their `occurrence` number, so
+    a file with duplicate rows still maps each row to its own student.
+    """
+    payload = '\x1f'.join(str(fields[name]) for name in STUDENT_FIELDS)
+    if occurrence:
+        payload += f'\x1e{occurrence}'
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def chunked(iterable, size):
+    """Yield lists of at most `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def shard_offsets(path, shards):
+    """Split the data rows of `path` into `shards` byte ranges.
+
+    Returns ``shards + 1`` ascending offsets; shard ``i`` covers the rows
+    that start in ``[offsets[i], offsets[i + 1])``. The boundaries need not
+    fall on line breaks, `decode_shard` realigns them. Rows must not
+    contain quoted newlines, which the processed file never does.
+    """
+    with open(path, 'rb') as file:
+        data_start = len(file.readline())
+    size = os.path.getsize(path)
+    step = (size - data_start) / shards
+    return [data_start + round(step * i) for i in range(shards)] + [size]
+
+
+def decode_shard(path, start, end):
+    """Parse and validate the rows that start within ``[start, end)`` of `path`.
+
+    Returns the rows as tuples ordered like STUDENT_FIELDS, which pickle
+    far smaller than dicts when sent back from a worker process.
+    """
+    rows = []
+    with open(path, 'rb') as file:
+        header = next(csv.reader([file.readline().decode()]))
+        data_start = file.tell()
+        if start > data_start:
+            # Skip the tail of the row that straddles the boundary
+            file.seek(start - 1)
+            file.readline()
+
+        position = file.tell()
+        for line in iter(file.readline, b''):
+            if position >= end:
+                break
+            if not line.strip():
+                position += len(line)
+                continue
+            values = next(csv.reader([line.decode()]))
+            try:
+                fields = parse_row(dict(zip(header, values)))
+            except (KeyError, ValueError) as e:
+                raise ValueError(f'Invalid row at byte {position} of {path}: {e}') from e
+            rows.append(tuple(fields[name] for name in STUDENT_FIELDS))
+            position += len(line)
+    return rows
+
+
+def columnar_row_count(path):
+    """Number of rows in a columnar file, read from its header alone."""
+    header, _ = read_header(path)
+    return header['rows']
+
+
+def decode_columnar(columns, start=0, stop=None):
+    """Validate rows ``[start, stop)`` of memory-mapped columns and decode them.
+
+    Works column by column on the typed arrays; returns tuples ordered like
+    STUDENT_FIELDS, the same as `decode_shard`.
+    """
+    gender = columns['gender'].values[start:stop]
+    if gender.size and not np.isin(gender, (0, 1)).all():
+        raise ValueError('gender must be 0 or 1')
+    scores = []
+    for subject in ('math', 'reading', 'writing'):
+        values = columns[f'{subject} score'].values[start:stop]
+        if values.size and (values.min() < 0 or values.max() > 100):
+            raise ValueError(f'{subject}_score is outside 0-100')
+        scores.append(values.tolist())
+
+    race = columns['race/ethnicity']
+    race_labels = np.array(
+        [label.removeprefix('group ') for label in race.categories], dtype=object
+    )
+    return list(zip(
+        np.where(gender == 0, 'F', 'M').tolist(),
+        *scores,
+        race_labels[race.values[start:stop]].tolist(),
+        columns['parental level of education'].decode(start, stop).tolist(),
+        columns['lunch'].decode(start, stop).tolist(),
+        columns['test preparation course'].decode(start, stop).tolist()
+    ))
+
+
+def decode_columnar_shard(path, start, end):
+    """Worker entry point: decode rows ``[start, end)`` of a columnar file."""
+    return decode_columnar(read_columns(path), start, end)
@@ -0,0 +1,212 @@
+"""Seeded synthetic school data, generated with NumPy.
+
+Student demographics and scores follow data/raw/StudentsPerformance.csv:
+the category shares, the gender, lunch and test preparation effects on
+each score, and the correlation between the three scores. Courses,
+enrollments, assessments and attendance have no real source and are
+drawn from plausible distributions instead.
+
+Students are generated in blocks of BLOCK_SIZE, each from its own child
+of one SeedSequence, so a seed and scale always produce the same rows
+while memory stays bounded by the block.
+"""
+import numpy as np
+
+from .student_csv import EDUCATION_LEVELS, RACE_GROUPS
+
+BLOCK_SIZE = 50_000
+
+RACE_WEIGHTS = [0.089, 0.19, 0.319, 0.262, 0.14]
+# In EDUCATION_LEVELS order
+EDUCATION_WEIGHTS = [0.222, 0.118, 0.196, 0.059, 0.226, 0.179]
+MALE_SHARE = 0.482
+STANDARD_LUNCH_SHARE = 0.645
+TEST_PREP_SHARE = 0.358
+
+# Math, reading and writing: intercept and additive effects fitted to the
+# raw data, plus residual noise correlated so that the scores themselves
+# correlate like the raw ones (0.82, 0.80 and 0.95)
+SCORE_INTERCEPT = np.array([54.6, 65.4, 63.7])
+MALE_EFFECT = np.array([5.0, -7.0, -9.0])
+STANDARD_LUNCH_EFFECT = np.array([11.0, 7.0, 8.0])
+TEST_PREP_EFFECT = np.array([5.5, 7.5, 10.0])
+SCORE_NOISE = 13.5 * np.linalg.cholesky(np.array([
+    [1.0, 0.9, 0.89],
+    [0.9, 1.0, 0.95],
+    [0.89, 0.95, 1.0],
+]))
+
+DEPARTMENTS = [
+    ('BIO', 'Biology', 'Science'),
+    ('CHEM', 'Chemistry', 'Science'),
+    ('PHYS', 'Physics', 'Science'),
+    ('MATH', 'Mathematics', 'Mathematics'),
+    ('STAT', 'Statistics', 'Mathematics'),
+    ('ENG', 'English', 'Humanities'),
+    ('HIST', 'History', 'Humanities'),
+    ('ECON', 'Economics', 'Social Sciences'),
+    ('PSY', 'Psychology', 'Social Sciences'),
+    ('CS', 'Computer Science', 'Engineering'),
+]
+CREDITS = [1.0, 2.0, 3.0, 4.0]
+CREDIT_WEIGHTS = [0.1, 0.2, 0.5, 0.2]
+
+SEMESTERS = ['Spring', 'Fall']
+# Classes start on the first Monday on or after these dates
+SEMESTER_STARTS = {'Spring': '01-08', 'Fall': '09-01'}
+SEMESTER_DAYS = 105
+# One class meeting a day, every day of the semester
+MAX_MEETINGS = SEMESTER_DAYS
+
+# Share of assessments of each type and the weight each carries
+ASSESSMENT_TYPES = ['QUIZ', 'HOMEWORK', 'EXAM', 'PROJECT']
+ASSESSMENT_SHARES = [0.5, 0.3, 0.15, 0.05]
+ASSESSMENT_WEIGHTS = np.array([5.0, 10.0, 30.0, 20.0])
+
+
+def terms(first_year, last_year):
+    """(semester, year, first class day) of every term, oldest first."""
+    result = []
+    for year in range(first_year, last_year + 1):
+        for semester in SEMESTERS:
+            start = np.busday_offset(
+                np.datetime64(f'{year}-{SEMESTER_STARTS[semester]}'), 0,
+                roll='forward', weekmask='Mon'
+            )
+            result.append((semester, year, start))
+    return result
+
+
+def generate_courses(count, rng):
+    """Arrays describing `count` courses, spread over DEPARTMENTS.
+
+    Also returns how popular each course is, as enrollment probabilities.
+    """
+    department = np.arange(count) % len(DEPARTMENTS)
+    number = 100 + np.arange(count) // len(DEPARTMENTS)
+    courses = {
+        'course_code': [f'{DEPARTMENTS[d][0]}{n}' for d, n in zip(department, number)],
+        'course_name': [f'{DEPARTMENTS[d][1]} {n}' for d, n in zip(department, number)],
+        'department': [DEPARTMENTS[d][2] for d in department],
+        'credits': rng.choice(CREDITS, size=count, p=CREDIT_WEIGHTS),
+    }
+    # A long tail: a few large introductory courses, many small ones
+    popularity = 1 / (rng.permutation(count) + 10.0) ** 0.8
+    return courses, popularity / popularity.sum()
+
+
+def generate_students(count, rng):
+    """Arrays of Student field values; scores are clipped to 0-100."""
+    male = rng.random(count) < MALE_SHARE
+    standard_lunch = rng.random(count) < STANDARD_LUNCH_SHARE
+    test_prep = rng.random(count) < TEST_PREP_SHARE
+    scores = (
+        SCORE_INTERCEPT
+        + np.outer(male, MALE_EFFECT)
+        + np.outer(standard_lunch, STANDARD_LUNCH_EFFECT)
+        + np.outer(test_prep, TEST_PREP_EFFECT)
+        + rng.standard_normal((count, 3)) @ SCORE_NOISE.T
+    )
+    scores = np.clip(np.rint(scores), 0, 100).astype(np.int16)
+    return {
+        'gender': np.where(male, 'M', 'F'),
+        'math_score': scores[:, 0],
+        'reading_score': scores[:, 1],
+        'writing_score': scores[:, 2],
+        'race_ethnicity': np.array(RACE_GROUPS)[
+            rng.choice(len(RACE_GROUPS), size=count, p=RACE_WEIGHTS)
+        ],
+        'parental_education': np.array(EDUCATION_LEVELS)[
+            rng.choice(len(EDUCATION_LEVELS), size=count, p=EDUCATION_WEIGHTS)
+        ],
+        'lunch_type': np.where(standard_lunch, 'standard', 'free/reduced'),
+        'test_preparation': np.where(test_prep, 'completed', 'none'),
+    }
+
+
+def generate_enrollments(students, course_popularity, term_count, per_student, rng):
+    """Enrollments of a block of students, unique per student, course and term.
+
+    The most recent term is still running, so its grades are missing (NaN).
+    """
+    count = len(students['math_score'])
+    wanted = 1 + rng.poisson(max(per_student - 1, 0), size=count)
+    student = np.repeat(np.arange(count), wanted)
+    course = rng.choice(len(course_popularity), size=len(student), p=course_popularity)
+    term = rng.integers(0, term_count, size=len(student))
+
+    # Drop repeated (student, course, term) draws
+    key = (student * len(course_popularity) + course) * term_count + term
+    _, first = np.unique(key, return_index=True)
+    first.sort()
+    student, course, term = student[first], course[first], term[first]
+
+    average = (
+        students['math_score'] + students['reading_score'] + students['writing_score']
+    )[student] / 3
+    # Grades are stored with two integer digits
+    grade = np.clip(0.7 * average + 25 + rng.normal(0, 8, size=len(student)), 0, 99.99)
+    grade = np.round(grade, 2)
+    grade[term == term_count - 1] = np.nan
+    return {'student': student, 'course': course, 'term': term, 'final_grade': grade}
+
+
+def generate_assessments(enrollments, term_starts, average, per_enrollment, rng):
+    """`per_enrollment` assessments for each enrollment, scored around its grade."""
+    enrollment = np.repeat(np.arange(len(enrollments['term'])), per_enrollment)
+    kind = rng.choice(len(ASSESSMENT_TYPES), size=len(enrollment), p=ASSESSMENT_SHARES)
+    grade = enrollments['final_grade'][enrollment]
+    # Running courses are scored around the student's average instead
+    grade = np.where(np.isnan(grade), average[enrollment], grade)
+    start = term_starts[enrollments['term'][enrollment]]
+    return {
+        'enrollment': enrollment,
+        'assessment_type': np.array(ASSESSMENT_TYPES)[kind],
+        'date': start + rng.integers(0, SEMESTER_DAYS, size=len(enrollment)),
+        'score': np.round(np.clip(grade + rng.normal(0, 10, size=len(enrollment)), 0, 100), 2),
+        'weight': ASSESSMENT_WEIGHTS[kind],
+    }
+
+
+def generate_attendance(enrollments, term_starts, diligence, per_enrollment, rng):
+    """`per_enrollment` class meetings for each enrollment, on distinct days.
+
+    A course meets on fixed weekdays, as many times a week as it takes to
+    fit the meetings into one semester, so at most MAX_MEETINGS.
+    """
+    enrollment_count = len(enrollments['term'])
+    per_week = -(-per_enrollment // (SEMESTER_DAYS // 7))
+    spacing = 7 // per_week
+    meeting = np.arange(per_enrollment)
+    offset = (meeting // per_week) * 7 + (meeting % per_week) * spacing
+    # The weekday of the first meeting; later ones in the week must fit too
+    first_day = rng.integers(0, 7 - spacing * (per_week - 1), size=enrollment_count)
+
+    enrollment = np.repeat(np.arange(enrollment_count), per_enrollment)
+    days = (first_day[:, None] + offset[None, :]).ravel()
+    student = enrollments['student'][enrollment]
+    return {
+        'enrollment': enrollment,
+        'date': term_starts[enrollments['term'][enrollment]] + days,
+        'present': rng.random(len(enrollment)) < diligence[student],
+    }
+
+
+def generate_block(size, course_popularity, term_starts, options, rng):
+    """Students and everything they take part in, for one block."""
+    students = generate_students(size, rng)
+    average = (
+        students['math_score'] + students['reading_score'] + students['writing_score']
+    ) / 3
+    # Share of classes each student turns up to
+    diligence = rng.beta(9, 1, size=size)
+    enrollments = generate_enrollments(
+        students, course_popularity, len(term_starts), options['enrollments'], rng
+    )
+    assessments = generate_assessments(
+        enrollments, term_starts, average[enrollments['student']], options['assessments'], rng
+    )
+    attendance = generate_attendance(
+        enrollments, term_starts, diligence, options['attendance'], rng
+    )
+    return students, enrollments, assessments, attendance
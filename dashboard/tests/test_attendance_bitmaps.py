@@ -0,0 +1,141 @@
+import threading
+from datetime import date
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dashboard import attendance_bitmaps
+from dashboard.models import AttendanceBitmap, AttendanceRecord, Course, Enrollment, Student
+
+# Attended, attended, absent, then three attended classes
+SEPTEMBER = [(2, True), (4, True), (9, False), (11, True), (16, True), (18, True)]
+
+
+def create_enrollment():
+    course = Course.objects.create(
+        course_code='BIO101', course_name='Biology', department='Science', credits=4.0
+    )
+    return Enrollment.objects.create(
+        student=Student.objects.create(gender='F'), course=course, semester='Fall', year=2024
+    )
+
+
+class AttendanceTestCase(TestCase):
+    def setUp(self):
+        self.enrollment = create_enrollment()
+        # Out of order, so that the bitmap has to be rebased
+        for day, present in reversed(SEPTEMBER):
+            AttendanceRecord.objects.create(
+                enrollment=self.enrollment, date=date(2024, 9, day), present=present
+            )
+
+
+class AttendanceBitmapTests(AttendanceTestCase):
+    def stored(self):
+        bitmap = AttendanceBitmap.objects.get(enrollment=self.enrollment)
+        return {
+            'start_date': bitmap.start_date,
+            'recorded': bytes(bitmap.recorded),
+            'present': bytes(bitmap.present),
+            'recorded_count': bitmap.recorded_count,
+            'present_count': bitmap.present_count,
+        }
+
+    def test_signals_match_rebuild(self):
+        """Test that incremental updates leave the same bitmap a rebuild packs."""
+        first = AttendanceRecord.objects.get(date=date(2024, 9, 2))
+        first.date = date(2024, 9, 3)
+        first.save()
+        AttendanceRecord.objects.filter(date=date(2024, 9, 9)).update(present=True)
+        AttendanceRecord.objects.get(date=date(2024, 9, 9)).save()
+        AttendanceRecord.objects.get(date=date(2024, 9, 18)).delete()
+
+        incremental = self.stored()
+        self.assertEqual(incremental['start_date'], date(2024, 9, 3))
+        self.assertEqual((incremental['recorded_count'], incremental['present_count']), (5, 5))
+        self.assertEqual(attendance_bitmaps.rebuild(), 1)
+        self.assertEqual(self.stored(), incremental)
+
+    def test_summary_rate_and_streaks(self):
+        """Test that rates and streaks are counted over recorded classes only."""
+        bitmap = AttendanceBitmap.objects.get(enrollment=self.enrollment)
+        self.assertEqual(attendance_bitmaps.summary(bitmap), {
+            'recorded': 6, 'present': 5, 'attendance_rate': 5 / 6,
+            'longest_streak': 3, 'current_streak': 3,
+        })
+        self.assertEqual(
+            attendance_bitmaps.summary(bitmap, start=date(2024, 9, 3), end=date(2024, 9, 11)),
+            {'recorded': 3, 'present': 2, 'attendance_rate': 2 / 3,
+             'longest_streak': 1, 'current_streak': 1}
+        )
+        self.assertEqual(
+            attendance_bitmaps.summary(bitmap, end=date(2024, 8, 31))['attendance_rate'], None
+        )
+
+    def test_last_record_deleted_drops_bitmap(self):
+        """Test that an enrollment without records keeps no bitmap."""
+        AttendanceRecord.objects.filter(enrollment=self.enrollment).delete()
+        self.assertFalse(AttendanceBitmap.objects.exists())
+
+    def test_enrollment_deletion_cascades(self):
+        """Test that deleting an enrollment removes its records and bitmap cleanly."""
+        self.enrollment.delete()
+        self.assertFalse(AttendanceBitmap.objects.exists())
+        self.assertFalse(AttendanceRecord.objects.exists())
+
+
+class ConcurrentRecordTests(TransactionTestCase):
+    def test_concurrent_first_records(self):
+        """Test that simultaneous first records of an enrollment all land in one bitmap."""
+        enrollment = create_enrollment()
+        days = [date(2024, 9, day) for day, _ in SEPTEMBER]
+        barrier = threading.Barrier(len(days))
+        errors = []
+
+        def record(day):
+            try:
+                barrier.wait()
+                attendance_bitmaps.record(enrollment.pk, day, True)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=record, args=(day,)) for day in days]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        bitmap = AttendanceBitmap.objects.get(enrollment=enrollment)
+        self.assertEqual(bitmap.start_date, days[0])
+        self.assertEqual(bitmap.recorded_count, len(days))
+
+
+class AttendanceSummaryAPITests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.url = reverse('enrollment-attendance-summary', args=[self.enrollment.pk])
+
+    def test_attendance_summary(self):
+        """Test the attendance summary endpoint with a date range."""
+        response = APIClient().get(self.url, {'start': '2024-09-09'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['recorded'], 4)
+        self.assertEqual(response.data['longest_streak'], 3)
+
+    def test_invalid_date(self):
+        """Test that malformed range bounds are rejected."""
+        response = APIClient().get(self.url, {'end': '2024-13-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('end', response.data)
+
+    def test_performance_summary_uses_bitmaps(self):
+        """Test that the student summary's attendance rate comes from the bitmap."""
+        response = APIClient().get(
+            reverse('student-performance-summary', args=[self.enrollment.student_id])
+        )
+        self.assertAlmostEqual(response.data['attendance']['attendance_rate'], 5 / 6)
@@ -0,0 +1,146 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from dashboard import benchmarks
+
+
+class RegressionTests(SimpleTestCase):
+    baseline = {
+        '1000': {
+            'students list': {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 2},
+            'process_data': {'seconds': 1.0, 'rows_per_second': 1000.0},
+        }
+    }
+
+    def test_within_tolerance_passes(self):
+        """Test that timings within the tolerance are not regressions."""
+        results = {'1000': {
+            'students list': {'p50_ms': 14.0, 'p95_ms': 29.0, 'queries': 2},
+            'process_data': {'seconds': 1.4, 'rows_per_second': 700.0},
+            'new case': {'p50_ms': 500.0, 'p95_ms': 900.0, 'queries': 40},
+        }}
+        self.assertEqual(benchmarks.regressions(results, self.baseline, 0.5), [])
+
+    def test_slower_or_more_queries_fails(self):
+        """Test that slower timings, lower throughput and extra queries are flagged."""
+        results = {'1000': {
+            'students list': {'p50_ms': 10.0, 'p95_ms': 31.0, 'queries': 3},
+            'process_data': {'seconds': 2.0, 'rows_per_second': 500.0},
+        }}
+        found = benchmarks.regressions(results, self.baseline, 0.5)
+        self.assertEqual(len(found), 3)
+        self.assertIn('students list at 1000 rows: queries 3 (baseline 2)', found)
+
+    def test_slow_fast_list_path(self):
+        """Test that a fast list path without the required speedup is flagged."""
+        fast, regular = benchmarks.list_path_case('fast'), benchmarks.list_path_case('regular')
+        results = {
+            '100': {fast: {'p50_ms': 10.0}, regular: {'p50_ms': 30.0}},
+            '1000': {fast: {'p50_ms': 20.0}, regular: {'p50_ms': 30.0}},
+        }
+        found = benchmarks.list_path_problems(results)
+        self.assertEqual(len(found), 1)
+        self.assertIn('at 1000 rows', found[0])
+
+    def test_query_growth_across_sizes(self):
+        """Test that a query count depending on the data size is reported."""
+        results = {
+            '100': {'a': {'queries': 2}, 'b': {'queries': 3}},
+            '1000': {'a': {'queries': 2}, 'b': {'queries': 12}},
+        }
+        self.assertEqual(
+            benchmarks.scaling_problems(results),
+            ['b: queries grow with the data (3 at 100, 12 at 1000)']
+        )
+
+    def test_latency_growth_across_sizes(self):
+        """Test that a p50 growing much faster than the data is reported."""
+        results = {
+            '100': {'a': {'p50_ms': 2.0}, 'b': {'p50_ms': 2.0}},
+            '200': {'a': {'p50_ms': 7.0}, 'b': {'p50_ms': 9.0}},
+            '400': {'a': {'p50_ms': 12.0}, 'b': {'p50_ms': 16.0}},
+        }
+        self.assertEqual(
+            benchmarks.scaling_problems(results),
+            ['b: p50_ms grows faster than the data (2.0 at 100, 9.0 at 200)']
+        )
+
+
+class EndpointBenchmarkTests(TestCase):
+    def measure(self, students):
+        call_command(
+            'generate_data', '--replace', '--students', str(students), '--courses', '5',
+            '--attendance', '5', stdout=StringIO()
+        )
+        return benchmarks.benchmark_endpoints(repeat=2)
+
+    def test_query_counts_do_not_grow_with_data(self):
+        """Test that no endpoint or action runs more queries on more data."""
+        results = {'20': self.measure(20), '60': self.measure(60)}
+        self.assertIn('students performance-summary', results['20'])
+        self.assertIn('courses course-stats', results['20'])
+        self.assertIn('students performance-summaries', results['20'])
+        # Latencies of so little data are noise, so only the query counts count
+        self.assertEqual(
+            [problem for problem in benchmarks.scaling_problems(results) if 'queries' in problem],
+            []
+        )
+
+
+@mock.patch('dashboard.management.commands.benchmark.teardown_test_environment')
+@mock.patch('dashboard.management.commands.benchmark.setup_test_environment')
+@mock.patch('dashboard.management.commands.benchmark.teardown_databases')
+@mock.patch('dashboard.management.commands.benchmark.setup_databases')
+# The command runs in the test database here instead of creating its own,
+# and the timings of so little data are noise
+@mock.patch.object(benchmarks, 'FAST_LIST_SPEEDUP', 0)
+class BenchmarkCommandTests(TestCase):
+    def benchmark(self, directory, *args):
+        out = StringIO()
+        call_command(
+            'benchmark', '--sizes', '30', '--repeat', '1', '--skip-pipeline',
+            '--output', str(Path(directory) / 'results.json'), *args, stdout=out
+        )
+        return out.getvalue()
+
+    def test_save_and_compare_baseline(self, setup, teardown, *environment):
+        """Test that a saved baseline passes against itself and catches extra queries."""
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = Path(directory) / 'baseline.json'
+            out = self.benchmark(directory, '--baseline', str(baseline), '--save-baseline')
+            self.assertIn('Saved baseline', out)
+            teardown.assert_called_once_with(setup.return_value, verbosity=0)
+            report = json.loads(baseline.read_text())
+            self.assertEqual(report['sizes'], [30])
+            self.assertIn('students list', report['results']['30'])
+            self.assertEqual(
+                json.loads((Path(directory) / 'results.json').read_text()), report
+            )
+
+            out = self.benchmark(directory, '--baseline', str(baseline), '--tolerance', '1000')
+            self.assertIn('No benchmark regressions', out)
+
+            report['results']['30']['students list']['queries'] -= 1
+            baseline.write_text(json.dumps(report))
+            with self.assertRaisesMessage(CommandError, '1 benchmark regressions'):
+                self.benchmark(directory, '--baseline', str(baseline), '--tolerance', '1000')
+
+    def test_database_torn_down_on_failure(self, setup, teardown, *environment):
+        """Test that the benchmark database is dropped when a run fails."""
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(benchmarks, 'benchmark_endpoints', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.benchmark(directory)
+        teardown.assert_called_once_with(setup.return_value, verbosity=0)
+
+    def test_save_baseline_needs_baseline(self, setup, *mocks):
+        """Test that --save-baseline without --baseline is rejected up front."""
+        with self.assertRaises(CommandError):
+            call_command('benchmark', '--save-baseline', stdout=StringIO())
+        setup.assert_not_called()
@@ -0,0 +1,145 @@
+from datetime import date
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dashboard import caching
+from dashboard.models import Student, Course, Enrollment, Assessment, AttendanceRecord
+
+
+class AnalyticsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.student = Student.objects.create(
+            gender='F', math_score=80, reading_score=70, writing_score=90
+        )
+        self.course = Course.objects.create(
+            course_code='BIO101', course_name='Biology', department='Science', credits=3.0
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.enrollment = Enrollment.objects.create(
+                student=self.student, course=self.course,
+                semester='Fall', year=2024, final_grade=75
+            )
+
+    def summary(self):
+        return self.client.get(
+            reverse('student-performance-summary', args=[self.student.id])
+        ).data
+
+    def stats(self):
+        return self.client.get(reverse('course-course-stats', args=[self.course.id])).data
+
+    def test_second_request_skips_aggregates(self):
+        """Test that a cached summary only costs the object lookup"""
+        self.summary()
+        with self.assertNumQueries(1):
+            self.summary()
+        self.stats()
+        with self.assertNumQueries(1):
+            self.stats()
+
+    def test_attendance_invalidates_summary(self):
+        """Test that saving attendance refreshes the student's summary"""
+        self.assertIsNone(self.summary()['attendance']['attendance_rate'])
+        with self.captureOnCommitCallbacks(execute=True):
+            AttendanceRecord.objects.create(
+                enrollment=self.enrollment, date=date(2024, 9, 2), present=True
+            )
+        self.assertEqual(self.summary()['attendance']['attendance_rate'], 1)
+
+    def test_assessment_invalidates_course_stats(self):
+        """Test that saving and deleting assessments refreshes course stats"""
+        self.assertIsNone(self.stats()['assessment_stats']['avg_score'])
+        with self.captureOnCommitCallbacks(execute=True):
+            assessment = Assessment.objects.create(
+                enrollment=self.enrollment, assessment_type='EXAM',
+                date=date(2024, 10, 1), score=90, weight=50
+            )
+        self.assertEqual(self.stats()['assessment_stats']['avg_score'], 90)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assessment.delete()
+        self.assertIsNone(self.stats()['assessment_stats']['avg_score'])
+
+    def test_moved_enrollment_invalidates_both_students(self):
+        """Test that reassigning an enrollment refreshes the old and new student"""
+        other = Student.objects.create(gender='M')
+        self.assertEqual(self.summary()['course_performance']['courses_taken'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.enrollment.student = other
+            self.enrollment.save()
+        self.assertEqual(self.summary()['course_performance']['courses_taken'], 0)
+
+    def test_other_objects_stay_cached(self):
+        """Test that invalidation is limited to the affected objects"""
+        other = Course.objects.create(
+            course_code='CHEM101', course_name='Chemistry', department='Science', credits=3.0
+        )
+        self.client.get(reverse('course-course-stats', args=[other.id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(
+                student=self.student, course=self.course, semester='Spring', year=2025
+            )
+        with self.assertNumQueries(1):
+            self.client.get(reverse('course-course-stats', args=[other.id]))
+
+
+class StampedeProtectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def expire(self, action, pk):
+        key = caching.cache_key(action, pk)
+        entry = cache.get(key)
+        entry['fresh_until'] = 0
+        cache.set(key, entry)
+
+    def test_stale_entry_served_while_locked(self):
+        """Test that an expired entry is served while another request refreshes it"""
+        caching.get_or_compute('course_stats', 1, lambda: 'old')
+        self.expire('course_stats', 1)
+        cache.add(caching.lock_key('course_stats', 1), True)
+        value = caching.get_or_compute('course_stats', 1, lambda: 'new')
+        self.assertEqual(value, 'old')
+
+    def test_expired_entry_refreshed_by_lock_holder(self):
+        """Test that the request that wins the lock recomputes the entry"""
+        caching.get_or_compute('course_stats', 1, lambda: 'old')
+        self.expire('course_stats', 1)
+        value = caching.get_or_compute('course_stats', 1, lambda: 'new')
+        self.assertEqual(value, 'new')
+        self.assertIsNone(cache.get(caching.lock_key('course_stats', 1)))
+
+    def test_invalidated_entry_never_served(self):
+        """Test that an invalidated entry is not served even while locked"""
+        caching.get_or_compute('course_stats', 1, lambda: 'old')
+        caching.invalidate('course_stats', 1)
+        cache.add(caching.lock_key('course_stats', 1), True)
+        with mock.patch.object(caching, 'WAIT_SECONDS', 0):
+            value = caching.get_or_compute('course_stats', 1, lambda: 'new')
+        self.assertEqual(value, 'new')
+
+    def test_compute_racing_invalidation_is_discarded(self):
+        """Test that a result computed before an invalidation is not reused"""
+        def compute():
+            caching.invalidate('course_stats', 1)
+            return 'outdated'
+
+        caching.get_or_compute('course_stats', 1, compute)
+        self.assertEqual(caching.get_or_compute('course_stats', 1, lambda: 'fresh'), 'fresh')
+
+    def test_expired_lock_taken_over_is_kept(self):
+        """Test that a slow lock holder does not release a lock another request took over"""
+        lock = caching.lock_key('course_stats', 1)
+
+        def slow_compute():
+            # The lock expires and another request takes it
+            cache.set(lock, 'other request')
+            return 'value'
+
+        caching.get_or_compute('course_stats', 1, slow_compute)
+        self.assertEqual(cache.get(lock), 'other request')
@@ -0,0 +1,88 @@
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dashboard.models import Student
+
+# gender, lunch_type, math, reading, writing
+STUDENTS = [
+    ('F', 'standard', 72, 80, 78),
+    ('F', 'standard', 64, 70, 69),
+    ('F', 'free/reduced', 50, 61, 58),
+    ('M', 'standard', 81, 74, 70),
+    ('M', 'free/reduced', 47, 49, 45),
+    ('M', 'free/reduced', 58, 55, 51),
+    ('M', 'free/reduced', 66, 60, 62),
+]
+
+
+class CohortTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Student.objects.bulk_create([
+            Student(
+                gender=gender, lunch_type=lunch_type, math_score=math,
+                reading_score=reading, writing_score=writing
+            )
+            for gender, lunch_type, math, reading, writing in STUDENTS
+        ])
+
+    def cohorts(self, **params):
+        response = self.client.get(reverse('student-cohorts'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['cohorts']
+
+    def test_cube_matches_numpy(self):
+        """Test that every level of the cube has the statistics numpy computes."""
+        cohorts = self.cohorts(dimensions='lunch_type,gender')
+        self.assertEqual(len(cohorts), 1 + 2 + 2 + 4)
+        self.assertEqual(cohorts[0]['group'], {})
+        self.assertEqual(cohorts[0]['count'], len(STUDENTS))
+
+        for cohort in cohorts:
+            rows = np.array([
+                row[2:] for row in STUDENTS
+                if all(row[('gender', 'lunch_type').index(dimension)] == value
+                       for dimension, value in cohort['group'].items())
+            ], dtype=float)
+            self.assertEqual(cohort['count'], len(rows))
+            for name, scores in [('math', rows[:, 0]), ('average', rows.mean(axis=1))]:
+                statistics = cohort[name]
+                self.assertAlmostEqual(statistics['mean'], scores.mean())
+                self.assertAlmostEqual(statistics['median'], np.percentile(scores, 50))
+                self.assertAlmostEqual(statistics['p75'], np.percentile(scores, 75))
+                if len(scores) > 1:
+                    self.assertAlmostEqual(statistics['stddev'], scores.std(ddof=1))
+                else:
+                    self.assertIsNone(statistics['stddev'])
+
+    def test_grouping_sets_and_filters(self):
+        """Test explicit grouping sets over the filtered students."""
+        cohorts = self.cohorts(grouping_set=['gender', ''], lunch_type='free/reduced')
+        self.assertEqual(
+            [(cohort['group'], cohort['count']) for cohort in cohorts],
+            [({}, 4), ({'gender': 'F'}, 1), ({'gender': 'M'}, 3)]
+        )
+        self.assertEqual(cohorts[1]['writing']['mean'], 58)
+
+    def test_cached_until_students_change(self):
+        """Test that results are cached until a student is saved."""
+        self.cohorts(dimensions='gender')
+        with self.assertNumQueries(0):
+            self.cohorts(dimensions='gender')
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.create(gender='F', math_score=90)
+        self.assertEqual(self.cohorts(dimensions='gender')[0]['count'], len(STUDENTS) + 1)
+
+    def test_invalid_parameters(self):
+        """Test that unknown dimensions and ambiguous requests are rejected."""
+        url = reverse('student-cohorts')
+        response = self.client.get(url, {'dimensions': 'gender,shoe_size'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('shoe_size', str(response.data['dimensions']))
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(
+            self.client.get(url, {'dimensions': 'gender', 'grouping_set': ''}).status_code, 400
+        )
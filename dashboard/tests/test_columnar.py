@@ -0,0 +1,55 @@
+import json
+import struct
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+from django.test import SimpleTestCase
+from dashboard.columnar import MAGIC, ColumnWriter, read_columns, read_header
+
+SCHEMA = [
+    ('score', 'i1', None),
+    ('lunch', 'u1', ['free/reduced', 'standard']),
+]
+
+
+class ColumnarFormatTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / 'data.cols')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_across_chunks(self):
+        """Test that chunked writes read back as single typed columns"""
+        with ColumnWriter(self.path, SCHEMA) as writer:
+            writer.append({'score': [90, 55], 'lunch': [1, 0]})
+            writer.append({'score': [100], 'lunch': [1]})
+
+        columns = read_columns(self.path)
+        self.assertEqual(columns['score'].values.dtype, np.int8)
+        self.assertEqual(columns['score'].values.tolist(), [90, 55, 100])
+        self.assertEqual(
+            columns['lunch'].decode().tolist(), ['standard', 'free/reduced', 'standard']
+        )
+        self.assertIsInstance(columns['score'].values, np.memmap)
+
+    def test_rejects_values_that_do_not_fit(self):
+        """Test that out-of-range values are not silently truncated"""
+        with self.assertRaises(ValueError):
+            with ColumnWriter(self.path, SCHEMA) as writer:
+                writer.append({'score': [300], 'lunch': [0]})
+
+    def test_rejects_other_versions(self):
+        """Test that readers refuse files written by a different format version"""
+        with ColumnWriter(self.path, SCHEMA) as writer:
+            writer.append({'score': [1], 'lunch': [0]})
+        header, _ = read_header(self.path)
+        header['version'] += 1
+        encoded = json.dumps(header).encode()
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(encoded)) + encoded)
+
+        with self.assertRaises(ValueError):
+            read_columns(self.path)
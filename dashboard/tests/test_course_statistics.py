@@ -0,0 +1,103 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from dashboard import course_statistics
+from dashboard.models import Student, Course, CourseStatistics, Enrollment, Assessment
+
+
+class CourseStatisticsTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(
+            course_code='BIO101', course_name='Biology', department='Science', credits=3.0
+        )
+        self.other = Course.objects.create(
+            course_code='CHEM101', course_name='Chemistry', department='Science', credits=3.0
+        )
+
+    def enroll(self, course, final_grade=None):
+        # A fresh student each time keeps clear of the unique enrollment constraint
+        return Enrollment.objects.create(
+            student=Student.objects.create(gender='F'), course=course,
+            semester='Fall', year=2024, final_grade=final_grade
+        )
+
+    def assess(self, enrollment, score):
+        return Assessment.objects.create(
+            enrollment=enrollment, assessment_type='EXAM',
+            date=date(2024, 10, 1), score=score, weight=50
+        )
+
+    def statistics(self, course):
+        return CourseStatistics.objects.get(course=course)
+
+    def test_saves_update_totals(self):
+        """Test that creating and editing rows adjusts the stored totals"""
+        first = self.enroll(self.course, 75.5)
+        self.enroll(self.course, 40)
+        self.enroll(self.course)
+        assessment = self.assess(first, 90)
+
+        first.final_grade = 55
+        first.save()
+        assessment.score = 80
+        assessment.save()
+
+        stats = self.statistics(self.course)
+        self.assertEqual(stats.enrollment_count, 3)
+        self.assertEqual(stats.graded_count, 2)
+        self.assertEqual(stats.passing_count, 0)
+        self.assertEqual(stats.grade_sum, Decimal('95'))
+        self.assertEqual(stats.assessment_count, 1)
+        self.assertEqual(stats.assessment_score_sum, Decimal('80'))
+        self.assertEqual(course_statistics.inconsistencies(), {})
+
+    def test_moves_and_deletes_update_both_courses(self):
+        """Test that moving and deleting rows keeps every course consistent"""
+        enrollment = self.enroll(self.course, 90)
+        target = self.enroll(self.other, 70)
+        assessment = self.assess(enrollment, 60)
+
+        assessment.enrollment = target
+        assessment.save()
+        enrollment.course = self.other
+        enrollment.save()
+        self.assertEqual(self.statistics(self.course).enrollment_count, 0)
+        self.assertEqual(self.statistics(self.other).assessment_count, 1)
+
+        target.delete()
+        self.assertEqual(self.statistics(self.other).enrollment_count, 1)
+        self.assertEqual(self.statistics(self.other).assessment_count, 0)
+        self.assertEqual(course_statistics.inconsistencies(), {})
+
+        self.other.delete()
+        self.assertFalse(CourseStatistics.objects.filter(course_id=self.other.id).exists())
+
+    def test_check_and_rebuild(self):
+        """Test that --check reports drift and a rebuild repairs it"""
+        enrollment = self.enroll(self.course, 80)
+        self.assess(enrollment, 70)
+        # Bulk updates bypass the signals
+        Enrollment.objects.filter(pk=enrollment.pk).update(final_grade=50)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_course_statistics', check=True, stderr=StringIO())
+
+        call_command('rebuild_course_statistics', stdout=StringIO())
+        call_command('rebuild_course_statistics', check=True, stdout=StringIO())
+        self.assertEqual(self.statistics(self.course).passing_count, 0)
+
+    def test_summary_matches_response_shape(self):
+        """Test that the summary of a row matches the course_stats response"""
+        enrollment = self.enroll(self.course, 80)
+        self.enroll(self.course, 50)
+        self.assess(enrollment, 70)
+
+        summary = course_statistics.course_summary(self.statistics(self.course))
+        self.assertEqual(summary['total_students'], 2)
+        self.assertEqual(summary['grade_distribution']['avg_grade'], 65)
+        self.assertEqual(summary['grade_distribution']['passing_rate'], 0.5)
+        self.assertEqual(summary['assessment_stats']['avg_score'], 70)
+        self.assertIsNone(course_statistics.course_summary(None)['assessment_stats']['avg_score'])
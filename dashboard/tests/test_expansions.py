@@ -0,0 +1,92 @@
+from datetime import date
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dashboard.expansions import query_plan
+from dashboard.models import Student, Course, Enrollment, Assessment
+
+
+class ExpandTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.course = Course.objects.create(
+            course_code='BIO101', course_name='Biology', department='Science', credits=3.0
+        )
+        for number in range(5):
+            enrollment = Enrollment.objects.create(
+                student=Student.objects.create(
+                    gender='F', math_score=80, reading_score=70, writing_score=60 + number
+                ),
+                course=self.course, semester='Fall', year=2024
+            )
+            Assessment.objects.create(
+                enrollment=enrollment, assessment_type='QUIZ',
+                date=date(2024, 10, number + 1), score=90, weight=10
+            )
+
+    def test_nested_objects(self):
+        """Test that expanded fields hold nested objects and others stay ids"""
+        response = self.client.get(
+            reverse('assessment-list'), {'expand': 'enrollment.course'}
+        )
+        enrollment = response.data['results'][0]['enrollment']
+        self.assertEqual(enrollment['course']['course_code'], 'BIO101')
+        self.assertIsInstance(enrollment['student'], int)
+
+    def test_expanded_page_query_count(self):
+        """Test that expanding does not add queries per row"""
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('assessment-list'),
+                {'expand': 'enrollment,enrollment.student,enrollment.course'}
+            )
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][4]['enrollment']['student']['writing_score'], 64)
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse('enrollment-list'), {'expand': 'student,course'})
+
+    def test_unknown_expansion(self):
+        """Test that expanding an unsupported field is a 400"""
+        response = self.client.get(reverse('enrollment-list'), {'expand': 'teacher'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_expansion_rejected_on_writes(self):
+        """Test that writes asking for an expansion are a 400 and change nothing"""
+        student = Student.objects.first()
+        url = reverse('enrollment-list') + '?expand=student'
+        data = {'student': student.id, 'course': self.course.id, 'semester': 'Spring', 'year': 2025}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.data)
+        self.assertEqual(Enrollment.objects.count(), 5)
+
+        enrollment = Enrollment.objects.first()
+        response = self.client.patch(
+            reverse('enrollment-detail', args=[enrollment.id]) + '?expand=student',
+            {'semester': 'Spring'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.semester, 'Fall')
+
+    def test_query_plan(self):
+        """Test that to-one paths are joined and to-many paths prefetched"""
+        self.assertEqual(
+            query_plan(Assessment, ['enrollment', 'enrollment.course']),
+            (['enrollment__course'], [])
+        )
+        self.assertEqual(
+            query_plan(Course, ['enrollment', 'enrollment.student']),
+            ([], ['enrollment', 'enrollment__student'])
+        )
+
+    def test_export_ignores_expansion(self):
+        """Test that exports keep plain ids when an expansion is requested"""
+        response = self.client.get(
+            reverse('enrollment-export', args=['csv']), {'expand': 'student'}
+        )
+        header, first = b''.join(response.streaming_content).decode().splitlines()[:2]
+        self.assertIn('student', header.split(','))
+        self.assertTrue(first.split(',')[header.split(',').index('student')].isdigit())
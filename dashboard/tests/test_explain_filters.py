@@ -0,0 +1,74 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from dashboard.models import (
+    Student, Course, Enrollment, Assessment, AttendanceRecord, PerformanceMetrics
+)
+
+
+class ExplainFiltersTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(
+            course_code='BIO101', course_name='Biology', department='Science', credits=3.0
+        )
+        student = Student.objects.create(gender='F', race_ethnicity='B')
+        enrollment = Enrollment.objects.create(
+            student=student, course=course, semester='Fall', year=2024, final_grade=80
+        )
+        Assessment.objects.create(
+            enrollment=enrollment, assessment_type='QUIZ',
+            date=date(2024, 10, 1), score=90, weight=10
+        )
+        AttendanceRecord.objects.create(
+            enrollment=enrollment, date=date(2024, 9, 2), present=False
+        )
+        PerformanceMetrics.objects.create(
+            student=student, semester='Fall', year=2024, gpa=3, attendance_rate=50
+        )
+
+    def explain(self, **options):
+        out = StringIO()
+        call_command('explain_filters', stdout=out, verbosity=2, **options)
+        return out.getvalue()
+
+    def test_every_filter_has_an_index(self):
+        """Test that typical filters and orderings are served by a matching index"""
+        output = self.explain(no_seqscan=True, min_rows=0, max_selectivity=1)
+        self.assertIn('students?race_ethnicity=B&parental_education=high school: ok', output)
+        self.assertIn('attendance?present=false: ok', output)
+        flagged = sorted(
+            line.split(':')[0] for line in output.splitlines() if ' scan of ' in line
+        )
+        # The course catalogue is small enough to scan. The low-cardinality
+        # columns only lead the demographics index together with
+        # race_ethnicity; on their own they match too much of the table for
+        # an index to beat a sequential scan, as does a year of metrics.
+        self.assertEqual(flagged, [
+            'courses?credits=3.0',
+            'performance-metrics?year=2024',
+            'students?gender=F',
+            'students?lunch_type=standard',
+            'students?parental_education=high school',
+        ])
+
+    def test_flags_filtered_index_scans(self):
+        """Test that scanning an index without a condition on its leading column is flagged"""
+        output = self.explain(no_seqscan=True, min_rows=0, max_selectivity=1)
+        self.assertIn(
+            'students?gender=F: full scan of index student_demographics_idx on dashboard_student',
+            output
+        )
+        self.assertIn('students?ordering=-math_score: ok', output)
+
+    def test_flags_sequential_scans(self):
+        """Test that sequential scans are reported and can fail the command"""
+        output = self.explain(min_rows=0, max_selectivity=1)
+        self.assertIn('sequential scan of dashboard_student', output)
+        with self.assertRaises(CommandError):
+            self.explain(min_rows=0, max_selectivity=1, fail_on_seq_scan=True)
+
+    def test_small_tables_are_ignored(self):
+        """Test that sequential scans of small tables are not flagged"""
+        self.assertIn('0 of', self.explain())
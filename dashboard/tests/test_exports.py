@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dashboard.exports import ExportMixin
+from dashboard.models import Student, Course, Enrollment, AttendanceRecord
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.student = Student.objects.create(
+            gender='F', math_score=80, reading_score=70, writing_score=90
+        )
+        course = Course.objects.create(
+            course_code='BIO101', course_name='Biology', department='Science', credits=3.0
+        )
+        self.enrollment = Enrollment.objects.create(
+            student=self.student, course=course, semester='Fall', year=2024, final_grade=88.5
+        )
+        for day in range(1, 6):
+            AttendanceRecord.objects.create(
+                enrollment=self.enrollment, date=date(2024, 9, day), present=day != 3
+            )
+
+    def export(self, basename, export_format, **params):
+        response = self.client.get(reverse(f'{basename}-export', args=[export_format]), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        """Test that CSV exports have a header row and one row per record"""
+        rows = list(csv.reader(io.StringIO(self.export('attendancerecord', 'csv'))))
+        self.assertEqual(rows[0], ['id', 'enrollment', 'date', 'present'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[3][1:], [str(self.enrollment.id), '2024-09-03', 'False'])
+
+    def test_ndjson_export_applies_filters(self):
+        """Test that NDJSON exports honour the viewset filters"""
+        content = self.export('attendancerecord', 'ndjson', present='false')
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['date'], '2024-09-03')
+
+    def test_export_matches_serializer_fields(self):
+        """Test that exports use the serializer's names and omit hidden fields"""
+        student = json.loads(self.export('student', 'ndjson'))
+        self.assertNotIn('fingerprint', student)
+        self.assertEqual(student['math_score'], 80)
+        enrollment = json.loads(self.export('enrollment', 'ndjson'))
+        self.assertEqual(enrollment['student'], self.student.id)
+        self.assertEqual(enrollment['final_grade'], '88.50')
+
+    def test_export_streams_in_chunks(self):
+        """Test that rows are fetched and written in bounded chunks"""
+        with mock.patch.object(ExportMixin, 'export_chunk_size', 2):
+            response = self.client.get(reverse('attendancerecord-export', args=['ndjson']))
+            chunks = list(response.streaming_content)
+        self.assertEqual([chunk.count(b'\n') for chunk in chunks], [2, 2, 1])
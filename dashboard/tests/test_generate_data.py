@@ -0,0 +1,125 @@
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from dashboard import caching, course_statistics, percentiles, synthetic
+from dashboard.models import (
+    Assessment, AttendanceRecord, Course, Enrollment, PerformanceMetrics, Student,
+    StudentPerformanceMetrics
+)
+
+SCALE = ['--students', '40', '--courses', '6', '--enrollments', '3',
+         '--assessments', '2', '--attendance', '30']
+
+
+class SyntheticDistributionTests(SimpleTestCase):
+    def setUp(self):
+        self.students = synthetic.generate_students(20000, np.random.default_rng(1))
+
+    def test_scores_follow_the_raw_data(self):
+        """Test that mean scores and score correlations match the source dataset."""
+        scores = np.column_stack([
+            self.students['math_score'], self.students['reading_score'],
+            self.students['writing_score']
+        ]).astype(float)
+        np.testing.assert_allclose(scores.mean(axis=0), [66.1, 69.2, 68.1], atol=1)
+        correlation = np.corrcoef(scores.T)
+        self.assertGreater(correlation[1, 2], 0.9)
+        self.assertGreater(correlation[0, 1], 0.75)
+
+    def test_attendance_dates_are_distinct_per_enrollment(self):
+        """Test that no enrollment gets two attendance records on the same day."""
+        rng = np.random.default_rng(2)
+        students = synthetic.generate_students(500, rng)
+        term_starts = np.array([start for _, _, start in synthetic.terms(2023, 2024)])
+        enrollments = synthetic.generate_enrollments(
+            students, np.full(5, 0.2), len(term_starts), 4, rng
+        )
+        for meetings in (1, 20, 40, synthetic.MAX_MEETINGS):
+            attendance = synthetic.generate_attendance(
+                enrollments, term_starts, np.full(500, 0.9), meetings, rng
+            )
+            pairs = np.unique(np.column_stack([
+                attendance['enrollment'], attendance['date'].astype(np.int64)
+            ]), axis=0)
+            self.assertEqual(len(pairs), len(enrollments['term']) * meetings)
+
+
+class GenerateDataCommandTests(TestCase):
+    def generate(self, *args):
+        call_command('generate_data', *SCALE, *args, stdout=StringIO())
+
+    def snapshot(self):
+        return [
+            list(model.objects.order_by('id').values_list(*fields))
+            for model, fields in [
+                (Student, ['gender', 'math_score', 'race_ethnicity', 'lunch_type']),
+                (Course, ['course_code', 'credits']),
+                (Enrollment, ['student_id', 'course_id', 'semester', 'year', 'final_grade']),
+                (Assessment, ['enrollment_id', 'assessment_type', 'date', 'score']),
+                (AttendanceRecord, ['enrollment_id', 'date', 'present']),
+            ]
+        ]
+
+    def test_generates_requested_scale(self):
+        """Test that the requested rows and their derived data are created."""
+        self.generate()
+        enrollments = Enrollment.objects.count()
+        self.assertEqual(Student.objects.count(), 40)
+        self.assertEqual(Course.objects.count(), 6)
+        self.assertGreaterEqual(enrollments, 40)
+        self.assertEqual(Assessment.objects.count(), 2 * enrollments)
+        self.assertEqual(AttendanceRecord.objects.count(), 30 * enrollments)
+        self.assertEqual(StudentPerformanceMetrics.objects.count(), 40)
+        self.assertTrue(PerformanceMetrics.objects.exists())
+        self.assertEqual(course_statistics.inconsistencies(), {})
+
+    def test_same_seed_gives_same_data(self):
+        """Test that replacing the data with the same seed reproduces it exactly."""
+        # --replace restarts the id sequences, so ids match too
+        self.generate('--seed', '7', '--replace')
+        first = self.snapshot()
+        self.generate('--seed', '7', '--replace', '--engine', 'orm')
+        self.assertTrue(self.snapshot() == first)
+        self.generate('--seed', '8', '--replace')
+        self.assertFalse(self.snapshot() == first)
+
+    def test_percentiles_rank_against_all_students(self):
+        """Test that generated students are ranked among the existing students too."""
+        existing = {
+            Student.objects.create(
+                gender='F', math_score=100, reading_score=100, writing_score=100
+            ).pk
+            for _ in range(10)
+        }
+        self.generate()
+        students = list(Student.objects.order_by('id').values_list(
+            'id', 'math_score', 'reading_score', 'writing_score'
+        ))
+        ids, math, reading, writing = zip(*students)
+        expected = percentiles.student_percentile_ranks(math, reading, writing)
+        generated = StudentPerformanceMetrics.objects.exclude(student_id__in=existing)
+        ranks = dict(generated.values_list('student_id', 'math_percentile'))
+        self.assertEqual(len(ranks), 40)
+        for position, pk in enumerate(ids):
+            if pk not in existing:
+                self.assertAlmostEqual(
+                    float(ranks[pk]), expected['math'][position], places=2
+                )
+
+    def test_replace_invalidates_cached_results(self):
+        """Test that rows reusing the ids of replaced ones are not served their cache."""
+        self.generate('--replace')
+        course = Course.objects.order_by('id').first().pk
+        student = Student.objects.order_by('id').first().pk
+        caching.get_or_compute('course_stats', course, lambda: 'old')
+        caching.get_or_compute('performance_summary', student, lambda: 'old')
+        self.generate('--replace', '--seed', '8')
+        self.assertEqual(Course.objects.order_by('id').first().pk, course)
+        self.assertEqual(
+            caching.get_or_compute('course_stats', course, lambda: 'new'), 'new'
+        )
+        self.assertEqual(
+            caching.get_or_compute('performance_summary', student, lambda: 'new'), 'new'
+        )
@@ -0,0 +1,98 @@
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dashboard import metrics
+from dashboard.models import Student
+
+STUDENT_LIST = 'route="student-list",action="list",method="GET"'
+
+
+@override_settings(METRICS_MULTIPROCESS_DIR=None)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics._store = None
+        Student.objects.create(gender='F')
+
+    def scrape(self, client):
+        response = client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_records_route_and_action(self):
+        """Test that latency, SQL and size histograms are labelled by route and action"""
+        client = APIClient()
+        client.get(reverse('student-list'))
+        client.get(reverse('student-list'))
+        client.get(reverse('student-export', args=['csv'])).getvalue()
+
+        text = self.scrape(client)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn(f'http_request_duration_seconds_count{{{STUDENT_LIST}}} 2', text)
+        # A count and a page of students
+        self.assertIn(f'http_request_sql_queries_sum{{{STUDENT_LIST}}} 4', text)
+        self.assertIn(f'http_request_sql_queries_bucket{{{STUDENT_LIST},le="+Inf"}} 2', text)
+        self.assertIn(
+            'http_response_size_bytes_count{route="student-export",action="export",method="GET"} 1',
+            text
+        )
+        self.assertNotIn('route="metrics"', text)
+
+    def test_streamed_export_is_measured_to_the_end(self):
+        """Test that an export's queries and duration include streaming its body"""
+        export = 'route="student-export",action="export",method="GET"'
+        client = APIClient()
+        with mock.patch('dashboard.middleware.time.perf_counter', return_value=0):
+            response = client.get(reverse('student-export', args=['ndjson']))
+        self.assertNotIn(export, self.scrape(client))
+
+        # Queries run and time passes only while the body is iterated
+        with mock.patch('dashboard.middleware.time.perf_counter', return_value=7):
+            body = response.getvalue()
+        text = self.scrape(client)
+        self.assertIn(f'http_request_duration_seconds_sum{{{export}}} 7', text)
+        self.assertIn(f'http_request_sql_queries_bucket{{{export},le="0"}} 0', text)
+        self.assertIn(f'http_response_size_bytes_sum{{{export}}} {len(body)}', text)
+
+    def test_sampling(self):
+        """Test that unsampled requests are skipped and sampled ones weighted up"""
+        with self.settings(METRICS_SAMPLE_RATE=0.5):
+            client = APIClient()
+            with mock.patch('dashboard.middleware.random.random', side_effect=[0.9, 0.1]):
+                client.get(reverse('student-list'))
+                client.get(reverse('student-list'))
+        text = self.scrape(APIClient())
+        self.assertIn(f'http_request_duration_seconds_count{{{STUDENT_LIST}}} 2', text)
+        self.assertIn(f'http_request_sql_queries_sum{{{STUDENT_LIST}}} 4', text)
+
+
+class MultiprocessStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        metrics._store = None
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        metrics._store = None
+
+    def test_workers_are_merged(self):
+        """Test that /metrics sums the histogram files of every worker"""
+        labels = ('student-list', 'list', 'GET')
+        with self.settings(METRICS_MULTIPROCESS_DIR=self.tmp.name):
+            with mock.patch('os.getpid', return_value=1001):
+                other = metrics.HistogramStore(self.tmp.name)
+            other.observe('http_request_sql_queries', labels, 3)
+            metrics.get_store().observe('http_request_sql_queries', labels, 30)
+
+            merged = metrics.collect()
+        values = merged[('http_request_sql_queries', *labels)]
+        self.assertEqual(values[-1], 2)
+        self.assertEqual(values[-2], 33)
+
+        text = metrics.exposition(merged)
+        self.assertIn('http_request_sql_queries_bucket{route="student-list",action="list",'
+                      'method="GET",le="5"} 1', text)
+        self.assertIn('http_request_sql_queries_bucket{route="student-list",action="list",'
+                      'method="GET",le="50"} 2', text)
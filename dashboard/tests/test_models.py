@@ -1,8 +1,29 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.core.exceptions import ValidationError
 from django.db.utils import IntegrityError
-from dashboard.models import Student, StudentPerformanceMetrics
+from dashboard.management.commands.import_data import Command as ImportCommand
+from dashboard.models import ScoreHistogram, Student, StudentPerformanceMetrics
+from dashboard.student_csv import (
+    STUDENT_FIELDS, decode_columnar_shard, decode_shard, parse_row, shard_offsets
+)
 from django.core.management import call_command
+from django.core.management.base import CommandError
+import csv
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from data import process_data
+
+
+def write_columnar(directory):
+    """Process the raw dataset into a typed columnar file in `directory`."""
+    path = str(Path(directory) / 'processed_student_data.cols')
+    chunks = process_data.clean_chunks([process_data.load_data(process_data.RAW_FILE)])
+    process_data.write_chunks(process_data.categorize_chunks(chunks), columnar_path=path)
+    return path
+
 
 class StudentModelTests(TestCase):
     def setUp(self):
@@ -127,4 +148,216 @@ class DataImportTests(TestCase):
             self.assertEqual(invalid_percentiles, 0, "Found percentiles greater than 100")
             
         except Exception as e:
-            self.fail(f"Import command failed: {str(e)}") 
\ No newline at end of file
+            self.fail(f"Import command failed: {str(e)}")
+
+    def test_import_command_batches(self):
+        """Test that a small batch size imports every row exactly once"""
+        out = StringIO()
+        call_command('import_data', batch_size=64, stdout=out)
+
+        with open('data/processed/processed_student_data.csv') as file:
+            row_count = sum(1 for _ in file) - 1
+
+        self.assertEqual(Student.objects.count(), row_count)
+        self.assertEqual(StudentPerformanceMetrics.objects.count(), row_count)
+        self.assertEqual(
+            StudentPerformanceMetrics.objects.values('student').distinct().count(),
+            row_count
+        )
+        self.assertIn(f'Imported {row_count} students', out.getvalue())
+
+    def test_import_command_copy_engine(self):
+        """Test that the COPY engine loads the same rows as the ORM engine"""
+        call_command('import_data', engine='copy', batch_size=250, stdout=StringIO())
+        copied = list(Student.objects.order_by('id').values_list(
+            'gender', 'math_score', 'reading_score', 'writing_score',
+            'race_ethnicity', 'parental_education', 'lunch_type', 'test_preparation'
+        ))
+        self.assertEqual(StudentPerformanceMetrics.objects.count(), len(copied))
+        self.assertFalse(
+            StudentPerformanceMetrics.objects.filter(created_at__isnull=True).exists()
+        )
+
+        Student.objects.all().delete()
+        call_command('import_data', engine='orm', stdout=StringIO())
+        inserted = list(Student.objects.order_by('id').values_list(
+            'gender', 'math_score', 'reading_score', 'writing_score',
+            'race_ethnicity', 'parental_education', 'lunch_type', 'test_preparation'
+        ))
+        self.assertEqual(copied, inserted)
+
+    def test_import_command_copy_fallback(self):
+        """Test that the COPY engine falls back to the ORM path when unsupported"""
+        out = StringIO()
+        with mock.patch(
+            'dashboard.management.commands.import_data.copy_supported',
+            return_value=False
+        ):
+            call_command('import_data', engine='copy', stdout=out)
+        self.assertIn('falling back to the orm engine', out.getvalue())
+        self.assertEqual(
+            Student.objects.count(), StudentPerformanceMetrics.objects.count()
+        )
+
+    def test_incremental_import_is_idempotent(self):
+        """Test that re-running an incremental import adds nothing"""
+        call_command('import_data', incremental=True, stdout=StringIO())
+        student_count = Student.objects.count()
+        metrics_count = StudentPerformanceMetrics.objects.count()
+        self.assertEqual(student_count, metrics_count)
+        self.assertFalse(Student.objects.filter(fingerprint__isnull=True).exists())
+
+        out = StringIO()
+        call_command('import_data', incremental=True, stdout=out)
+        self.assertIn('No changes since the last import', out.getvalue())
+        self.assertEqual(Student.objects.count(), student_count)
+        self.assertEqual(StudentPerformanceMetrics.objects.count(), metrics_count)
+
+    def import_edited_row(self, **options):
+        """Incrementally import the processed CSV with the first math score changed."""
+        with open('data/processed/processed_student_data.csv') as file:
+            lines = file.readlines()
+        fields = lines[1].split(',')
+        fields[1] = '100' if fields[1] != '100' else '0'  # change the math score
+        lines[1] = ','.join(fields)
+
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'changed.csv'
+            path.write_text(''.join(lines))
+            out = StringIO()
+            call_command('import_data', incremental=True, file=str(path), stdout=out, **options)
+        return out
+
+    def test_incremental_import_applies_delta(self):
+        """Test that with --prune a changed row is inserted, pruned and re-ranked"""
+        call_command('import_data', incremental=True, stdout=StringIO())
+        student_count = Student.objects.count()
+        metrics_count = StudentPerformanceMetrics.objects.count()
+
+        out = self.import_edited_row(prune=True)
+
+        self.assertIn('Inserted 1 new students', out.getvalue())
+        self.assertIn('Pruned 1 students', out.getvalue())
+        self.assertIn(
+            'Deleted 1 dashboard.StudentPerformanceMetrics rows of pruned students',
+            out.getvalue()
+        )
+        self.assertEqual(Student.objects.count(), student_count)
+        # The pruned student's snapshot is gone and, since the distribution
+        # changed, every remaining student gets a fresh one
+        self.assertEqual(
+            StudentPerformanceMetrics.objects.count(), metrics_count - 1 + student_count
+        )
+
+    def test_incremental_import_without_pruning(self):
+        """Test that by default the old version of an edited row is kept as well"""
+        call_command('import_data', incremental=True, stdout=StringIO())
+        student_count = Student.objects.count()
+
+        out = self.import_edited_row()
+        self.assertIn('Inserted 1 new students', out.getvalue())
+        self.assertNotIn('Pruned', out.getvalue())
+        self.assertEqual(Student.objects.count(), student_count + 1)
+
+    def test_incremental_import_copy_engine(self):
+        """Test that the COPY engine records fingerprints too"""
+        call_command('import_data', incremental=True, engine='copy', stdout=StringIO())
+        student_count = Student.objects.count()
+        self.assertFalse(Student.objects.filter(fingerprint__isnull=True).exists())
+
+        call_command('import_data', incremental=True, stdout=StringIO())
+        self.assertEqual(Student.objects.count(), student_count)
+
+    def test_columnar_and_csv_imports_match(self):
+        """Test that the columnar file imports exactly the same students as the CSV"""
+        fields = [
+            'gender', 'math_score', 'reading_score', 'writing_score',
+            'race_ethnicity', 'parental_education', 'lunch_type', 'test_preparation'
+        ]
+        call_command('import_data', file='data/processed/processed_student_data.csv',
+                     stdout=StringIO())
+        from_csv = list(Student.objects.order_by('id').values_list(*fields))
+        Student.objects.all().delete()
+
+        with TemporaryDirectory() as tmp:
+            call_command('import_data', file=write_columnar(tmp), batch_size=300,
+                         stdout=StringIO())
+        from_columnar = list(Student.objects.order_by('id').values_list(*fields))
+        self.assertEqual(from_columnar, from_csv)
+
+    def test_prune_requires_incremental(self):
+        """Test that --prune is rejected outside incremental mode"""
+        with self.assertRaises(CommandError):
+            call_command('import_data', prune=True, stdout=StringIO())
+
+
+class ParallelImportTests(TransactionTestCase):
+    def test_parallel_import_matches_serial(self):
+        """Test that a sharded import loads every row and ranks them globally"""
+        call_command('import_data', stdout=StringIO())
+        serial = sorted(StudentPerformanceMetrics.objects.values_list(
+            'student__math_score', 'student__reading_score', 'student__writing_score',
+            'math_percentile', 'reading_percentile', 'writing_percentile',
+            'overall_percentile'
+        ))
+        Student.objects.all().delete()
+
+        call_command('import_data', workers=3, batch_size=100, stdout=StringIO())
+        parallel = sorted(StudentPerformanceMetrics.objects.values_list(
+            'student__math_score', 'student__reading_score', 'student__writing_score',
+            'math_percentile', 'reading_percentile', 'writing_percentile',
+            'overall_percentile'
+        ))
+        self.assertEqual(Student.objects.count(), len(serial))
+        self.assertEqual(parallel, serial)
+
+    def assert_nothing_imported(self):
+        self.assertFalse(Student.objects.exists())
+        self.assertFalse(StudentPerformanceMetrics.objects.exists())
+        self.assertFalse(
+            ScoreHistogram.objects.filter(math_counts__contains=[1]).exists()
+        )
+
+    def test_failed_shard_discards_import(self):
+        """Test that students of committed shards are deleted when another shard fails"""
+        write_shard = ImportCommand.write_shard
+        with open('data/processed/processed_student_data.csv') as file:
+            first = parse_row(next(csv.DictReader(file)))
+        first_row = tuple(first[name] for name in STUDENT_FIELDS)
+
+        def fail_later_shards(command, rows):
+            if rows[0] != first_row:
+                raise RuntimeError('shard failed')
+            return write_shard(command, rows)
+
+        with mock.patch.object(ImportCommand, 'write_shard', fail_later_shards):
+            with self.assertRaisesMessage(RuntimeError, 'shard failed'):
+                call_command('import_data', workers=3, stdout=StringIO())
+        self.assert_nothing_imported()
+
+    def test_failed_metrics_pass_discards_import(self):
+        """Test that shards are deleted again when ranking them fails"""
+        with mock.patch.object(
+            ImportCommand, 'import_metrics', side_effect=RuntimeError('ranking failed')
+        ):
+            with self.assertRaisesMessage(RuntimeError, 'ranking failed'):
+                call_command('import_data', workers=3, stdout=StringIO())
+        self.assert_nothing_imported()
+
+    def test_shards_cover_every_row_once(self):
+        """Test that byte-range shards neither drop nor repeat rows"""
+        path = 'data/processed/processed_student_data.csv'
+        with open(path) as file:
+            expected = [
+                tuple(parse_row(row)[name] for name in STUDENT_FIELDS)
+                for row in csv.DictReader(file)
+            ]
+        for shards in (1, 2, 7, 64):
+            offsets = shard_offsets(path, shards)
+            rows = []
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                rows.extend(decode_shard(path, start, end))
+            self.assertEqual(rows, expected)
+
+        with TemporaryDirectory() as tmp:
+            self.assertEqual(decode_columnar_shard(write_columnar(tmp), 0, None), expected)
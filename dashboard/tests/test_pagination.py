@@ -0,0 +1,69 @@
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dashboard.models import Student, Course, Enrollment, AttendanceRecord
+from dashboard.pagination import KeysetPagination
+
+
+@mock.patch.object(KeysetPagination, 'page_size', 3)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        course = Course.objects.create(
+            course_code='BIO101', course_name='Biology', department='Science', credits=3.0
+        )
+        # Several records share a date, so the id has to break the ties
+        records = []
+        for number in range(4):
+            enrollment = Enrollment.objects.create(
+                student=Student.objects.create(gender='F'), course=course,
+                semester='Fall', year=2024
+            )
+            for day in (3, 2):
+                records.append(AttendanceRecord.objects.create(
+                    enrollment=enrollment, date=date(2024, 9, day), present=True
+                ))
+        self.expected = [
+            record.id for record in sorted(records, key=lambda r: (r.date, r.id))
+        ]
+
+    def walk(self, url, link):
+        ids = []
+        while url:
+            data = self.client.get(url).data
+            self.assertNotIn('count', data)
+            ids.extend(row['id'] for row in data['results'])
+            url = data[link]
+        return ids, data
+
+    def test_walk_forward_and_back(self):
+        """Test that next links visit every row once and previous links retrace them"""
+        ids, last_page = self.walk(reverse('attendancerecord-list'), 'next')
+        self.assertEqual(ids, self.expected)
+
+        back, _ = self.walk(last_page['previous'], 'previous')
+        pages = [self.expected[i:i + 3] for i in range(0, len(self.expected), 3)]
+        self.assertEqual(back, [i for page in reversed(pages[:-1]) for i in page])
+
+    def test_page_costs_one_query(self):
+        """Test that a later page is a single query without a count"""
+        first = self.client.get(reverse('attendancerecord-list')).data
+        with self.assertNumQueries(1):
+            self.client.get(first['next'])
+
+    def test_filters_apply_to_pages(self):
+        """Test that cursors page through filtered results"""
+        enrollment = Enrollment.objects.first()
+        ids, _ = self.walk(
+            reverse('attendancerecord-list') + f'?enrollment={enrollment.id}', 'next'
+        )
+        self.assertEqual(len(ids), 2)
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is a 404 rather than a server error"""
+        for cursor in ['garbage', 'eyJwIjogWyJub3QtYS1kYXRlIiwgMV0sICJyIjogMH0=']:
+            response = self.client.get(reverse('attendancerecord-list'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
@@ -0,0 +1,152 @@
+import csv
+import os
+import tempfile
+from datetime import date
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dashboard import course_statistics, partitioning
+from dashboard.models import (
+    Assessment, AttendanceBitmap, AttendanceRecord, Course, Enrollment,
+    PerformanceMetricsChange, Student
+)
+
+
+class PartitionedTestCase(TestCase):
+    def setUp(self):
+        course = Course.objects.create(
+            course_code='BIO101', course_name='Biology', department='Science', credits=4.0
+        )
+        student = Student.objects.create(gender='F')
+        self.enrollments = [
+            Enrollment.objects.create(student=student, course=course, semester='Fall', year=year)
+            for year in (2022, 2023)
+        ]
+        for enrollment in self.enrollments:
+            Assessment.objects.create(
+                enrollment=enrollment, assessment_type='EXAM',
+                date=date(enrollment.year, 12, 1), score=75, weight=40
+            )
+            AttendanceRecord.objects.create(
+                enrollment=enrollment, date=date(enrollment.year, 9, 2), present=True
+            )
+
+
+class PartitioningTests(PartitionedTestCase):
+    def partitions(self, model):
+        with connection.cursor() as cursor:
+            return partitioning.partitions(cursor, model._meta.db_table)
+
+    def rows_in(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(name)}')
+            return cursor.fetchone()[0]
+
+    def test_tables_are_partitioned(self):
+        """Test that migrations leave yearly and default partitions behind."""
+        this_year = date.today().year
+        for model in partitioning.PARTITIONED_MODELS:
+            with connection.cursor() as cursor:
+                self.assertTrue(partitioning.is_partitioned(cursor, model._meta.db_table))
+            self.assertLessEqual({this_year, this_year + 1, None}, set(self.partitions(model)))
+
+    def test_ensure_partitions_moves_default_rows(self):
+        """Test that new partitions take over their years' rows from the default."""
+        created = partitioning.ensure_partitions(date.today().year + 2)
+        self.assertIn('dashboard_assessment_2022', created)
+        self.assertIn(f'dashboard_attendancerecord_{date.today().year + 2}', created)
+        self.assertEqual(self.rows_in('dashboard_assessment_2023'), 1)
+        self.assertEqual(self.rows_in('dashboard_assessment_default'), 0)
+        self.assertEqual(partitioning.ensure_partitions(date.today().year + 2), [])
+        # Ids keep coming from the one sequence across partitions
+        assessment = Assessment.objects.create(
+            enrollment=self.enrollments[0], assessment_type='QUIZ',
+            date=date(2022, 10, 1), score=60, weight=10
+        )
+        self.assertEqual(
+            assessment.pk, max(Assessment.objects.values_list('pk', flat=True))
+        )
+        self.assertEqual(Assessment.objects.filter(date__year=2022).count(), 2)
+
+    def test_date_filter_prunes_partitions(self):
+        """Test that a bounded date filter only scans the matching partition."""
+        partitioning.ensure_partitions(date.today().year)
+        plan = Assessment.objects.filter(
+            date__gte=date(2023, 1, 1), date__lte=date(2023, 12, 31)
+        ).explain()
+        self.assertIn('dashboard_assessment_2023', plan)
+        self.assertNotIn('dashboard_assessment_2022', plan)
+        self.assertNotIn('dashboard_assessment_default', plan)
+
+    def test_detach_and_archive(self):
+        """Test that old partitions are detached, archived to CSV and dropped."""
+        partitioning.ensure_partitions(date.today().year)
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                'manage_partitions', detach_before=2023, archive_dir=directory,
+                stdout=StringIO()
+            )
+            with open(os.path.join(directory, 'dashboard_assessment_2022.csv')) as file:
+                rows = list(csv.DictReader(file))
+        self.assertEqual([row['date'] for row in rows], ['2022-12-01'])
+        self.assertNotIn(2022, self.partitions(Assessment))
+        self.assertNotIn(2022, self.partitions(AttendanceRecord))
+        self.assertEqual(Assessment.objects.count(), 1)
+        # Without their foreign keys, archived years do not block deletions
+        self.enrollments[0].delete()
+
+    def test_detach_refreshes_derived_data(self):
+        """Test that derived data stops counting the rows of detached years."""
+        # A term of 2021 that ran into January
+        late = Enrollment.objects.create(
+            student=self.enrollments[0].student, course=self.enrollments[0].course,
+            semester='Fall', year=2021
+        )
+        AttendanceRecord.objects.create(enrollment=late, date=date(2022, 1, 10), present=True)
+        partitioning.ensure_partitions(date.today().year)
+        PerformanceMetricsChange.objects.all().delete()
+        partitioning.detach_partitions(2023)
+        self.assertEqual(course_statistics.inconsistencies(), {})
+        self.assertEqual(
+            list(AttendanceBitmap.objects.values_list('enrollment_id', flat=True)),
+            [self.enrollments[1].pk]
+        )
+        self.assertEqual(
+            sorted(PerformanceMetricsChange.objects.values_list('semester', 'year')),
+            [('Fall', 2021), ('Fall', 2022)]
+        )
+
+    def test_stray_row_of_detached_year(self):
+        """Test that a year detached but not archived can get a new partition."""
+        partitioning.ensure_partitions(date.today().year)
+        partitioning.detach_partitions(2023)
+        Assessment.objects.create(
+            enrollment=self.enrollments[0], assessment_type='QUIZ',
+            date=date(2022, 10, 1), score=60, weight=10
+        )
+        created = partitioning.ensure_partitions(date.today().year)
+        self.assertEqual(created, ['dashboard_assessment_2022_2'])
+        self.assertEqual(self.rows_in('dashboard_assessment_2022'), 1)
+        self.assertEqual(self.rows_in('dashboard_assessment_2022_2'), 1)
+        self.assertEqual(self.partitions(Assessment)[2022], 'dashboard_assessment_2022_2')
+
+
+class PartitionedAPITests(PartitionedTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_date_range_filter(self):
+        """Test that the list endpoints filter on date ranges."""
+        response = APIClient().get(
+            reverse('assessment-list'), {'date__gte': '2023-01-01', 'date__lte': '2023-12-31'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['date'] for row in response.data['results']], ['2023-12-01'])
+        response = APIClient().get(reverse('attendancerecord-list'), {'date__lte': '2022-12-31'})
+        self.assertEqual([row['date'] for row in response.data['results']], ['2022-09-02'])
@@ -0,0 +1,69 @@
+import numpy as np
+from django.test import SimpleTestCase
+from dashboard.percentiles import (
+    percentile_ranks, rank_against, histogram_ranks,
+    integer_percentile_ranks, student_percentile_ranks
+)
+
+
+def naive_ranks(values):
+    values = list(values)
+    n = len(values)
+    return [
+        100 * (sum(v < x for v in values) + 0.5 * sum(v == x for v in values)) / n
+        for x in values
+    ]
+
+
+class PercentileRankTests(SimpleTestCase):
+    def test_matches_definition(self):
+        """Test that ranks follow (below + 0.5 * equal) / n"""
+        values = [50, 70, 70, 90, 10]
+        np.testing.assert_allclose(percentile_ranks(values), naive_ranks(values))
+        np.testing.assert_allclose(percentile_ranks(values), [30, 60, 60, 90, 10])
+
+    def test_ties_share_a_rank(self):
+        """Test that equal scores always receive equal ranks"""
+        ranks = percentile_ranks([80, 80, 80, 80])
+        np.testing.assert_allclose(ranks, [50, 50, 50, 50])
+
+    def test_engines_agree(self):
+        """Test that the sort and histogram engines give identical ranks"""
+        scores = np.random.default_rng(0).integers(0, 101, size=5000)
+        np.testing.assert_allclose(
+            integer_percentile_ranks(scores), percentile_ranks(scores)
+        )
+
+    def test_rank_against_population(self):
+        """Test ranking values that are not part of the population"""
+        population = np.sort([10, 20, 30, 40])
+        np.testing.assert_allclose(rank_against(population, [5, 20, 45]), [0, 37.5, 100])
+
+    def test_histogram_ranks(self):
+        """Test bucket ranks from a count vector"""
+        np.testing.assert_allclose(histogram_ranks([1, 0, 3]), [12.5, 25, 62.5])
+
+    def test_out_of_range_scores(self):
+        """Test that the histogram engine rejects out-of-range values"""
+        with self.assertRaises(ValueError):
+            integer_percentile_ranks([50, 101])
+
+    def test_empty_input(self):
+        """Test that ranking nothing returns nothing"""
+        self.assertEqual(percentile_ranks([]).size, 0)
+        self.assertEqual(integer_percentile_ranks([]).size, 0)
+
+    def test_overall_rank_uses_average_order(self):
+        """Test that the overall rank orders students by average score"""
+        ranks = student_percentile_ranks([90, 60, 75], [90, 60, 75], [60, 90, 75])
+        np.testing.assert_allclose(ranks['overall'], naive_ranks([80, 70, 75]))
+        np.testing.assert_allclose(ranks['math'], naive_ranks([90, 60, 75]))
+
+    def test_student_ranks_match_definition(self):
+        """Test every student percentile against the definition on random scores"""
+        rng = np.random.default_rng(42)
+        math, reading, writing = (rng.integers(0, 101, size=300) for _ in range(3))
+        ranks = student_percentile_ranks(math, reading, writing)
+        np.testing.assert_allclose(ranks['reading'], naive_ranks(reading))
+        np.testing.assert_allclose(ranks['overall'], naive_ranks(math + reading + writing))
+        # Timing the engines on large inputs is left to the benchmark command
@@ -0,0 +1,155 @@
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dashboard import score_histograms
+from dashboard.models import ScoreHistogram, Student, StudentPerformanceMetrics
+from dashboard.percentiles import integer_percentile_ranks, student_percentile_ranks
+
+# gender, lunch_type, math, reading, writing
+STUDENTS = [
+    ('F', 'standard', 72, 80, 78),
+    ('F', 'standard', 64, 70, 69),
+    ('F', 'free/reduced', 64, 61, 58),
+    ('M', 'standard', 81, 74, 70),
+    ('M', 'free/reduced', 47, 49, 45),
+]
+
+
+def stored_counts():
+    counts = {}
+    for row in ScoreHistogram.objects.values():
+        # Emptied cells stay behind as all zeros
+        if any(row['math_counts']):
+            counts[score_histograms.cell_of(row)] = {
+                subject: row[score_histograms.counts_field(subject)]
+                for subject in score_histograms.SUBJECTS
+            }
+    return counts
+
+
+def live_counts():
+    return {
+        cell: {subject: vectors[subject].tolist() for subject in score_histograms.SUBJECTS}
+        for cell, vectors in score_histograms.live_counts().items()
+    }
+
+
+class ScoreHistogramTestCase(TestCase):
+    def setUp(self):
+        self.students = [
+            Student.objects.create(
+                gender=gender, lunch_type=lunch_type, math_score=math,
+                reading_score=reading, writing_score=writing
+            )
+            for gender, lunch_type, math, reading, writing in STUDENTS
+        ]
+
+
+class ScoreHistogramTests(ScoreHistogramTestCase):
+    def test_signals_match_rebuild(self):
+        """Test that saves and deletes keep the histograms equal to a recount."""
+        self.assertEqual(stored_counts(), live_counts())
+        moved = self.students[0]
+        moved.lunch_type = 'free/reduced'
+        moved.math_score = 90
+        moved.save()
+        unchanged = self.students[1]
+        unchanged.save()
+        self.students[4].delete()
+        self.assertEqual(stored_counts(), live_counts())
+
+        self.assertEqual(score_histograms.rebuild(), 3)
+        self.assertEqual(stored_counts(), live_counts())
+
+    def test_ranks_match_percentiles(self):
+        """Test that stored histograms rank like the percentile engines."""
+        math, reading, writing = np.array([row[2:] for row in STUDENTS]).T
+        expected = student_percentile_ranks(math, reading, writing)
+        ranks = score_histograms.student_percentile_ranks(math, reading, writing)
+        for subject in expected:
+            np.testing.assert_allclose(ranks[subject], expected[subject])
+
+    def test_score_at(self):
+        """Test the nearest-rank score lookup."""
+        counts = score_histograms.cohort_counts()['math']
+        self.assertEqual(score_histograms.score_at(counts, 0), 47)
+        self.assertEqual(score_histograms.score_at(counts, 50), 64)
+        self.assertEqual(score_histograms.score_at(counts, 100), 81)
+        with self.assertRaises(ValueError):
+            score_histograms.score_at(np.zeros(101), 50)
+
+    def test_counts_students_without_stored_histograms(self):
+        """Test that off PostgreSQL nothing is stored and cohorts are counted live."""
+        stored = stored_counts()
+        expected = score_histograms.cohort_counts(gender='F')
+        with mock.patch.object(score_histograms, 'supported', return_value=False):
+            Student.objects.create(
+                gender='M', lunch_type='standard', math_score=10, reading_score=20,
+                writing_score=30
+            )
+            self.students[0].delete()
+            self.assertEqual(score_histograms.rebuild(), 0)
+            counts = score_histograms.cohort_counts(gender='F')
+            expected['math'][72] -= 1
+            expected['reading'][80] -= 1
+            expected['writing'][78] -= 1
+            expected['total'][72 + 80 + 78] -= 1
+            for subject in score_histograms.SUBJECTS:
+                np.testing.assert_array_equal(counts[subject], expected[subject])
+        self.assertEqual(stored_counts(), stored)
+
+
+class ScoreHistogramAPITests(ScoreHistogramTestCase):
+    def get(self, action, **params):
+        return APIClient().get(reverse(f'student-{action}'), params)
+
+    def test_distribution(self):
+        """Test a cohort's distribution endpoint."""
+        response = self.get('score-distribution', gender='F')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['math'][64], 2)
+        self.assertEqual(len(response.data['total']), 301)
+        self.assertEqual(sum(response.data['reading']), 3)
+
+    def test_percentile_lookups(self):
+        """Test rank and score lookups within a cohort."""
+        response = self.get('score-percentile', subject='math', score=64, gender='F')
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(
+            response.data['percentile_rank'], integer_percentile_ranks([72, 64, 64])[1]
+        )
+        response = self.get('score-percentile', subject='total', percentile=50)
+        self.assertEqual(response.data['score'], 64 + 70 + 69)
+        response = self.get('score-percentile', subject='math', score=50, gender='X')
+        self.assertEqual((response.data['count'], response.data['percentile_rank']), (0, None))
+
+    def test_invalid_parameters(self):
+        """Test that unknown subjects and out-of-range values are rejected."""
+        self.assertEqual(self.get('score-percentile', subject='art', score=1).status_code, 400)
+        self.assertEqual(self.get('score-percentile', subject='math', score=101).status_code, 400)
+        self.assertEqual(
+            self.get('score-percentile', subject='math', percentile='nan').status_code, 400
+        )
+        self.assertEqual(self.get('score-percentile', subject='math').status_code, 400)
+
+
+class ImportHistogramTests(TestCase):
+    def test_import_maintains_histograms(self):
+        """Test that bulk imports add to the histograms they rank against."""
+        call_command('import_data', engine='copy', stdout=StringIO())
+        self.assertEqual(stored_counts(), live_counts())
+
+        students = list(Student.objects.order_by('pk').values_list(
+            'math_score', 'reading_score', 'writing_score'
+        ))
+        expected = student_percentile_ranks(*np.array(students).T)['overall']
+        stored = StudentPerformanceMetrics.objects.order_by('student_id').values_list(
+            'overall_percentile', flat=True
+        )
+        np.testing.assert_allclose([float(rank) for rank in stored], expected, atol=0.005)
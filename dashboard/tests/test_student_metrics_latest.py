@@ -0,0 +1,135 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from dashboard import snapshot_retention
+from dashboard.models import Student, StudentPerformanceMetrics
+from dashboard.pagination import KeysetPagination
+
+NOW = timezone.now()
+
+
+def snapshot(student, days_ago, percentile=50):
+    metrics = StudentPerformanceMetrics.objects.create(
+        student=student, math_percentile=percentile, reading_percentile=percentile,
+        writing_percentile=percentile, overall_percentile=percentile
+    )
+    # created_at is auto_now_add, so backdate it afterwards
+    StudentPerformanceMetrics.objects.filter(pk=metrics.pk).update(
+        created_at=NOW - timedelta(days=days_ago)
+    )
+    return metrics.pk
+
+
+@mock.patch.object(KeysetPagination, 'page_size', 2)
+class LatestSnapshotTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.students = [Student.objects.create(gender='F') for _ in range(5)]
+        self.latest = {}
+        for number, student in enumerate(self.students):
+            for days_ago in (40, 10, 1):
+                snapshot(student, days_ago, percentile=number * 10 + days_ago)
+            self.latest[student.id] = number * 10 + 1
+        # Two snapshots of the same moment; the later id wins
+        tied = snapshot(self.students[0], 1, percentile=99)
+        self.latest[self.students[0].id] = 99
+        self.tied = tied
+
+    def test_queryset_keeps_newest(self):
+        """Test that latest_per_student returns one newest snapshot per student."""
+        rows = StudentPerformanceMetrics.objects.latest_per_student()
+        self.assertEqual(
+            {row.student_id: float(row.math_percentile) for row in rows}, self.latest
+        )
+        self.assertIn(self.tied, [row.pk for row in rows])
+
+    def test_endpoint_pages_by_student(self):
+        """Test that the latest endpoint pages through every student once."""
+        url, seen = reverse('studentperformancemetrics-latest'), {}
+        while url:
+            data = self.client.get(url).data
+            self.assertLessEqual(len(data['results']), 2)
+            for row in data['results']:
+                self.assertNotIn(row['student'], seen)
+                seen[row['student']] = float(row['math_percentile'])
+            url = data['next']
+        self.assertEqual(seen, self.latest)
+
+    def test_endpoint_filters(self):
+        """Test that the list filters apply to the latest endpoint."""
+        student = self.students[2]
+        response = self.client.get(
+            reverse('studentperformancemetrics-latest'), {'student': student.id}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [float(row['math_percentile']) for row in response.data['results']],
+            [self.latest[student.id]]
+        )
+
+
+class CompactionTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(gender='M')
+        # Days ago of each snapshot; a repeated day is a second snapshot that day
+        self.days = [1, 2, 40, 40, 41, 70, 100, 100, 130]
+        self.ids = [snapshot(self.student, days) for days in self.days]
+
+    def remaining(self):
+        kept = set(StudentPerformanceMetrics.objects.values_list('pk', flat=True))
+        return [days for days, pk in zip(self.days, self.ids) if pk in kept]
+
+    def test_keep_newest_only(self):
+        """Test that without a period only the newest and recent snapshots survive."""
+        deleted = snapshot_retention.compact(3, NOW - timedelta(days=50))
+        self.assertEqual(deleted, 4)
+        self.assertEqual(self.remaining(), [1, 2, 40, 40, 41])
+
+    def test_one_per_period(self):
+        """Test that older snapshots are thinned to the newest of each period."""
+        only = snapshot(Student.objects.create(gender='F'), 200)
+        deleted = snapshot_retention.compact(1, NOW - timedelta(days=30), 'day')
+        self.assertEqual(deleted, 2)
+        # Of two snapshots taken at the same moment the later id is the newer
+        self.assertFalse(StudentPerformanceMetrics.objects.filter(pk=self.ids[2]).exists())
+        self.assertEqual(self.remaining(), [1, 2, 40, 41, 70, 100, 130])
+        self.assertTrue(StudentPerformanceMetrics.objects.filter(pk=only).exists())
+
+    def test_batches_are_bounded(self):
+        """Test that compaction never reads more than a batch of ids at once."""
+        with CaptureQueriesContext(connection) as queries:
+            deleted = snapshot_retention.compact(1, NOW - timedelta(days=30), batch_size=2)
+        self.assertEqual(deleted, 7)
+        self.assertEqual(self.remaining(), [1, 2])
+        selects = [query['sql'] for query in queries if 'ROW_NUMBER' in query['sql']]
+        # Batches of 2, 2, 2 and 1
+        self.assertEqual(len(selects), 4)
+        for sql in selects:
+            self.assertIn('LIMIT 2', sql)
+
+    def test_command(self):
+        """Test the compaction command, its dry run and its argument checks."""
+        out = StringIO()
+        call_command(
+            'compact_student_metrics', keep=1, older_than=30, period='none', dry_run=True,
+            stdout=out
+        )
+        self.assertIn('Would delete 7 snapshots', out.getvalue())
+        self.assertEqual(StudentPerformanceMetrics.objects.count(), len(self.days))
+
+        call_command(
+            'compact_student_metrics', keep=1, older_than=30, period='none', batch_size=2,
+            stdout=StringIO()
+        )
+        self.assertEqual(self.remaining(), [1, 2])
+        with self.assertRaises(CommandError):
+            call_command('compact_student_metrics', keep=0, stdout=StringIO())
@@ -0,0 +1,66 @@
+from datetime import date
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dashboard import views
+from dashboard.models import Student, Course, Enrollment, AttendanceRecord
+
+
+class BatchPerformanceSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        course = Course.objects.create(
+            course_code='BIO101', course_name='Biology', department='Science', credits=3.0
+        )
+        self.students = []
+        for number in range(6):
+            student = Student.objects.create(
+                gender='F' if number % 2 else 'M',
+                math_score=60 + number, reading_score=70, writing_score=80
+            )
+            if number < 4:
+                enrollment = Enrollment.objects.create(
+                    student=student, course=course,
+                    semester='Fall', year=2024, final_grade=70 + number
+                )
+                AttendanceRecord.objects.create(
+                    enrollment=enrollment, date=date(2024, 9, 2), present=number % 3 == 0
+                )
+            self.students.append(student)
+
+    def summaries(self, **params):
+        return self.client.get(reverse('student-performance-summaries'), params)
+
+    def test_matches_single_summaries(self):
+        """Test that each batch entry equals the per-student action's response"""
+        batch = self.summaries().data
+        self.assertEqual(len(batch), 6)
+        for student in self.students:
+            single = self.client.get(
+                reverse('student-performance-summary', args=[student.id])
+            ).data
+            self.assertEqual(batch[student.id], single)
+
+    def test_constant_query_count(self):
+        """Test that the batch costs the same few queries for any number of students"""
+        with self.assertNumQueries(3):
+            self.summaries()
+        with self.assertNumQueries(3):
+            self.summaries(ids=f'{self.students[0].id},{self.students[5].id}')
+
+    def test_ids_and_filters(self):
+        """Test that students can be picked by id and by the list filters"""
+        ids = [self.students[1].id, self.students[2].id]
+        response = self.summaries(ids=','.join(map(str, ids)), gender='F')
+        self.assertEqual(list(response.data), [self.students[1].id])
+        self.assertEqual(self.summaries(ids='1,x').status_code, 400)
+
+    def test_batch_size_limit(self):
+        """Test that requests matching too many students are rejected"""
+        with mock.patch.object(views, 'MAX_SUMMARY_BATCH', 5):
+            self.assertEqual(self.summaries().status_code, 400)
+            self.assertEqual(self.summaries(gender='M').status_code, 200)
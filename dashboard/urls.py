@@ -13,4 +13,5 @@ router.register(r'student-performance', views.StudentPerformanceMetricsViewSet)
 
 urlpatterns = [
     path('api/', include(router.urls)),
+    path('metrics', views.metrics, name='metrics'),
 ] 
\ No newline at end of file
@@ -1,13 +1,28 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.http import HttpResponse
 from django.shortcuts import render
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Avg, Count
+from django.db.models import Avg, Count, F, Sum
+from django.utils.dateparse import parse_date
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import (
-    Student, Course, Enrollment, Assessment,
-    AttendanceRecord, PerformanceMetrics, StudentPerformanceMetrics
+    Student, Course, CourseStatistics, Enrollment, Assessment,
+    AttendanceBitmap, AttendanceRecord, PerformanceMetrics, StudentPerformanceMetrics
 )
+from . import attendance_bitmaps, score_histograms
+from .caching import data_version, get_or_compute
+from .cohorts import DIMENSIONS as COHORT_DIMENSIONS, cohort_statistics
+from .course_statistics import course_summary
+from .expansions import ExpandMixin
+from .exports import ExportMixin
+from .fast_list import FastListMixin
+from .metrics import collect, exposition
+from .pagination import DateKeysetPagination, StudentKeysetPagination, YearKeysetPagination
 from .serializers import (
     StudentSerializer, CourseSerializer, EnrollmentSerializer,
     AssessmentSerializer, AttendanceRecordSerializer,
@@ -16,7 +31,34 @@ from .serializers import (
 
 # Create your views here.
 
-class StudentViewSet(viewsets.ModelViewSet):
+# Most students one performance_summaries request may cover
+MAX_SUMMARY_BATCH = 500
+
+def parse_dimensions(value, name):
+    """Cohort dimensions named in a comma-separated parameter, in canonical order."""
+    dimensions = {dimension.strip() for dimension in value.split(',') if dimension.strip()}
+    unknown = dimensions - set(COHORT_DIMENSIONS)
+    if unknown:
+        raise ValidationError({
+            name: f'Unknown dimensions {", ".join(sorted(unknown))}; expected some of '
+                  f'{", ".join(COHORT_DIMENSIONS)}.'
+        })
+    return sorted(dimensions, key=COHORT_DIMENSIONS.index)
+
+def cohort_filters(params):
+    """Score histogram filters for the cohort dimensions given as parameters."""
+    return {dimension: params[dimension] for dimension in COHORT_DIMENSIONS if dimension in params}
+
+def parse_number(params, name, cast, low, high):
+    try:
+        value = cast(params[name])
+    except ValueError:
+        value = None
+    if value is None or not low <= value <= high:
+        raise ValidationError({name: f'Expected a number between {low} and {high}.'})
+    return value
+
+class StudentViewSet(FastListMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -26,28 +68,162 @@ class StudentViewSet(viewsets.ModelViewSet):
     @action(detail=True)
     def performance_summary(self, request, pk=None):
         student = self.get_object()
-        enrollments = Enrollment.objects.filter(student=student)
-        
-        summary = {
-            'average_scores': {
-                'math': student.math_score,
-                'reading': student.reading_score,
-                'writing': student.writing_score,
-                'overall': student.average_score
-            },
-            'course_performance': enrollments.aggregate(
-                avg_grade=Avg('final_grade'),
-                courses_taken=Count('id')
-            ),
-            'attendance': AttendanceRecord.objects.filter(
-                enrollment__student=student
-            ).aggregate(
-                attendance_rate=Avg('present')
+        summary = get_or_compute(
+            'performance_summary', student.pk,
+            lambda: self.compute_performance_summary(student)
+        )
+        return Response(summary)
+
+    @action(detail=False)
+    def performance_summaries(self, request):
+        """Summaries of many students at once, keyed by student id.
+
+        Takes the usual list filters and/or ``ids=1,2,3``; at most
+        MAX_SUMMARY_BATCH students may match.
+        """
+        students = self.filter_queryset(self.get_queryset())
+        ids = request.query_params.get('ids')
+        if ids:
+            try:
+                ids = [int(pk) for pk in ids.split(',')]
+            except ValueError:
+                raise ValidationError({'ids': 'Expected a comma-separated list of student ids.'})
+            students = students.filter(pk__in=ids)
+        if not students.ordered:
+            students = students.order_by('pk')
+
+        students = list(students[:MAX_SUMMARY_BATCH + 1])
+        if len(students) > MAX_SUMMARY_BATCH:
+            raise ValidationError(
+                f'At most {MAX_SUMMARY_BATCH} students can be summarised per request.'
+            )
+        return Response(self.compute_performance_summaries(students))
+
+    @action(detail=False)
+    def cohorts(self, request):
+        """Score statistics of demographic cohorts at several rollup levels.
+
+        ``dimensions=gender,lunch_type`` asks for every combination of the
+        given dimensions (their CUBE). Alternatively, each
+        ``grouping_set=gender,lunch_type`` is one level; an empty one is
+        the grand total. The usual list filters narrow the students first.
+        """
+        params = request.query_params
+        if ('dimensions' in params) == ('grouping_set' in params):
+            raise ValidationError('Pass either dimensions or grouping_set parameters.')
+        if 'dimensions' in params:
+            cube = parse_dimensions(params['dimensions'], 'dimensions')
+            if not cube:
+                raise ValidationError({'dimensions': 'Name at least one dimension.'})
+            grouping_sets = None
+        else:
+            cube = None
+            grouping_sets = list({
+                tuple(parse_dimensions(value, 'grouping_set')): None
+                for value in params.getlist('grouping_set')
+            })
+
+        students = self.filter_queryset(self.get_queryset())
+        # Any change to the students moves every cohort result to a new key
+        query = urlencode(sorted(params.lists()), doseq=True)
+        key = '{}:{}'.format(
+            data_version('students'),
+            hashlib.blake2b(query.encode(), digest_size=16).hexdigest()
+        )
+        result = get_or_compute(
+            'cohorts', key,
+            lambda: cohort_statistics(students, grouping_sets, cube)
+        )
+        return Response({'cohorts': result})
+
+    @action(detail=False)
+    def score_distribution(self, request):
+        """Score counts of a cohort, read from the stored score histograms.
+
+        Cohort dimensions given as parameters, e.g. ``gender=F``, select
+        the students. Element ``v`` of each list counts the scores (or
+        0-300 score totals) equal to ``v``.
+        """
+        counts = score_histograms.cohort_counts(**cohort_filters(request.query_params))
+        return Response({
+            'count': int(counts['math'].sum()),
+            **{subject: vector.tolist() for subject, vector in counts.items()},
+        })
+
+    @action(detail=False)
+    def score_percentile(self, request):
+        """Percentile rank of ``score=``, or the score at ``percentile=``, in a cohort.
+
+        ``subject`` is math, reading, writing or total, the score total
+        behind the overall percentile. Cohort dimensions select the
+        students as for score_distribution.
+        """
+        params = request.query_params
+        subject = params.get('subject')
+        if subject not in score_histograms.SUBJECTS:
+            raise ValidationError({
+                'subject': f'Expected one of {", ".join(score_histograms.SUBJECTS)}.'
+            })
+        if ('score' in params) == ('percentile' in params):
+            raise ValidationError('Pass either score or percentile.')
+        counts = score_histograms.cohort_counts(**cohort_filters(params))[subject]
+        result = {'subject': subject, 'count': int(counts.sum())}
+        if 'score' in params:
+            result['score'] = parse_number(
+                params, 'score', int, 0, score_histograms.SUBJECTS[subject] - 1
+            )
+            result['percentile_rank'] = (
+                score_histograms.percentile_rank(counts, result['score'])
+                if result['count'] else None
             )
+        else:
+            result['percentile'] = parse_number(params, 'percentile', float, 0, 100)
+            result['score'] = (
+                score_histograms.score_at(counts, result['percentile'])
+                if result['count'] else None
+            )
+        return Response(result)
+
+    def compute_performance_summary(self, student):
+        return self.compute_performance_summaries([student])[student.pk]
+
+    def compute_performance_summaries(self, students):
+        ids = [student.pk for student in students]
+        course_performance = {
+            row.pop('student_id'): row
+            for row in Enrollment.objects.filter(student_id__in=ids)
+            .values('student_id')
+            .annotate(avg_grade=Avg('final_grade'), courses_taken=Count('id'))
+            .order_by()
         }
-        return Response(summary)
+        # One bitmap per enrollment holds its popcounts, so this sums a few
+        # rows per student instead of averaging every attendance record
+        attendance = {
+            row['student_id']: {'attendance_rate': row['present'] / row['recorded']}
+            for row in AttendanceBitmap.objects.filter(enrollment__student_id__in=ids)
+            .values(student_id=F('enrollment__student_id'))
+            .annotate(present=Sum('present_count'), recorded=Sum('recorded_count'))
+            .order_by()
+            if row['recorded']
+        }
+
+        summaries = {}
+        for student in students:
+            summaries[student.pk] = {
+                'average_scores': {
+                    'math': student.math_score,
+                    'reading': student.reading_score,
+                    'writing': student.writing_score,
+                    'overall': student.average_score
+                },
+                'course_performance': course_performance.get(
+                    student.pk, {'avg_grade': None, 'courses_taken': 0}
+                ),
+                'attendance': attendance.get(student.pk, {'attendance_rate': None})
+            }
+        return summaries
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(FastListMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
@@ -57,50 +233,86 @@ class CourseViewSet(viewsets.ModelViewSet):
     @action(detail=True)
     def course_stats(self, request, pk=None):
         course = self.get_object()
-        enrollments = Enrollment.objects.filter(course=course)
-        
-        stats = {
-            'total_students': enrollments.count(),
-            'grade_distribution': enrollments.exclude(
-                final_grade__isnull=True
-            ).aggregate(
-                avg_grade=Avg('final_grade'),
-                passing_rate=Count('id', filter=models.Q(final_grade__gte=60)) / Count('id')
-            ),
-            'assessment_stats': Assessment.objects.filter(
-                enrollment__course=course
-            ).aggregate(
-                avg_score=Avg('score')
-            )
-        }
+        stats = get_or_compute(
+            'course_stats', course.pk,
+            lambda: self.compute_course_stats(course)
+        )
         return Response(stats)
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+    def compute_course_stats(self, course):
+        return course_summary(CourseStatistics.objects.filter(course=course).first())
+
+class EnrollmentViewSet(ExpandMixin, FastListMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
+    pagination_class = YearKeysetPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['semester', 'year', 'student', 'course']
 
-class AssessmentViewSet(viewsets.ModelViewSet):
+    @action(detail=True)
+    def attendance_summary(self, request, pk=None):
+        """Attendance rate and streaks, optionally between ``start`` and ``end`` dates."""
+        enrollment = self.get_object()
+        bounds = {}
+        for name in ('start', 'end'):
+            value = request.query_params.get(name)
+            try:
+                bounds[name] = parse_date(value) if value else None
+            except ValueError:
+                bounds[name] = None
+            if value and bounds[name] is None:
+                raise ValidationError({name: 'Expected a date as YYYY-MM-DD.'})
+        bitmap = AttendanceBitmap.objects.filter(enrollment=enrollment).first()
+        return Response(attendance_bitmaps.summary(bitmap, **bounds))
+
+class AssessmentViewSet(ExpandMixin, FastListMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Assessment.objects.all()
     serializer_class = AssessmentSerializer
+    pagination_class = DateKeysetPagination
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['assessment_type', 'enrollment']
+    # Bounds on the partition key limit the scan to the matching years
+    filterset_fields = {
+        'assessment_type': ['exact'],
+        'enrollment': ['exact'],
+        'date': ['exact', 'gte', 'lte'],
+    }
 
-class AttendanceRecordViewSet(viewsets.ModelViewSet):
+class AttendanceRecordViewSet(ExpandMixin, FastListMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = AttendanceRecord.objects.all()
     serializer_class = AttendanceRecordSerializer
+    pagination_class = DateKeysetPagination
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['enrollment', 'date', 'present']
+    filterset_fields = {
+        'enrollment': ['exact'],
+        'date': ['exact', 'gte', 'lte'],
+        'present': ['exact'],
+    }
 
-class PerformanceMetricsViewSet(viewsets.ModelViewSet):
+class PerformanceMetricsViewSet(ExpandMixin, FastListMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = PerformanceMetrics.objects.all()
     serializer_class = PerformanceMetricsSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['student', 'semester', 'year']
 
-class StudentPerformanceMetricsViewSet(viewsets.ModelViewSet):
+class StudentPerformanceMetricsViewSet(ExpandMixin, FastListMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = StudentPerformanceMetrics.objects.all()
     serializer_class = StudentPerformanceMetricsSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['student']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'latest':
+            queryset = queryset.latest_per_student()
+        return queryset
+
+    @action(detail=False, pagination_class=StudentKeysetPagination)
+    def latest(self, request):
+        """The newest snapshot of each student, paged by student; takes the list filters."""
+        return self.list(request)
+
+def metrics(request):
+    """Request histograms of every worker in the Prometheus text format."""
+    return HttpResponse(
+        exposition(collect()), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
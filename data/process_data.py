@@ -1,10 +1,52 @@
+"""Clean, encode and explore the raw student dataset.
+
+Run from the project root, as ``python data/process_data.py``. The
+columnar output is written with dashboard.columnar, which needs the
+project on the import path, e.g. ``python -m data.process_data``.
+"""
+import argparse
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Plots are only ever written to files
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
 import re
 
+RAW_FILE = 'data/raw/StudentsPerformance.csv'
+PROCESSED_FILE = 'data/processed/processed_student_data.csv'
+COLUMNAR_FILE = 'data/processed/processed_student_data.cols'
+SCORE_COLUMNS = ['math score', 'reading score', 'writing score']
+EDA_DIR = 'data/eda'
+# Maps each rendered figure to the key it was rendered from
+EDA_CACHE = 'data/eda/.plot_cache.json'
+
+# Fixed vocabulary for the one-hot encoded columns, so every chunk of a
+# streamed file produces exactly the same columns in the same order
+CATEGORIES = {
+    'race/ethnicity': ['group A', 'group B', 'group C', 'group D', 'group E'],
+    'parental level of education': [
+        "associate's degree", "bachelor's degree", 'high school',
+        "master's degree", 'some college', 'some high school'
+    ],
+    'lunch': ['free/reduced', 'standard'],
+    'test preparation course': ['completed', 'none'],
+}
+GENDERS = {'female': 0, 'male': 1}
+
+# Typed layout of the columnar output: int8 gender and scores, and uint8
+# codes into the category vocabularies above
+COLUMNAR_SCHEMA = (
+    [('gender', 'i1', None)]
+    + [(col, 'i1', None) for col in SCORE_COLUMNS]
+    + [(col, 'u1', categories) for col, categories in CATEGORIES.items()]
+)
+
 def sanitize_filename(name):
     """Replace special characters in filename."""
     return re.sub(r'[\\/:*?"<>| ]', '_', name)
@@ -13,8 +55,77 @@ def load_data(file_path):
     """Load and return the dataset."""
     return pd.read_csv(file_path)
 
-def perform_eda(df):
-    """Perform exploratory data analysis and save visualizations."""
+def eda_plots(df):
+    """Describe every EDA figure: file name, plot kind, input columns and parameters."""
+    plots = []
+
+    # Distribution plots
+    for col in SCORE_COLUMNS:
+        plots.append({
+            'file': f'{sanitize_filename(col)}_distribution.png',
+            'kind': 'histogram',
+            'columns': [col],
+            'params': {'figsize': [10, 6], 'title': f'Distribution of {col}'},
+        })
+
+    # Correlation matrix
+    plots.append({
+        'file': 'correlation_matrix.png',
+        'kind': 'heatmap',
+        'columns': list(df.select_dtypes(include=[np.number]).columns),
+        'params': {'figsize': [10, 8], 'title': 'Correlation Matrix'},
+    })
+
+    # Categorical analysis
+    for col in ['gender', 'race/ethnicity', 'parental level of education']:
+        plots.append({
+            'file': f'math_score_by_{sanitize_filename(col)}.png',
+            'kind': 'boxplot',
+            'columns': [col, 'math score'],
+            'params': {'figsize': [12, 6], 'title': f'Math Score by {col}'},
+        })
+    return plots
+
+def plot_key(plot, data):
+    """Hash of a figure's description, its input columns and the plotting libraries."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(plot, sort_keys=True).encode())
+    digest.update(f'{matplotlib.__version__}/{sns.__version__}'.encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def render_plot(plot, data, path):
+    """Draw one figure described by `eda_plots` and save it to `path`."""
+    params = plot['params']
+    plt.figure(figsize=params['figsize'])
+    if plot['kind'] == 'histogram':
+        sns.histplot(data=data, x=plot['columns'][0], kde=True)
+    elif plot['kind'] == 'heatmap':
+        sns.heatmap(data.corr(), annot=True, cmap='coolwarm')
+    elif plot['kind'] == 'boxplot':
+        sns.boxplot(data=data, x=plot['columns'][0], y=plot['columns'][1])
+        plt.xticks(rotation=45)
+    else:
+        raise ValueError(f"Unknown plot kind {plot['kind']}")
+    plt.title(params['title'])
+    plt.savefig(path)
+    plt.close()
+
+def load_plot_cache():
+    """Return the figure -> key map of the last EDA run, if any."""
+    try:
+        with open(EDA_CACHE) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def perform_eda(df, workers=None):
+    """Perform exploratory data analysis and save visualizations.
+
+    Each figure is keyed on a hash of the columns it plots and its
+    parameters; figures whose key and file are unchanged since the last run
+    are skipped, and the rest are rendered in a process pool.
+    """
     # Basic statistics
     print("Dataset Info:")
     print(df.info())
@@ -22,60 +133,101 @@ def perform_eda(df):
     print(df.describe())
     
     # Create EDA directory
-    Path("data/eda").mkdir(exist_ok=True)
-    
-    # Distribution plots
-    for col in ['math score', 'reading score', 'writing score']:
-        plt.figure(figsize=(10, 6))
-        sns.histplot(data=df, x=col, kde=True)
-        plt.title(f'Distribution of {col}')
-        plt.savefig(f'data/eda/{sanitize_filename(col)}_distribution.png')
-        plt.close()
-    
-    # Correlation matrix
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(df.select_dtypes(include=[np.number]).corr(), annot=True, cmap='coolwarm')
-    plt.title('Correlation Matrix')
-    plt.savefig('data/eda/correlation_matrix.png')
-    plt.close()
-    
-    # Categorical analysis
-    for col in ['gender', 'race/ethnicity', 'parental level of education']:
-        plt.figure(figsize=(12, 6))
-        sns.boxplot(data=df, x=col, y='math score')
-        plt.xticks(rotation=45)
-        plt.title(f'Math Score by {col}')
-        plt.savefig(f'data/eda/math_score_by_{sanitize_filename(col)}.png')
-        plt.close()
-
-def preprocess_data(df):
-    """Clean and preprocess the data."""
-    # Handle missing values
-    df = df.dropna()
-    
-    # Convert categorical variables to numerical
-    df['gender'] = df['gender'].map({'female': 0, 'male': 1})
-    
-    # One-hot encode other categorical variables
-    df = pd.get_dummies(df, columns=['race/ethnicity', 'parental level of education', 'lunch', 'test preparation course'])
-    
+    Path(EDA_DIR).mkdir(exist_ok=True)
+
+    cache = load_plot_cache()
+    keys = {}
+    stale = []
+    for plot in eda_plots(df):
+        data = df[plot['columns']]
+        path = f"{EDA_DIR}/{plot['file']}"
+        keys[plot['file']] = plot_key(plot, data)
+        if cache.get(plot['file']) != keys[plot['file']] or not Path(path).exists():
+            stale.append((plot, data, path))
+
+    if len(stale) == 1:
+        render_plot(*stale[0])
+    elif stale:
+        with ProcessPoolExecutor(workers) as pool:
+            list(pool.map(render_plot, *zip(*stale)))
+    print(f"\nRendered {len(stale)} plots, {len(keys) - len(stale)} unchanged")
+
+    with open(EDA_CACHE, 'w') as f:
+        json.dump(keys, f, indent=2, sort_keys=True)
+
+def clean_data(df):
+    """Drop rows with missing values."""
+    return df.dropna()
+
+def categorize_data(df):
+    """Map gender to 0/1 and the other categories onto the fixed vocabulary."""
+    df = df.copy()
+    df['gender'] = df['gender'].map(GENDERS)
+    if df['gender'].isna().any():
+        raise ValueError('Unknown gender values in data')
+
+    for col, categories in CATEGORIES.items():
+        unknown = set(df[col].unique()) - set(categories)
+        if unknown:
+            raise ValueError(f'Unknown {col} values: {sorted(unknown)}')
+        df[col] = pd.Categorical(df[col], categories=categories)
     return df
 
-def main():
-    # Load data
-    df = load_data('data/raw/StudentsPerformance.csv')
-    
-    # Perform EDA
-    perform_eda(df)
-    
-    # Preprocess data
-    processed_df = preprocess_data(df)
-    
-    # Save processed data
-    Path("data/processed").mkdir(exist_ok=True)
-    processed_df.to_csv('data/processed/processed_student_data.csv', index=False)
-    
-    # Create simple data dictionary
+def one_hot(df):
+    """One-hot encode a categorized frame."""
+    # Categorical columns dummy-encode every category, present or not
+    return pd.get_dummies(df, columns=list(CATEGORIES))
+
+def to_columns(df):
+    """Typed columns of a categorized frame, keyed like COLUMNAR_SCHEMA."""
+    columns = {col: df[col].to_numpy() for col in ['gender'] + SCORE_COLUMNS}
+    for col in CATEGORIES:
+        columns[col] = df[col].cat.codes.to_numpy()
+    return columns
+
+def load_chunks(file_path, chunksize):
+    """Yield the raw dataset `chunksize` rows at a time."""
+    yield from pd.read_csv(file_path, chunksize=chunksize)
+
+def clean_chunks(chunks):
+    """Drop rows with missing values from each chunk."""
+    for chunk in chunks:
+        yield clean_data(chunk)
+
+def categorize_chunks(chunks):
+    """Map each chunk's gender and categories onto the fixed vocabularies."""
+    for chunk in chunks:
+        yield categorize_data(chunk)
+
+def write_chunks(chunks, csv_path=None, columnar_path=None):
+    """Write categorized chunks as one-hot CSV and/or typed columnar data.
+
+    Only one chunk is held in memory at a time. Returns the columns of the
+    CSV output, or of the columnar one if no CSV is written.
+    """
+    columns = None
+    with ExitStack() as stack:
+        csv_file = stack.enter_context(open(csv_path, 'w', newline='')) if csv_path else None
+        columnar = None
+        if columnar_path:
+            # Imported here so that CSV runs work as a plain script
+            from dashboard.columnar import ColumnWriter
+            columnar = stack.enter_context(ColumnWriter(columnar_path, COLUMNAR_SCHEMA))
+
+        for chunk in chunks:
+            if csv_file:
+                chunk_csv = one_hot(chunk)
+                columns = columns or list(chunk_csv.columns)
+                chunk_csv.to_csv(csv_file, index=False, header=csv_file.tell() == 0)
+            if columnar:
+                columnar.append(to_columns(chunk))
+                columns = columns or [name for name, _, _ in COLUMNAR_SCHEMA]
+    if columns is None:
+        raise ValueError('No rows to write')
+    return columns
+
+def write_data_dictionary(columns):
+    """Write a simple data dictionary for the processed columns."""
     with open('data/processed/data_dictionary.txt', 'w') as f:
         f.write("Data Dictionary\n")
         f.write("==============\n\n")
@@ -84,8 +236,52 @@ def main():
         f.write("2. Converted gender to binary (0=female, 1=male)\n")
         f.write("3. One-hot encoded categorical variables\n\n")
         f.write("Columns:\n")
-        for col in processed_df.columns:
+        for col in columns:
             f.write(f"- {col}\n")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='Preprocess the raw student dataset.')
+    parser.add_argument(
+        '--chunksize',
+        type=int,
+        help='Stream the raw file in chunks of this many rows with bounded '
+             'memory; skips the EDA plots, which need the whole dataset'
+    )
+    parser.add_argument(
+        '--format',
+        choices=['csv', 'columnar', 'both'],
+        default='both',
+        help='Write the one-hot CSV, the typed columnar file, or both (default)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Processes used to render changed EDA plots (default: one per CPU)'
+    )
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    csv_path = PROCESSED_FILE if args.format in ('csv', 'both') else None
+    columnar_path = COLUMNAR_FILE if args.format in ('columnar', 'both') else None
+    Path("data/processed").mkdir(exist_ok=True)
+
+    if args.chunksize:
+        # Stream the raw file
+        chunks = load_chunks(RAW_FILE, args.chunksize)
+    else:
+        # Load data
+        df = load_data(RAW_FILE)
+        
+        # Perform EDA
+        perform_eda(df, workers=args.workers)
+        chunks = [df]
+    
+    # Preprocess and save processed data
+    columns = write_chunks(categorize_chunks(clean_chunks(chunks)), csv_path, columnar_path)
+    
+    # Create simple data dictionary
+    write_data_dictionary(columns)
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'dashboard.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -144,6 +145,15 @@ CACHES = {
         'TIMEOUT': 300,  # 5 minutes
     }
 }
+# Swaps the cache above for a local-memory one while the tests run
+TEST_RUNNER = 'dashboard.tests.runner.TestRunner'
+
+# Request metrics (dashboard.middleware, served at /metrics)
+# Share of requests measured; 0 turns the instrumentation off
+METRICS_SAMPLE_RATE = env.float('METRICS_SAMPLE_RATE', default=1.0)
+# Directory for per-worker histogram files, needed for /metrics to cover
+# every gunicorn worker; unset keeps them in process memory
+METRICS_MULTIPROCESS_DIR = env('METRICS_MULTIPROCESS_DIR', default=None)
 
 # DRF settings
 REST_FRAMEWORK = {